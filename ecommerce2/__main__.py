@@ -1,4 +1,4 @@
 from ecommerce2.app import main
 
 if __name__ == '__main__':
-    main()
+    raise SystemExit(main())
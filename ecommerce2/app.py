@@ -1,6 +1,251 @@
-def main():
-    pass
+import argparse
+import csv
+import json
+import os
+import sys
+from decimal import Decimal
+from typing import Any, Iterator, TextIO
+
+from ecommerce2.ecommerce_service.catalog import ProductCatalog
+from ecommerce2.ecommerce_service.model import Client, Product, Category
+from ecommerce2.ecommerce_service.report import REPORT_METRICS
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.ecommerce_service.timeline import Timeline
+from ecommerce2.instrumentation import instrumentation
+from ecommerce2.loader.json_loader import iter_file
+from ecommerce2.loader.orders_loader import OrdersLoader, LoadResult
+
+""" Module stores command line interface that loads orders files and streams chosen reports """
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+SNAPSHOT_INPUTS_SUFFIX = '.inputs.json'
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m ecommerce2',
+        description='Loads orders files into OrdersService and writes chosen reports as JSON or CSV.'
+    )
+    parser.add_argument('files', nargs='*',
+                        help=f'json files containing array of orders records or NDJSON files '
+                             f'({", ".join(NDJSON_EXTENSIONS)}) containing one record per line')
+    parser.add_argument('-r', '--report', dest='reports', action='append', choices=REPORT_METRICS,
+                        help='report to compute, can be repeated, all reports are computed by default')
+    parser.add_argument('-f', '--format', choices=('json', 'csv'), default='json', help='output format')
+    parser.add_argument('-o', '--output', help='output file, stdout is used by default')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes parsing and validating records, 0 uses all cores')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='number of json records validated at once')
+    parser.add_argument('--chunk-bytes', type=int, default=1 << 20, help='size of NDJSON range parsed at once')
+    parser.add_argument('--snapshot',
+                        help='snapshot file, it is used instead of files if it was written for the same unchanged '
+                             'files, otherwise it is written after loading')
+    parser.add_argument('--ingest', action='store_true',
+                        help='json files are read concurrently by asyncio ingestion runner instead of one by one')
+    parser.add_argument('--profile', action='store_true', help='prints time of each stage to stderr')
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """ Entry point of python -m ecommerce2, :return: exit code """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.files and not args.snapshot:
+        parser.error('at least one file or --snapshot is required')
+    if args.ingest and (args.snapshot or not args.files):
+        parser.error('--ingest requires files and can\'t be used with --snapshot')
+
+    if args.profile:
+        instrumentation.reset()
+        instrumentation.enable()
+    try:
+        if args.ingest:
+            service = ingest_service(args.files, args.workers or None, args.chunk_size)
+        else:
+            service = load_service(args.files, args.snapshot, args.workers or None, args.chunk_size, args.chunk_bytes)
+        with instrumentation.timer('write_report'):
+            if args.output is None:
+                write_report(service, args.reports or REPORT_METRICS, args.format, sys.stdout)
+            else:
+                with open(args.output, 'w', newline='') as output:
+                    write_report(service, args.reports or REPORT_METRICS, args.format, output)
+    except (TypeError, ValueError) as e:
+        parser.exit(1, f'{parser.prog}: error: {e.args[0]}\n')
+    except OSError as e:
+        parser.exit(1, f'{parser.prog}: error: {e.strerror}: {e.filename}\n')
+    finally:
+        if args.profile:
+            sys.stderr.write(format_profile())
+            instrumentation.disable()
+    return 0
+
+
+def load_service(filepaths: list[str], snapshot: str | None = None, workers: int | None = 1, chunk_size: int = 1000,
+                 chunk_bytes: int = 1 << 20) -> OrdersService:
+    """
+    Loads orders of all files into single service, files are loaded in provided order and merged, so carts of client
+    appearing in many files are summed. Invalid records are skipped and summary of each file is written to stderr.
+    :param snapshot: if snapshot was written for the same files (paths, modification times and sizes recorded in
+                     snapshot inputs file), service is loaded from it, otherwise it's written together with inputs
+                     file. Without files service is loaded from snapshot
+    """
+    inputs = _inputs_of(filepaths)
+    if snapshot is not None and (not filepaths or inputs is not None and _snapshot_inputs(snapshot) == inputs):
+        with instrumentation.timer('load_snapshot'):
+            return OrdersService.load_snapshot(snapshot)
+
+    catalog = ProductCatalog()
+    service = OrdersService({})
+    for filepath in filepaths:
+        timeline = Timeline()
+        with instrumentation.timer('load_file'):
+            result = _load_file(filepath, catalog, timeline, workers, chunk_size, chunk_bytes)
+        service.merge(result.orders, timeline)
+        sys.stderr.write(f'{filepath}: {result.loaded} loaded, {len(result.errors)} invalid\n')
+
+    if snapshot is not None:
+        service.save_snapshot(snapshot)
+        _write_snapshot_inputs(snapshot, inputs)
+    return service
+
+
+def ingest_service(filepaths: list[str], workers: int | None = 1, chunk_size: int = 1000) -> OrdersService:
+    """
+    Ingests json files concurrently with ecommerce2.loader.ingestion.IngestionRunner. Invalid records are skipped and
+    summary of each file is written to stderr, together with error that stopped reading of file
+    """
+    # imported here, so loading without --ingest doesn't pay for importing asyncio and process pool
+    from ecommerce2.loader.ingestion import ingest_files
+
+    service = OrdersService({})
+    with instrumentation.timer('ingest'):
+        report = ingest_files(filepaths, service, workers=workers, chunk_size=chunk_size)
+    for filepath in filepaths:
+        summary = f'{filepath}: {report.loaded.get(filepath, 0)} loaded, {len(report.errors.get(filepath, []))} invalid'
+        if filepath in report.failed:
+            summary += f', stopped: {report.failed[filepath]}'
+        sys.stderr.write(summary + '\n')
+    return service
+
+
+def _load_file(filepath: str, catalog: ProductCatalog, timeline: Timeline, workers: int | None, chunk_size: int,
+               chunk_bytes: int) -> LoadResult:
+    if filepath.endswith(NDJSON_EXTENSIONS):
+        return OrdersLoader.load_ndjson(filepath, catalog, workers, chunk_bytes, timeline)
+    return OrdersLoader.load_collecting_errors(iter_file(filepath), catalog, workers, chunk_size, timeline)
+
+
+def _inputs_of(filepaths: list[str]) -> list[list] | None:
+    """ :return: [absolute path, modification time in ns, size] of each file, None if any file doesn't exist """
+    inputs = []
+    for filepath in filepaths:
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        inputs.append([os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size])
+    return inputs
+
+
+def _snapshot_inputs(snapshot: str) -> list[list] | None:
+    """ :return: inputs recorded when snapshot was written, None if snapshot or its inputs file doesn't exist """
+    if not os.path.exists(snapshot):
+        return None
+    try:
+        with open(f'{snapshot}{SNAPSHOT_INPUTS_SUFFIX}') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_snapshot_inputs(snapshot: str, inputs: list[list] | None) -> None:
+    temporary_path = f'{snapshot}{SNAPSHOT_INPUTS_SUFFIX}.tmp'
+    with open(temporary_path, 'w') as f:
+        json.dump(inputs, f)
+    os.replace(temporary_path, f'{snapshot}{SNAPSHOT_INPUTS_SUFFIX}')
+
+
+def write_report(service: OrdersService, metrics: list[str] | tuple[str, ...], output_format: str,
+                 output: TextIO) -> None:
+    """
+    Computes metrics in single pass and streams them to output
+    :param output_format: 'json' writes object with metric name as a key, 'csv' writes metric, key and value rows
+    """
+    report = service.compute_report(metrics)
+    if output_format == 'json':
+        output.write('{')
+        encoder = json.JSONEncoder(indent=2)
+        for idx, (metric, value) in enumerate(report.items()):
+            output.write(f'{"," if idx else ""}\n{json.dumps(metric)}: ')
+            for chunk in encoder.iterencode(to_jsonable(value)):
+                output.write(chunk)
+        output.write('\n}\n')
+    elif output_format == 'csv':
+        writer = csv.writer(output)
+        writer.writerow(('metric', 'key', 'value'))
+        for metric, value in report.items():
+            writer.writerows((metric, key, cell) for key, cell in _rows(value))
+    else:
+        raise ValueError("Unknown output format")
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Converts report value to structure of json types. Clients and Products become dicts, dict having them as keys
+    becomes list of {'key', 'value'} dicts, Categories become their names and Decimals become str
+    """
+    match value:
+        case Client():
+            return {'name': value.name, 'surname': value.surname, 'age': value.age, 'balance': str(value.balance)}
+        case Product():
+            return {'name': value.name, 'category': value.category.name, 'price': str(value.price)}
+        case Category():
+            return value.name
+        case Decimal():
+            return str(value)
+        case dict() if any(isinstance(key, (Client, Product)) for key in value):
+            return [{'key': to_jsonable(key), 'value': to_jsonable(item)} for key, item in value.items()]
+        case dict():
+            return {_label(key): to_jsonable(item) for key, item in value.items()}
+        case list() | tuple():
+            return [to_jsonable(item) for item in value]
+    return value
+
+
+def _label(value: Any) -> str:
+    match value:
+        case Client():
+            return f'{value.name} {value.surname}'
+        case Product():
+            return value.name
+        case Category():
+            return value.name
+    return str(value)
+
+
+def _rows(value: Any, path: tuple[str, ...] = ()) -> Iterator[tuple[str, str]]:
+    """ Flattens report value into (key, value) rows, where key is path of labels joined with '/' """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _rows(item, path + (_label(key),))
+    elif isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], tuple):
+            for key, item in value:
+                yield from _rows(item, path + (_label(key),))
+        else:
+            yield '/'.join(path), ';'.join(_label(item) for item in value)
+    else:
+        yield '/'.join(path), _label(value)
+
+
+def format_profile() -> str:
+    """ :return: table of timed stages sorted by total time, followed by counters """
+    lines = [f'{"stage":<60} {"calls":>8} {"total s":>10} {"max s":>10}']
+    for stage, timer in sorted(instrumentation.timers.items(), key=lambda item: item[1].total, reverse=True):
+        lines.append(f'{stage:<60} {timer.calls:>8} {timer.total:>10.4f} {timer.max:>10.4f}')
+    lines.extend(f'{name:<60} {value:>8}' for name, value in instrumentation.counters.items())
+    return '\n'.join(lines) + '\n'
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,6 @@
+import sys
+
+from ecommerce2.benchmarks.harness import main
+
+if __name__ == '__main__':
+    sys.exit(main())
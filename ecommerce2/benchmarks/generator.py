@@ -0,0 +1,100 @@
+import json
+import random
+import string
+from typing import Any, Iterator
+
+from ecommerce2.ecommerce_service.model import Category
+
+""" Module stores generator of synthetic orders data having the same format as json files loaded by OrdersLoader """
+
+
+def letters_for(idx: int) -> str:
+    """ Unique name made of capital letters for each non-negative index: 0 -> A, 25 -> Z, 26 -> BA """
+    letters = string.ascii_uppercase
+    name = letters[idx % 26]
+    while idx := idx // 26:
+        name = letters[idx % 26] + name
+    return name
+
+
+def generate_catalog(products: int, seed: int = 0) -> list[dict[str, str]]:
+    """
+    :param products: number of distinct products
+    :param seed: seed of random prices
+    :return: list of valid product_data dicts
+    """
+    if products < 1:
+        raise ValueError("Number of products has to be greater than 0")
+    rng = random.Random(seed)
+    categories = [category.name for category in Category]
+    return [{
+        "name": f'P-{letters_for(idx)}',
+        "category": categories[idx % len(categories)],
+        "price": f'{rng.randint(10, 5000)}.{rng.randint(0, 99):02d}'
+    } for idx in range(products)]
+
+
+def _invalidate(record: dict[str, Any], rng: random.Random) -> None:
+    """ Breaks single value of client or one of his products, so record doesn't pass validation """
+    match rng.randrange(4):
+        case 0:
+            record['client']['name'] = record['client']['name'].lower()
+        case 1:
+            record['client']['age'] = 17
+        case 2 if record['client_orders']:
+            record['client_orders'][0]['category'] = 'UNKNOWN'
+        case _:
+            record['client']['balance'] = -1
+
+
+def generate_orders(clients: int, lines_per_client: int, products: int, invalid_ratio: float = 0.0,
+                    seed: int = 0) -> Iterator[dict[str, Any]]:
+    """
+    Lazily generates orders data records {client, client_orders}
+    :param clients: number of records, each of them has different client
+    :param lines_per_client: number of products in client_orders of each record
+    :param products: size of products catalog that products are drawn from
+    :param invalid_ratio: part of records that are made invalid, from 0 to 1
+    :param seed: seed that makes data reproducible
+    :return: iterator of records
+    """
+    if clients < 0 or lines_per_client < 0:
+        raise ValueError("Number of clients and lines can't be negative")
+    if not 0 <= invalid_ratio <= 1:
+        raise ValueError("Invalid ratio has to be between 0 and 1")
+
+    catalog = generate_catalog(products, seed)
+    rng = random.Random(seed + 1)
+    for idx in range(clients):
+        record = {
+            "client": {
+                "name": letters_for(idx),
+                "surname": f'{letters_for(rng.randrange(1000))}-{letters_for(rng.randrange(1000))}',
+                "age": rng.randint(18, 90),
+                "balance": f'{rng.randint(0, 100000)}.{rng.randint(0, 99):02d}'
+            },
+            "client_orders": [dict(rng.choice(catalog)) for _ in range(lines_per_client)]
+        }
+        if invalid_ratio and rng.random() < invalid_ratio:
+            _invalidate(record, rng)
+        yield record
+
+
+def write_orders(filepath: str, clients: int, lines_per_client: int, products: int, invalid_ratio: float = 0.0,
+                 seed: int = 0) -> None:
+    """ Streams generated records to json file containing top level array, one record per line """
+    with open(filepath, 'w') as f:
+        f.write('[')
+        for idx, record in enumerate(generate_orders(clients, lines_per_client, products, invalid_ratio, seed)):
+            f.write(',\n' if idx else '\n')
+            f.write(json.dumps(record))
+        f.write('\n]\n')
+
+
+def write_orders_ndjson(filepath: str, clients: int, lines_per_client: int, products: int,
+                        invalid_ratio: float = 0.0, seed: int = 0) -> None:
+    """ Streams generated records to NDJSON file, one record per line """
+    with open(filepath, 'w') as f:
+        for record in generate_orders(clients, lines_per_client, products, invalid_ratio, seed):
+            f.write(json.dumps(record))
+            f.write('\n')
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from itertools import islice
+from typing import Any, Callable, Final, Iterable
+
+from ecommerce2.benchmarks.generator import write_orders
+from ecommerce2.ecommerce_service.report import REPORT_METRICS
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.ecommerce_service.validator import ClientValidator, ProductValidator
+from ecommerce2.loader.json_loader import iter_file
+from ecommerce2.loader.orders_loader import OrdersLoader
+
+""" Module stores harness that times and memory-profiles each stage of loading orders and querying OrdersService """
+
+SIZES: Final = {'10k': 10_000, '1M': 1_000_000, '10M': 10_000_000}
+VALIDATION_BATCH: Final = 10_000
+
+
+@dataclass
+class StageResult:
+    """ Wall time of stage in seconds and peak of memory allocated during it in bytes (None if not measured) """
+    seconds: float
+    peak_bytes: int | None = None
+
+
+def measure(func: Callable[[], Any], memory: bool = False) -> tuple[Any, StageResult]:
+    """
+    :param func: stage to run
+    :param memory: if True, peak of allocated memory is measured with tracemalloc, which slows the stage down
+    :return: value returned by func and its StageResult
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        value = func()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return value, StageResult(seconds, peak)
+
+
+def _batches(iterable: Iterable, size: int) -> Iterable[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _validate_file(filepath: str) -> int:
+    """ Validates all clients and products of file in batches, returns number of errors """
+    errors = 0
+    for records in _batches(iter_file(filepath), VALIDATION_BATCH):
+        errors += len(ClientValidator.validate_many([record['client'] for record in records]))
+        errors += len(ProductValidator.validate_many([product for record in records
+                                                      for product in record['client_orders']]))
+    return errors
+
+
+def run_benchmark(lines: int, lines_per_client: int = 10, products: int = 1000, memory: bool = False,
+                  seed: int = 0) -> dict[str, StageResult]:
+    """
+    Generates orders file having provided number of order lines and measures every stage on it
+    :return: dict with stage name as a key and its StageResult as a value
+    """
+    clients = max(1, lines // lines_per_client)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        filepath = os.path.join(workdir, 'orders.json')
+        _, results['generate'] = measure(
+            lambda: write_orders(filepath, clients, lines_per_client, products, seed=seed), memory)
+        _, results['parse'] = measure(lambda: sum(1 for _ in iter_file(filepath)), memory)
+        _, results['validate'] = measure(lambda: _validate_file(filepath), memory)
+        orders, results['load'] = measure(lambda: OrdersLoader.load_from(iter_file(filepath)), memory)
+
+    service = OrdersService(orders)
+    for metric in REPORT_METRICS:
+        _, results[metric] = measure(getattr(service, metric), memory)
+    _, results['compute_report'] = measure(service.compute_report, memory)
+    _, results['track_aggregates'] = measure(service.track_aggregates, memory)
+    _, results['top_clients_by_spend'] = measure(lambda: service.top_clients_by_spend(100), memory)
+    return results
+
+
+def compare(results: dict[str, dict[str, dict]], baseline: dict[str, dict[str, dict]],
+            tolerance: float = 0.2) -> list[str]:
+    """
+    :param results: results of run in format written by main(): size -> stage -> StageResult as dict
+    :param baseline: results of earlier run in the same format
+    :param tolerance: allowed relative slowdown or memory growth, 0.2 means 20%
+    :return: descriptions of stages that regressed, stages missing in baseline are skipped
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            if (base := baseline.get(size, {}).get(stage)) is None:
+                continue
+            for key, unit in (('seconds', 's'), ('peak_bytes', 'B')):
+                current, previous = result.get(key), base.get(key)
+                if current is None or not previous:
+                    continue
+                if current > previous * (1 + tolerance):
+                    regressions.append(f'{size} {stage}: {key} {current:.6g}{unit} > {previous:.6g}{unit} '
+                                       f'(+{(current / previous - 1) * 100:.0f}%)')
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m ecommerce2.benchmarks',
+                                     description='Benchmarks loading and querying of synthetic orders')
+    parser.add_argument('--sizes', nargs='+', default=['10k'], help=f'any of {", ".join(SIZES)} or number of lines')
+    parser.add_argument('--lines-per-client', type=int, default=10)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--memory', action='store_true', help='measure peak memory with tracemalloc')
+    parser.add_argument('--output', help='file results are written to as json')
+    parser.add_argument('--baseline', help='json file with results of earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        lines = SIZES[size] if size in SIZES else int(size)
+        stages = run_benchmark(lines, args.lines_per_client, args.products, args.memory, args.seed)
+        results[size] = {stage: asdict(result) for stage, result in stages.items()}
+        for stage, result in stages.items():
+            memory = f'  {result.peak_bytes / 2 ** 20:10.1f} MiB' if result.peak_bytes is not None else ''
+            print(f'{size:>6} {stage:<42} {result.seconds:10.4f} s{memory}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+    return 0
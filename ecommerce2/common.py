@@ -1,7 +1,9 @@
+import heapq
 import re
 
 from decimal import Decimal
-from typing import Any
+from operator import itemgetter
+from typing import Any, Callable, Collection
 from typing import TypedDict
 
 """ Module stores all objects commonly used in service"""
@@ -45,6 +47,25 @@ def get_n_top_elements_of_most_common_list(elements: list[tuple[Any, Any]]) -> i
             return n
     return n
 
+def top_n_with_ties(items: Collection[tuple[Any, Any]], n: int) -> list[tuple[Any, Any]]:
+    """
+    Selects n pairs having the highest values plus all pairs tied with n-th one, without sorting all pairs.
+    Memory used is bounded by n and number of ties.
+    :param items: collection of (key, value) pairs, it's iterated twice so it can't be an iterator
+    :param n: number of top pairs to select
+    :return: pairs ordered descending by value, pairs having same value are kept in order of items
+    """
+    if not isinstance(n, int):
+        raise TypeError("Invalid n type")
+    if n < 1:
+        raise ValueError("n has to be greater than 0")
+    top = heapq.nlargest(n, items, key=itemgetter(1))
+    if not top:
+        return []
+    threshold = top[-1][1]
+    return [item for item in top if item[1] > threshold] + [item for item in items if item[1] == threshold]
+
+
 def first_elements_having_same_value(elements: list[int | float | Decimal]) -> list[int | float | Decimal]:
     """
     Can be used to extract the highest or the lowest occurrences of same value objects
@@ -71,14 +92,16 @@ def first_elements_having_same_value(elements: list[int | float | Decimal]) -> l
     return elements
 
 
-def matches_regex(expression: str, regex: str) -> bool:
+def matches_regex(expression: str, regex: str | re.Pattern) -> bool:
     """
     :param expression: valid string
-    :param regex: valid string pattern
+    :param regex: valid string pattern or pattern that is already compiled
     :return: if expression matches pattern
     """
     if not isinstance(expression, str):
         raise TypeError(f"Invalid expression type: {type(expression)}")
+    if isinstance(regex, re.Pattern):
+        return regex.match(expression)
     if not isinstance(regex, str):
         raise TypeError(f"Invalid regex type: {type(regex)}")
     return re.match(regex, expression)
@@ -98,3 +121,22 @@ def is_dict_structure_correct(data: dict, data_name: str, desired_keys: set[str]
     if desired_keys != set(data.keys()):
         raise KeyError(f'{data_name} is not valid due to different keys than desired')
     return True
+
+
+class lazy_class_attribute:
+    """
+    Class attribute computed by function of class on first access. Value replaces the descriptor in class,
+    so next accesses cost the same as of plain class attribute.
+    """
+
+    def __init__(self, function: Callable[[type], Any]):
+        self.function = function
+        self.name = None
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        value = self.function(owner)
+        setattr(owner, self.name, value)
+        return value
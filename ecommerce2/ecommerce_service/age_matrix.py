@@ -0,0 +1,137 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Mapping, Self
+
+from ecommerce2.ecommerce_service.model import Client, Product, Category
+
+""" Module stores age x Category histogram of orders with prefix sums for age range queries """
+
+CATEGORIES = tuple(Category)
+_CATEGORY_INDEXES = {category: idx for idx, category in enumerate(CATEGORIES)}
+
+
+def _validate_age(age: int) -> None:
+    if not isinstance(age, int) or isinstance(age, bool):
+        raise TypeError("Invalid age type")
+
+
+class AgeCategoryMatrix:
+    """
+    Counts of distinct products of each Category in carts of clients of each age. Counts are kept sparse, only for
+    ages of clients, so exact age queries cost nothing more than dict lookup whatever ages are.
+    For range queries matrix of prefix sums with one row per distinct age in ascending order is built once after
+    counts change, so counts of any age range are found with two binary searches and one subtraction per Category.
+    Tied Categories are in Category order, the same as in OrdersService.most_popular_categories_for_clients_ages().
+    """
+
+    def __init__(self):
+        self.ages: dict[int, dict[Category, int]] = {}
+        self._sorted_ages: list[int] | None = None
+        self._prefix: list[list[int]] | None = None
+
+    @classmethod
+    def from_orders(cls, orders: Mapping[Client, Iterable[Product]]) -> Self:
+        """ Builds matrix of dict that has the same structure as OrdersService.orders in single pass """
+        matrix = cls()
+        for client, cart in orders.items():
+            matrix.add(client, cart)
+        return matrix
+
+    @classmethod
+    def from_counts(cls, age_categories: Mapping[int, Mapping[Category, int]]) -> Self:
+        """ Builds matrix of counts of Categories for each age, for example OrdersAggregates.age_categories """
+        matrix = cls()
+        for age, counts in age_categories.items():
+            matrix.add_counts(age, counts)
+        return matrix
+
+    def _counts_of(self, age: int) -> dict[Category, int]:
+        if (counts := self.ages.get(age)) is None:
+            counts = self.ages[age] = {}
+        self._prefix = None
+        return counts
+
+    def add(self, client: Client, cart: Iterable[Product]) -> None:
+        """ Counts category of each distinct product of client cart, client without products registers his age only """
+        counts = self._counts_of(client.age)
+        for product in cart:
+            category = product.category
+            counts[category] = counts.get(category, 0) + 1
+
+    def add_counts(self, age: int, counts: Mapping[Category, int]) -> None:
+        """ Adds count of each Category to age, categories are taken in order of counts """
+        age_counts = self._counts_of(age)
+        for category, count in counts.items():
+            age_counts[category] = age_counts.get(category, 0) + count
+
+    def merge(self, other: Self) -> None:
+        """ Adds counts of other matrix, that was filled with carts of different clients, to this one """
+        for age, counts in other.ages.items():
+            self.add_counts(age, counts)
+
+    def counts(self, age: int) -> dict[Category, int]:
+        """ :return: Categories counted for age with their counts, in order they were first counted """
+        return dict(self.ages.get(age, {}))
+
+    def _build_prefix(self) -> None:
+        """ Prefix sums of counts of distinct ages, row i is sum of counts of i youngest ages """
+        self._sorted_ages = sorted(self.ages)
+        row = [0] * len(CATEGORIES)
+        prefix = [row]
+        for age in self._sorted_ages:
+            row = list(row)
+            for category, count in self.ages[age].items():
+                row[_CATEGORY_INDEXES[category]] += count
+            prefix.append(row)
+        self._prefix = prefix
+
+    def range_counts(self, min_age: int, max_age: int) -> list[int]:
+        """
+        :param min_age: first age of range
+        :param max_age: last age of range, inclusive
+        :return: count of each Category (in Category order) summed over all ages of range
+        """
+        _validate_age(min_age)
+        _validate_age(max_age)
+        if min_age > max_age:
+            raise ValueError("Minimal age can't be greater than maximal age")
+        if self._prefix is None:
+            self._build_prefix()
+        lower = self._prefix[bisect_left(self._sorted_ages, min_age)]
+        upper = self._prefix[bisect_right(self._sorted_ages, max_age)]
+        return [upper_total - lower_total for upper_total, lower_total in zip(upper, lower)]
+
+    def most_popular(self, age: int) -> list[Category]:
+        """ :return: Categories of the highest count for age, in Category order """
+        counts = self.ages.get(age)
+        if not counts:
+            return []
+        top = max(counts.values())
+        return [category for category in CATEGORIES if counts.get(category) == top]
+
+    def most_popular_in_range(self, min_age: int, max_age: int) -> list[Category]:
+        """ :return: Categories of the highest count summed over [min_age, max_age] range, empty if nothing was counted """
+        counts = self.range_counts(min_age, max_age)
+        top = max(counts)
+        if not top:
+            return []
+        return [category for category, count in zip(CATEGORIES, counts) if count == top]
+
+    def most_popular_in_buckets(self, bucket_size: int, origin: int = 0) -> dict[tuple[int, int], list[Category]]:
+        """
+        Splits ages into buckets of bucket_size consecutive ages, starting from origin
+        :return: dict with (first age, last age) of each bucket having at least one client as a key and
+                 most popular Categories of bucket as a value, ordered by age
+        """
+        if not isinstance(bucket_size, int) or isinstance(bucket_size, bool):
+            raise TypeError("Invalid bucket size type")
+        if bucket_size <= 0:
+            raise ValueError("Bucket size has to be greater than 0")
+        _validate_age(origin)
+
+        buckets = {}
+        for age in sorted(self.ages):
+            first_age = origin + (age - origin) // bucket_size * bucket_size
+            bucket = (first_age, first_age + bucket_size - 1)
+            if bucket not in buckets:
+                buckets[bucket] = self.most_popular_in_range(*bucket)
+        return buckets
@@ -0,0 +1,204 @@
+from collections import Counter
+from heapq import heapify, heappop, heappush
+from typing import Any, Callable, Hashable, Self
+
+from ecommerce2.ecommerce_service.model import Client, Product, Category
+
+""" Module stores aggregates of orders that are kept up to date while orders change, instead of being recomputed """
+
+
+class Leaderboard:
+    """
+    Keeps value for each key together with keys grouped by value and max heap of distinct values, so keys having
+    the highest value are known without scanning or sorting all keys.
+    Values that have no keys anymore stay in heap until they reach its top (lazy deletion), so changing value costs
+    O(log n), getting leaders costs amortized O(log n + k log k) for k tied keys and getting n top keys costs
+    O(n log n) more.
+    """
+
+    def __init__(self, rank: Callable[[Hashable], Any]):
+        """ :param rank: function used to order tied keys """
+        self.values: dict[Hashable, Any] = {}
+        self._rank = rank
+        self._heap: list = []
+        self._keys_by_value: dict[Any, set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.values
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.values.get(key, default)
+
+    def load(self, values: dict[Hashable, Any]) -> None:
+        """ Replaces all values at once, distinct values are heapified in linear time """
+        self.values = dict(values)
+        self._keys_by_value = {}
+        for key, value in self.values.items():
+            self._keys_by_value.setdefault(value, set()).add(key)
+        self._heap = [-value for value in self._keys_by_value]
+        heapify(self._heap)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """ Sets value of key, adds key if it's not in leaderboard yet """
+        if key in self.values:
+            self._detach(key)
+        self.values[key] = value
+        if (keys := self._keys_by_value.get(value)) is None:
+            keys = self._keys_by_value[value] = set()
+            heappush(self._heap, -value)
+        keys.add(key)
+
+    def add(self, key: Hashable, delta: Any) -> None:
+        """ Increases value of key by delta, key that is not in leaderboard starts from 0 """
+        self.set(key, self.values.get(key, 0) + delta)
+
+    def remove(self, key: Hashable) -> None:
+        """ Removes key from leaderboard """
+        self._detach(key)
+        del self.values[key]
+
+    def _detach(self, key: Hashable) -> None:
+        value = self.values[key]
+        keys = self._keys_by_value[value]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_value[value]
+            if len(self._heap) > 2 * len(self._keys_by_value) + 16:
+                # too many stale values, heap is rebuilt from distinct values
+                self._heap = [-value for value in self._keys_by_value]
+                heapify(self._heap)
+
+    def max_value(self) -> Any:
+        """ :return: the highest value or None if leaderboard is empty """
+        heap = self._heap
+        while heap and -heap[0] not in self._keys_by_value:
+            heappop(heap)
+        return -heap[0] if heap else None
+
+    def top(self, n: int) -> list[tuple[Hashable, Any]]:
+        """
+        :return: pairs (key, value) of n keys having the highest values plus keys tied with n-th one, ordered
+                 descending by value and then by rank
+        """
+        heap = self._heap
+        top = []
+        popped = []
+        # each distinct value has at least one key, so at most n highest distinct values are popped and pushed back
+        while heap and len(top) < n:
+            value = -heappop(heap)
+            if value not in self._keys_by_value or popped and popped[-1] == value:
+                # stale value or duplicate of value pushed again after its keys were removed
+                continue
+            popped.append(value)
+            top.extend((key, value) for key in sorted(self._keys_by_value[value], key=self._rank))
+        for value in popped:
+            heappush(heap, -value)
+        return top
+
+    def leaders(self) -> list[Hashable]:
+        """ :return: all keys having the highest value ordered by rank """
+        if (value := self.max_value()) is None:
+            return []
+        return sorted(self._keys_by_value[value], key=self._rank)
+
+
+class OrdersAggregates:
+    """
+    Aggregates of orders maintained line by line: total spend of each client, spend and quantity of each client
+    in each Category, number of distinct products of each Category bought by clients of each age.
+    Spend is kept in int minor units (cents), see ecommerce2.ecommerce_service.money.
+    Clients are ranked in order they were added, which is the order of OrdersService.orders keys.
+    """
+
+    def __init__(self):
+        self._client_ranks: dict[Client, int] = {}
+        self.spend = Leaderboard(self._client_ranks.__getitem__)
+        self.category_spend = {category: Leaderboard(self._client_ranks.__getitem__) for category in Category}
+        self.category_quantity = {category: Leaderboard(self._client_ranks.__getitem__) for category in Category}
+        self.age_categories: dict[int, Counter[Category]] = {}
+        self._client_category_lines: Counter[tuple[Client, Category]] = Counter()
+
+    @classmethod
+    def from_orders(cls, orders: dict[Client, dict[Product, int]]) -> Self:
+        """ Builds aggregates of dict that has the same structure as OrdersService.orders """
+        aggregates = cls()
+        spend = {}
+        category_spend = {category: {} for category in Category}
+        category_quantity = {category: {} for category in Category}
+        for client, cart in orders.items():
+            aggregates._client_ranks[client] = len(aggregates._client_ranks)
+            ages = aggregates.age_categories.setdefault(client.age, Counter())
+            # sums of client are collected per Category first, so client is hashed once per Category, not per line
+            cart_spend: dict[Category, int] = {}
+            cart_quantity: dict[Category, int] = {}
+            cart_lines: dict[Category, int] = {}
+            for product, quantity in cart.items():
+                category = product.category
+                cart_spend[category] = cart_spend.get(category, 0) + product.price_minor * quantity
+                cart_quantity[category] = cart_quantity.get(category, 0) + quantity
+                cart_lines[category] = cart_lines.get(category, 0) + 1
+            for category, lines in cart_lines.items():
+                category_spend[category][client] = cart_spend[category]
+                category_quantity[category][client] = cart_quantity[category]
+                ages[category] += lines
+                aggregates._client_category_lines[client, category] = lines
+            spend[client] = sum(cart_spend.values())
+
+        # leaderboards are filled at once instead of value by value
+        aggregates.spend.load(spend)
+        for category in Category:
+            aggregates.category_spend[category].load(category_spend[category])
+            aggregates.category_quantity[category].load(category_quantity[category])
+        return aggregates
+
+    def add_client(self, client: Client) -> None:
+        """ Registers client with empty cart """
+        self._client_ranks[client] = len(self._client_ranks)
+        self.spend.set(client, 0)
+        self.age_categories.setdefault(client.age, Counter())
+
+    def add_line(self, client: Client, product: Product, quantity: int, previous_quantity: int) -> None:
+        """
+        Takes into account quantity of product added to client cart
+        :param previous_quantity: quantity of product that client had in cart before, 0 if product is new in cart
+        """
+        category = product.category
+        cost = product.price_minor * quantity
+        self.spend.add(client, cost)
+        self.category_spend[category].add(client, cost)
+        self.category_quantity[category].add(client, quantity)
+        if previous_quantity == 0:
+            self.age_categories[client.age][category] += 1
+            self._client_category_lines[client, category] += 1
+
+    def remove_line(self, client: Client, product: Product, quantity: int, previous_quantity: int) -> None:
+        """
+        Takes into account quantity of product removed from client cart
+        :param previous_quantity: quantity of product that client had in cart before removal
+        """
+        category = product.category
+        cost = product.price_minor * quantity
+        self.spend.add(client, -cost)
+        self.category_spend[category].add(client, -cost)
+        self.category_quantity[category].add(client, -quantity)
+        if quantity == previous_quantity:
+            ages = self.age_categories[client.age]
+            ages[category] -= 1
+            if not ages[category]:
+                del ages[category]
+            self._client_category_lines[client, category] -= 1
+            if not self._client_category_lines[client, category]:
+                del self._client_category_lines[client, category]
+                self.category_spend[category].remove(client)
+                self.category_quantity[category].remove(client)
+
+    def most_popular_categories(self, age: int) -> list[Category]:
+        """ :return: Categories of the highest count for provided age, in Category order """
+        counts = self.age_categories.get(age)
+        if not counts:
+            return []
+        top = max(counts.values())
+        return [category for category in Category if counts.get(category) == top]
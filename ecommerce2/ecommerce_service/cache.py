@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Final, Hashable
+
+""" Module stores memoization layer of OrdersService queries """
+
+MISSING: Final = object()
+
+
+@dataclass
+class CacheStats:
+    """ Counters of QueryCache lookups """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class QueryCache:
+    """
+    Bounded cache of query results with least recently used eviction.
+    Keys contain data version of service, so results computed for older data are never returned.
+    Cached results are shared between calls, so they mustn't be modified by the caller.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        if not isinstance(maxsize, int):
+            raise TypeError("Invalid maxsize type")
+        if maxsize < 1:
+            raise ValueError("Maxsize has to be greater than 0")
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ :return: cached value, marked as recently used, or default if key is not cached """
+        value = self._entries.get(key, MISSING)
+        if value is MISSING:
+            self.stats.misses += 1
+            return default
+        self.stats.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """ Caches value, least recently used entry is evicted if cache is full """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def query_key(name: str, args: tuple, kwargs: dict[str, Any], version: int) -> Hashable:
+    """ :return: key of query result, arguments have to be hashable """
+    return name, args, tuple(sorted(kwargs.items())), version
+
+
+def cached_query(method: Callable) -> Callable:
+    """
+    Decorator of OrdersService query methods. If service has cache, result is memoized under the key made of
+    method name, its arguments and service data version.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.cache is None:
+            return method(self, *args, **kwargs)
+        key = query_key(method.__name__, args, kwargs, self.data_version)
+        if (value := self.cache.get(key, MISSING)) is MISSING:
+            value = method(self, *args, **kwargs)
+            self.cache.put(key, value)
+        return value
+    return wrapper
@@ -0,0 +1,57 @@
+from typing import Any
+
+from ecommerce2.ecommerce_service.model import Product
+
+""" Module stores catalog that keeps single instance of each Product used in the service """
+
+
+class ProductCatalog:
+    """
+    Interns products, so equal products bought by many clients are represented by one canonical instance.
+    Each product gets dense int id, which is its position in products list and can be used as an array index.
+    """
+
+    def __init__(self):
+        self.products: list[Product] = []
+        self._ids: dict[Product, int] = {}
+        self._raw_ids: dict[tuple[Any, Any, Any], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def __contains__(self, product: Product) -> bool:
+        return product in self._ids
+
+    def id_of(self, product: Product) -> int:
+        """ :return: id of product, product is added to catalog if it's not there yet """
+        if (product_id := self._ids.get(product)) is None:
+            if not isinstance(product, Product):
+                raise TypeError("Invalid product type")
+            product_id = self._ids[product] = len(self.products)
+            self.products.append(product)
+        return product_id
+
+    def intern(self, product: Product) -> Product:
+        """ :return: canonical instance equal to provided product """
+        return self.products[self.id_of(product)]
+
+    def get(self, product_id: int) -> Product:
+        """ :return: product having provided id """
+        return self.products[product_id]
+
+    def from_dict(self, product_data: dict[str, Any]) -> Product:
+        """
+        Works like Product.from_dict(), but returns canonical instance. Raw values of product_data are remembered,
+        so next dict having the same values doesn't create any Product at all.
+        """
+        if not isinstance(product_data, dict) or len(product_data) != 3:
+            return self.intern(Product.from_dict(product_data))
+        try:
+            raw_key = (product_data['name'], product_data['category'], product_data['price'])
+            product_id = self._raw_ids.get(raw_key)
+        except (KeyError, TypeError):
+            return self.intern(Product.from_dict(product_data))
+
+        if product_id is None:
+            product_id = self._raw_ids[raw_key] = self.id_of(Product.from_dict(product_data))
+        return self.products[product_id]
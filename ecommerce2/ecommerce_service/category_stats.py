@@ -0,0 +1,145 @@
+from decimal import Decimal
+from typing import Iterable, Self
+
+from ecommerce2.ecommerce_service.model import Product
+from ecommerce2.ecommerce_service.money import from_minor_units
+
+""" Module stores streaming statistics of prices of distinct products of single Category """
+
+
+def select(values: list[int], k: int) -> int:
+    """
+    Quickselect, finds k-th smallest value (counting from 0) in expected linear time without sorting all values
+    :param values: list that is reordered in place
+    """
+    low, high = 0, len(values) - 1
+    while True:
+        if low == high:
+            return values[low]
+        middle = (low + high) // 2
+        # median of three makes sorted and reversed input linear as well
+        pivot = sorted((values[low], values[middle], values[high]))[1]
+        smaller, larger = low, high
+        while smaller <= larger:
+            while values[smaller] < pivot:
+                smaller += 1
+            while values[larger] > pivot:
+                larger -= 1
+            if smaller <= larger:
+                values[smaller], values[larger] = values[larger], values[smaller]
+                smaller += 1
+                larger -= 1
+        if k <= larger:
+            high = larger
+        elif k >= smaller:
+            low = smaller
+        else:
+            return values[k]
+
+
+class CategoryStats:
+    """
+    Statistics of prices of distinct products, updated product by product in single pass: sum, count, sum of squares,
+    the highest and the lowest price together with products having them, in order they were first added.
+    If keep_prices is True, prices are also kept, so median and percentiles can be selected without sorting.
+    Prices are int minor units, see ecommerce2.ecommerce_service.money.
+    """
+
+    __slots__ = ('products', 'total', 'square_total', 'highest', 'lowest', 'most_expensive', 'cheapest', 'prices')
+
+    def __init__(self, keep_prices: bool = False):
+        self.products: dict[Product, None] = {}
+        self.total = 0
+        self.square_total = 0
+        self.highest: int | None = None
+        self.lowest: int | None = None
+        self.most_expensive: list[Product] = []
+        self.cheapest: list[Product] = []
+        self.prices: list[int] | None = [] if keep_prices else None
+
+    @classmethod
+    def from_products(cls, products: Iterable[Product], keep_prices: bool = False) -> Self:
+        stats = cls(keep_prices)
+        for product in products:
+            stats.add(product)
+        return stats
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def add(self, product: Product) -> None:
+        """ Takes product into account, product that was already added is ignored """
+        if product in self.products:
+            return
+        self.products[product] = None
+        price = product.price_minor
+        self.total += price
+        self.square_total += price * price
+        if self.prices is not None:
+            self.prices.append(price)
+
+        if self.highest is None or price > self.highest:
+            self.highest = price
+            self.most_expensive = [product]
+        elif price == self.highest:
+            self.most_expensive.append(product)
+        if self.lowest is None or price < self.lowest:
+            self.lowest = price
+            self.cheapest = [product]
+        elif price == self.lowest:
+            self.cheapest.append(product)
+
+    def merge(self, other: Self) -> None:
+        """ Adds products of other stats, that were added after products of this one """
+        for product in other.products:
+            self.add(product)
+
+    @property
+    def price_mean(self) -> Decimal:
+        return from_minor_units(self.total) / len(self.products)
+
+    @property
+    def price_stddev(self) -> Decimal:
+        """ Population standard deviation, computed from exact int sums """
+        count = len(self.products)
+        return (Decimal(count * self.square_total - self.total * self.total).sqrt() / count).scaleb(-2)
+
+    def percentile(self, percent: int | float | Decimal) -> Decimal:
+        """
+        :param percent: from 0 to 100, value between two prices is linearly interpolated
+        :return: price below which provided percent of prices is
+        """
+        if self.prices is None:
+            raise ValueError("Prices were not kept")
+        if not isinstance(percent, (int, float, Decimal)) or isinstance(percent, bool):
+            raise TypeError("Invalid percentile type")
+        if not 0 <= percent <= 100:
+            raise ValueError("Percentile has to be between 0 and 100")
+
+        rank = Decimal(str(percent)) * (len(self.prices) - 1) / 100
+        lower_rank = int(rank)
+        values = list(self.prices)
+        lower = select(values, lower_rank)
+        if lower_rank == rank:
+            return from_minor_units(lower)
+        upper = select(values, lower_rank + 1)
+        return (lower + (upper - lower) * (rank - lower_rank)).scaleb(-2)
+
+    def result(self, extended: bool = False,
+               percentiles: tuple[int | float | Decimal, ...] = ()) -> dict[str, Decimal | list[Product] | dict]:
+        """
+        :param extended: adds price_median and price_stddev
+        :param percentiles: adds price_percentiles dict with percent as a key and price as a value
+        :return: dict in format of OrdersService.categories_stats() value
+        """
+        result = {
+            "price_mean": self.price_mean,
+            "most_expensive_product": list(self.most_expensive),
+            "cheapest_product": list(self.cheapest)
+        }
+        if extended:
+            result["price_median"] = self.percentile(50)
+            result["price_stddev"] = self.price_stddev
+        if percentiles:
+            result["price_percentiles"] = {percent: self.percentile(percent) for percent in percentiles}
+        return result
@@ -0,0 +1,159 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Iterable, Self
+
+from ecommerce2.ecommerce_service.model import Client
+
+""" Module stores sorted secondary indexes of clients, that answer prefix and age range lookups by binary search """
+
+
+@dataclass(frozen=True)
+class ClientFilter:
+    """
+    Restricts clients to ones matching all provided conditions, None means no condition.
+    surname_prefix, name_prefix: beginning of surname and name, compared case sensitively like Client data is stored
+    min_age, max_age: inclusive age range, any of bounds can be omitted
+    """
+    surname_prefix: str | None = None
+    name_prefix: str | None = None
+    min_age: int | None = None
+    max_age: int | None = None
+
+    def __post_init__(self):
+        for prefix in (self.surname_prefix, self.name_prefix):
+            if prefix is not None and not isinstance(prefix, str):
+                raise TypeError("Invalid prefix type")
+        for age in (self.min_age, self.max_age):
+            if age is not None and (not isinstance(age, int) or isinstance(age, bool)):
+                raise TypeError("Invalid age type")
+        if self.min_age is not None and self.max_age is not None and self.min_age > self.max_age:
+            raise ValueError("Minimal age can't be greater than maximal age")
+
+    def matches(self, client: Client) -> bool:
+        return ((self.surname_prefix is None or client.surname.startswith(self.surname_prefix))
+                and (self.name_prefix is None or client.name.startswith(self.name_prefix))
+                and (self.min_age is None or client.age >= self.min_age)
+                and (self.max_age is None or client.age <= self.max_age))
+
+
+def _prefix_end(prefix: str) -> str:
+    """ :return: the smallest str that is greater than all str starting with prefix """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class _SortedKeys:
+    """ Ascending keys of form (value, ..., rank) together with clients they belong to, kept in parallel lists """
+
+    def __init__(self):
+        self.keys: list[tuple] = []
+        self.clients: list[Client] = []
+
+    def load(self, entries: list[tuple[tuple, Client]]) -> None:
+        """ Replaces all keys with entries of (key, client) sorted at once """
+        entries.sort(key=lambda entry: entry[0])
+        self.keys = [key for key, _ in entries]
+        self.clients = [client for _, client in entries]
+
+    def insert(self, key: tuple, client: Client) -> None:
+        position = bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.clients.insert(position, client)
+
+    def delete(self, key: tuple) -> None:
+        position = bisect_left(self.keys, key)
+        del self.keys[position]
+        del self.clients[position]
+
+    def between(self, low: tuple | None, high: tuple | None) -> tuple[int, int]:
+        """ :return: positions of keys that are >= low and < high, None means no bound """
+        start = 0 if low is None else bisect_left(self.keys, low)
+        end = len(self.keys) if high is None else bisect_left(self.keys, high)
+        return start, max(start, end)
+
+
+class ClientIndex:
+    """
+    Secondary indexes of clients: clients sorted by surname and name, by name and surname and by age.
+    Each lookup finds range of matching clients of every used index by binary search, then scans only the smallest
+    range checking remaining conditions, so clients are found in O(log n + k) for k clients of the smallest range.
+    Clients are ranked in order they were added and found clients are sorted by rank, so they are in the order of
+    OrdersService.orders keys.
+    """
+
+    def __init__(self):
+        self._ranks: dict[Client, int] = {}
+        self._surnames = _SortedKeys()
+        self._names = _SortedKeys()
+        self._ages = _SortedKeys()
+
+    @classmethod
+    def from_clients(cls, clients: Iterable[Client]) -> Self:
+        """ Builds indexes with one sort each, add() is meant for clients added later """
+        index = cls()
+        ranks = index._ranks
+        for client in clients:
+            ranks.setdefault(client, len(ranks))
+        index._surnames.load([((client.surname, client.name, rank), client) for client, rank in ranks.items()])
+        index._names.load([((client.name, client.surname, rank), client) for client, rank in ranks.items()])
+        index._ages.load([((client.age, rank), client) for client, rank in ranks.items()])
+        return index
+
+    def __len__(self) -> int:
+        return len(self._ranks)
+
+    def __contains__(self, client: Client) -> bool:
+        return client in self._ranks
+
+    def add(self, client: Client) -> None:
+        """ Adds client ranked after all clients added before, client that is already indexed is ignored """
+        if client in self._ranks:
+            return
+        rank = self._ranks[client] = len(self._ranks)
+        self._surnames.insert((client.surname, client.name, rank), client)
+        self._names.insert((client.name, client.surname, rank), client)
+        self._ages.insert((client.age, rank), client)
+
+    def remove(self, client: Client) -> None:
+        """ Removes client from indexes, ranks of other clients don't change """
+        if client not in self._ranks:
+            raise ValueError("Client is not indexed")
+        rank = self._ranks.pop(client)
+        self._surnames.delete((client.surname, client.name, rank))
+        self._names.delete((client.name, client.surname, rank))
+        self._ages.delete((client.age, rank))
+
+    def find(self, where: ClientFilter) -> list[Client]:
+        """ :return: clients matching filter, in order they were added """
+        candidates = []
+        if where.surname_prefix:
+            candidates.append((self._surnames, self._surnames.between((where.surname_prefix,),
+                                                                      (_prefix_end(where.surname_prefix),))))
+        if where.name_prefix:
+            candidates.append((self._names, self._names.between((where.name_prefix,),
+                                                                (_prefix_end(where.name_prefix),))))
+        if where.min_age is not None or where.max_age is not None:
+            candidates.append((self._ages, self._ages.between(
+                None if where.min_age is None else (where.min_age,),
+                None if where.max_age is None else (where.max_age + 1,))))
+        if not candidates:
+            return list(self._ranks)
+
+        keys, (start, end) = min(candidates, key=lambda candidate: candidate[1][1] - candidate[1][0])
+        found = [client for client in keys.clients[start:end] if where.matches(client)]
+        found.sort(key=self._ranks.__getitem__)
+        return found
+
+
+def filtered_query(method: Callable) -> Callable:
+    """
+    Decorator of OrdersService query methods, that adds where keyword argument. If ClientFilter is provided, method
+    answers query for orders of matching clients only, found by OrdersService.find_clients().
+    """
+    @wraps(method)
+    def wrapper(self, *args, where: ClientFilter | None = None, **kwargs) -> Any:
+        if where is None:
+            return method(self, *args, **kwargs)
+        return method(self.__class__({client: self.orders[client] for client in self.find_clients(where)}),
+                      *args, **kwargs)
+    return wrapper
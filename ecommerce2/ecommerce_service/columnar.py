@@ -0,0 +1,159 @@
+from array import array
+from decimal import Decimal
+from typing import Hashable, Iterable, Self
+
+from ecommerce2.ecommerce_service.catalog import ProductCatalog
+from ecommerce2.ecommerce_service.model import Client, Product, Category
+from ecommerce2.ecommerce_service.money import from_minor_units
+
+""" Module stores alternative OrdersService backend that keeps order lines in flat typed columns """
+
+def _keys_with_max_value(items: Iterable[tuple[Hashable, int]]) -> tuple[int | None, list[Hashable]]:
+    """
+    Linear alternative to sorting items descending and taking tied leaders
+    :param items: pairs of key and value
+    :return: max value (None if there are no items) and keys having it in order of items
+    """
+    best = None
+    keys = []
+    for key, value in items:
+        if best is None or value > best:
+            best = value
+            keys = [key]
+        elif value == best:
+            keys.append(key)
+    return best, keys
+
+
+class ColumnarOrdersService:
+    """
+    Stores the same data as OrdersService, but each order line is a row in flat typed arrays: client id, product id,
+    category code, quantity and price in minor units. Clients are kept once in table, products in ProductCatalog,
+    and their ids are positions in table and catalog. Queries return the same results as OrdersService methods.
+    """
+
+    def __init__(self, catalog: ProductCatalog | None = None):
+        """ :param catalog: catalog shared with other services or loader, new one is used if not provided """
+        self.clients: list[Client] = []
+        self.catalog = ProductCatalog() if catalog is None else catalog
+
+        self.client_ids = array('q')
+        self.product_ids = array('q')
+        self.categories = array('B')
+        self.quantities = array('q')
+        self.prices = array('q')
+
+    @property
+    def products(self) -> list[Product]:
+        return self.catalog.products
+
+    @classmethod
+    def from_orders(cls, orders: dict[Client, dict[Product, int]], catalog: ProductCatalog | None = None) -> Self:
+        """ Creates columnar service out of dict that has the same structure as OrdersService.orders """
+        service = cls(catalog)
+        for client, cart in orders.items():
+            service.add_client_cart(client, cart)
+        return service
+
+    def add_client_cart(self, client: Client, cart: dict[Product, int]) -> None:
+        """ Appends client to clients table and each product of his cart as an order line """
+        client_id = len(self.clients)
+        self.clients.append(client)
+        id_of = self.catalog.id_of
+        for product, quantity in cart.items():
+            product_id = id_of(product)
+            self.client_ids.append(client_id)
+            self.product_ids.append(product_id)
+            self.categories.append(product.category.value)
+            self.quantities.append(quantity)
+            self.prices.append(product.price_minor)
+
+    def _spend_per_client(self, category: Category | None = None) -> list[int]:
+        """ Sums cost of lines for each client id, optionally only lines of provided category """
+        spend = [0] * len(self.clients)
+        if category is None:
+            for client_id, quantity, price in zip(self.client_ids, self.quantities, self.prices):
+                spend[client_id] += quantity * price
+        else:
+            code = category.value
+            for client_id, category_code, quantity, price in zip(self.client_ids, self.categories, self.quantities,
+                                                                 self.prices):
+                if category_code == code:
+                    spend[client_id] += quantity * price
+        return spend
+
+    def client_with_biggest_spend(self) -> list[Client]:
+        """
+        :return: List of one or more Clients that have biggest spend in all clients pool
+        """
+        _, client_ids = _keys_with_max_value(enumerate(self._spend_per_client()))
+        return [self.clients[client_id] for client_id in client_ids]
+
+    def client_with_biggest_spend_in_category(self, category: Category) -> list[Client]:
+        """
+        :param category: to check available categories find ecommerce2.ecommerce_service.model.Category enum
+        :return: List of one or more Clients that have biggest spend on products that match provided Category
+        """
+        best, client_ids = _keys_with_max_value(enumerate(self._spend_per_client(category)))
+        if not best:
+            return []
+        return [self.clients[client_id] for client_id in client_ids]
+
+    def most_popular_categories_for_clients_ages(self) -> dict[int, list[Category]]:
+        """
+        Prepares list of one or more Categories are most popular for each age occurrence.
+        Data is stored in dict where age is a key and a list of Categories is a value.
+        """
+        ages_with_categories: dict[int, dict[int, int]] = {}
+        for client in self.clients:
+            ages_with_categories.setdefault(client.age, {})
+
+        for client_id, category_code in zip(self.client_ids, self.categories):
+            counts = ages_with_categories[self.clients[client_id].age]
+            counts[category_code] = counts.get(category_code, 0) + 1
+
+        return {age: [Category(code) for code in sorted(_keys_with_max_value(counts.items())[1])]
+                for age, counts in ages_with_categories.items()}
+
+    def categories_stats(self) -> dict[Category, dict[str, Decimal | list[Product]]]:
+        """ Creates statistical data on each Category that is currently used in orders. Value for each Category contains
+            dict with three items: price mean, most expensive product and cheapest product. First is Decimal value, second
+            and third are lists of one or more Product
+        """
+        category_with_products: dict[int, dict[int, int]] = {}
+        for product_id, category_code, price in zip(self.product_ids, self.categories, self.prices):
+            category_with_products.setdefault(category_code, {})[product_id] = price
+
+        category_with_stats = {}
+        for category_code, prices in category_with_products.items():
+            _, most_expensive = _keys_with_max_value(prices.items())
+            _, cheapest = _keys_with_max_value((product_id, -price) for product_id, price in prices.items())
+            category_with_stats[Category(category_code)] = {
+                "price_mean": from_minor_units(sum(prices.values())) / len(prices),
+                "most_expensive_product": [self.products[product_id] for product_id in most_expensive],
+                "cheapest_product": [self.products[product_id] for product_id in cheapest]
+            }
+        return category_with_stats
+
+    def categories_with_biggest_clients(self) -> dict[Category, list[Client]]:
+        """ Creates dict with Category as a key and list of one or more Clients that have the biggest quantity of bought
+            products in that particular Category
+        """
+        quantities: dict[int, dict[int, int]] = {category.value: {} for category in Category}
+        for client_id, category_code, quantity in zip(self.client_ids, self.categories, self.quantities):
+            clients = quantities[category_code]
+            clients[client_id] = clients.get(client_id, 0) + quantity
+
+        return {Category(category_code): [self.clients[client_id] for client_id in _keys_with_max_value(clients.items())[1]]
+                for category_code, clients in quantities.items()}
+
+    def clients_with_carts_value(self) -> dict[Client, Decimal]:
+        """ Calculates total spend for each Client and returns dict with Client as a key and his total spend as a value"""
+        return {client: from_minor_units(spend) for client, spend in zip(self.clients, self._spend_per_client())}
+
+    def clients_balances_after_completing_orders(self) -> dict[Client, Decimal]:
+        """ Calculates balance of each client if his cart would be processed. Dict with Client as a key,
+            and balance subtracted from cart value
+        """
+        return {client: client.balance_after_spending(from_minor_units(spend))
+                for client, spend in zip(self.clients, self._spend_per_client())}
@@ -1,9 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal
 from enum import Enum, auto
 from typing import Self, Any
 
 from ecommerce2.common import is_dict_structure_correct
+from ecommerce2.ecommerce_service.money import to_minor_units
 
 
 @dataclass(frozen=True)
@@ -44,12 +45,30 @@ class Category(Enum):
     HOME, ELECTRONICS, KITCHEN, RTV, AGD = (auto() for _ in range(5))
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Product:
-    """ Product class used for creating products that are needed in OrdersService"""
+    """ Product class used for creating products that are needed in OrdersService.
+        Price has to have at most currency precision, its value in minor units is kept in price_minor and used
+        by aggregations of the service. More precise price, like Decimal("0.001"), can't be expressed in minor units,
+        so constructor and from_dict() raise ValueError for it, ProductValidator reports it as invalid price.
+    """
     name: str
     category: Category
     price: Decimal
+    price_minor: int = field(init=False, repr=False, compare=False)
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'price_minor', to_minor_units(self.price))
+        object.__setattr__(self, '_hash', hash((self.name, self.category, self.price)))
+
+    def __hash__(self):
+        """ Product is a key of every cart, so its hash is computed once """
+        return self._hash
+
+    def __reduce__(self):
+        """ Hash of str differs between processes, so unpickled Product computes it again """
+        return self.__class__, (self.name, self.category, self.price)
 
     def cost_for_n(self, quantity: int) -> Decimal:
         """Calculates cost of provided quantity of product"""
@@ -0,0 +1,28 @@
+from decimal import Decimal
+from typing import Final
+
+""" Module stores fixed-point representation of money used by service aggregations """
+
+MINOR_UNITS: Final = 100
+MINOR_UNITS_EXPONENT: Final = -2
+
+
+def to_minor_units(value: Decimal | int) -> int:
+    """
+    :param value: money value that has at most currency precision
+    :return: value expressed as int number of minor units (cents)
+    """
+    if isinstance(value, int):
+        return value * MINOR_UNITS
+    if not isinstance(value, Decimal):
+        raise TypeError("Invalid value type")
+    minor = value.scaleb(-MINOR_UNITS_EXPONENT)
+    if minor != minor.to_integral_value():
+        raise ValueError("Value is more precise than minor unit")
+    return int(minor)
+
+
+def from_minor_units(minor: int) -> Decimal:
+    """ Converts int number of minor units (cents) back to Decimal """
+    return Decimal(minor).scaleb(MINOR_UNITS_EXPONENT)
+
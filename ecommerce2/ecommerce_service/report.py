@@ -0,0 +1,154 @@
+from decimal import Decimal
+from typing import Any, Final, Iterable, Self
+
+from ecommerce2.common import top_n_with_ties
+from ecommerce2.ecommerce_service.age_matrix import AgeCategoryMatrix
+from ecommerce2.ecommerce_service.category_stats import CategoryStats
+from ecommerce2.ecommerce_service.model import Client, Product, Category
+from ecommerce2.ecommerce_service.money import from_minor_units
+
+""" Module stores report engine that computes many OrdersService metrics in single pass over orders """
+
+CLIENT_WITH_BIGGEST_SPEND: Final = 'client_with_biggest_spend'
+MOST_POPULAR_CATEGORIES_FOR_CLIENTS_AGES: Final = 'most_popular_categories_for_clients_ages'
+CATEGORIES_STATS: Final = 'categories_stats'
+CATEGORIES_WITH_BIGGEST_CLIENTS: Final = 'categories_with_biggest_clients'
+CLIENTS_WITH_CARTS_VALUE: Final = 'clients_with_carts_value'
+CLIENTS_BALANCES_AFTER_COMPLETING_ORDERS: Final = 'clients_balances_after_completing_orders'
+
+REPORT_METRICS: Final = (
+    CLIENT_WITH_BIGGEST_SPEND,
+    MOST_POPULAR_CATEGORIES_FOR_CLIENTS_AGES,
+    CATEGORIES_STATS,
+    CATEGORIES_WITH_BIGGEST_CLIENTS,
+    CLIENTS_WITH_CARTS_VALUE,
+    CLIENTS_BALANCES_AFTER_COMPLETING_ORDERS,
+)
+
+_SPEND_METRICS: Final = frozenset({
+    CLIENT_WITH_BIGGEST_SPEND, CLIENTS_WITH_CARTS_VALUE, CLIENTS_BALANCES_AFTER_COMPLETING_ORDERS
+})
+
+
+class ReportAccumulator:
+    """
+    Collects intermediate sums of requested metrics while client carts are added one by one.
+    Sums are shared between metrics, for example spend of each client is counted once for client_with_biggest_spend,
+    clients_with_carts_value and clients_balances_after_completing_orders.
+    Names of metrics are names of OrdersService methods that return the same results.
+    Money is summed as int minor units and converted to Decimal only in results.
+    """
+
+    def __init__(self, metrics: Iterable[str] = REPORT_METRICS, keep_prices: bool = False):
+        """ :param keep_prices: keeps prices in category stats, so their median and percentiles can be computed """
+        self.metrics: Final = tuple(dict.fromkeys(metrics))
+        if unknown := [metric for metric in self.metrics if metric not in REPORT_METRICS]:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+
+        requested = set(self.metrics)
+        self.spend: dict[Client, int] | None = {} if requested & _SPEND_METRICS else None
+        self.age_matrix: AgeCategoryMatrix | None = \
+            AgeCategoryMatrix() if MOST_POPULAR_CATEGORIES_FOR_CLIENTS_AGES in requested else None
+        self.keep_prices: Final = keep_prices
+        self.category_stats: dict[Category, CategoryStats] | None = {} if CATEGORIES_STATS in requested else None
+        self.category_quantities: dict[Category, dict[Client, int]] | None = \
+            {category: {} for category in Category} if CATEGORIES_WITH_BIGGEST_CLIENTS in requested else None
+
+    @classmethod
+    def from_orders(cls, orders: dict[Client, dict[Product, int]], metrics: Iterable[str] = REPORT_METRICS,
+                    keep_prices: bool = False) -> Self:
+        """ Accumulates all carts of dict that has the same structure as OrdersService.orders """
+        accumulator = cls(metrics, keep_prices)
+        for client, cart in orders.items():
+            accumulator.add(client, cart)
+        return accumulator
+
+    def add(self, client: Client, cart: dict[Product, int]) -> None:
+        """ Takes into account client and all products of his cart """
+        spend = self.spend
+        stats = self.category_stats
+        quantities = self.category_quantities
+
+        if self.age_matrix is not None:
+            self.age_matrix.add(client, cart)
+        total_spend = 0
+        for product in cart:
+            category = product.category
+            if spend is not None:
+                total_spend += product.price_minor * cart[product]
+            if stats is not None:
+                if (category_stats := stats.get(category)) is None:
+                    category_stats = stats[category] = CategoryStats(self.keep_prices)
+                category_stats.add(product)
+            if quantities is not None:
+                clients = quantities[category]
+                clients[client] = clients.get(client, 0) + cart[product]
+        if spend is not None:
+            spend[client] = total_spend
+
+    def merge(self, other: Self) -> None:
+        """
+        Adds sums of other accumulator, that was filled with carts of different clients, to this one.
+        Merging accumulators in order of their clients gives the same results as accumulating all carts in one.
+        """
+        if set(other.metrics) != set(self.metrics):
+            raise ValueError("Accumulators have different metrics")
+
+        if self.spend is not None:
+            for client, spend in other.spend.items():
+                self.spend[client] = self.spend.get(client, 0) + spend
+        if self.age_matrix is not None:
+            self.age_matrix.merge(other.age_matrix)
+        if self.category_stats is not None:
+            for category, stats in other.category_stats.items():
+                self.category_stats.setdefault(category, CategoryStats(self.keep_prices)).merge(stats)
+        if self.category_quantities is not None:
+            for category, clients in other.category_quantities.items():
+                category_clients = self.category_quantities[category]
+                for client, quantity in clients.items():
+                    category_clients[client] = category_clients.get(client, 0) + quantity
+
+    def keep_leaders_only(self) -> None:
+        """
+        Drops sums that can't change leader metrics, so accumulator is smaller to send to other process.
+        Spend is reduced to clients with the biggest spend when no other metric needs it and quantities of each category
+        to its biggest clients. Reduced accumulator can be merged only with accumulators of different clients.
+        """
+        if self.spend and CLIENTS_WITH_CARTS_VALUE not in self.metrics \
+                and CLIENTS_BALANCES_AFTER_COMPLETING_ORDERS not in self.metrics:
+            self.spend = dict(top_n_with_ties(self.spend.items(), 1))
+        if self.category_quantities is not None:
+            self.category_quantities = {category: dict(top_n_with_ties(clients.items(), 1)) if clients else {}
+                                        for category, clients in self.category_quantities.items()}
+
+    def result(self, metric: str) -> Any:
+        """ :return: value of metric, same as the one returned by OrdersService method of metric name """
+        if metric not in self.metrics:
+            raise ValueError(f"Metric {metric} was not accumulated")
+
+        match metric:
+            case 'client_with_biggest_spend':
+                return [client for client, _ in top_n_with_ties(self.spend.items(), 1)] if self.spend else []
+            case 'clients_with_carts_value':
+                return {client: from_minor_units(spend) for client, spend in self.spend.items()}
+            case 'clients_balances_after_completing_orders':
+                return {client: client.balance_after_spending(from_minor_units(spend))
+                        for client, spend in self.spend.items()}
+            case 'most_popular_categories_for_clients_ages':
+                return {age: self.age_matrix.most_popular(age) for age in self.age_matrix.ages}
+            case 'categories_with_biggest_clients':
+                return {category: [client for client, _ in top_n_with_ties(clients.items(), 1)] if clients else []
+                        for category, clients in self.category_quantities.items()}
+            case 'categories_stats':
+                return self.categories_stats()
+
+    def results(self) -> dict[str, Any]:
+        """ :return: dict with name of each accumulated metric as a key and its value as a value """
+        return {metric: self.result(metric) for metric in self.metrics}
+
+    def categories_stats(self, extended: bool = False,
+                         percentiles: tuple[int | float | Decimal, ...] = ()) -> dict[Category, dict[str, Any]]:
+        """ :return: value of categories_stats metric, optionally with extra statistics, see CategoryStats.result() """
+        if self.category_stats is None:
+            raise ValueError(f"Metric {CATEGORIES_STATS} was not accumulated")
+        return {category: stats.result(extended, percentiles) for category, stats in self.category_stats.items()}
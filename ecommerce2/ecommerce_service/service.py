@@ -1,165 +1,417 @@
-from collections import defaultdict, Counter
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import date, datetime
 from decimal import Decimal
-from typing import Hashable
+from typing import Any, Iterable, Self
 
+from ecommerce2.ecommerce_service.age_matrix import AgeCategoryMatrix
+from ecommerce2.ecommerce_service.aggregates import OrdersAggregates
+from ecommerce2.ecommerce_service.catalog import ProductCatalog
+from ecommerce2.ecommerce_service.client_index import ClientFilter, ClientIndex, filtered_query
+from ecommerce2.ecommerce_service.cache import QueryCache, MISSING, cached_query, query_key
 from ecommerce2.ecommerce_service.model import Client, Product, Category
-from ecommerce2.common import get_n_top_elements_of_most_common_list, first_elements_having_same_value
+from ecommerce2.ecommerce_service.money import from_minor_units
+from ecommerce2.ecommerce_service.report import ReportAccumulator, REPORT_METRICS, CATEGORIES_STATS, \
+    CATEGORIES_WITH_BIGGEST_CLIENTS, CLIENTS_BALANCES_AFTER_COMPLETING_ORDERS, CLIENTS_WITH_CARTS_VALUE, \
+    MOST_POPULAR_CATEGORIES_FOR_CLIENTS_AGES
+from ecommerce2.ecommerce_service.snapshot import write_snapshot, read_snapshot_contents
+from ecommerce2.ecommerce_service.timeline import Timeline, to_timestamp, windowed_query
+from ecommerce2.common import top_n_with_ties
+from ecommerce2.instrumentation import instrumentation
 
 
 @dataclass(eq=False)
 class OrdersService:
     """
     OrdersService works on dict named 'orders' containing Client as a key and dict as a value.
-    Value dict has Product as a key and int representing quantity as a value
+    Value dict has Product as a key and int representing quantity as a value.
+    Once add_client(), add_order_line(), remove_order_line() or track_aggregates() is used, service keeps aggregates
+    that answer queries without scanning orders. From that moment orders must be changed only through those methods
+    or merge().
+    If cache is provided (see enable_cache()), query results are memoized until data version changes. Version is bumped
+    by mentioned methods and merge(), invalidate() has to be called after orders are changed directly.
+    Order lines that have order date are also kept in timeline. Every query accepts start and end keyword arguments,
+    which answer it only for dated lines of [start, end) window found by binary search in timeline, and where keyword
+    argument, which answers it only for clients matching ClientFilter, see find_clients().
     """
     orders: dict[Client, dict[Product, int]]
+    cache: QueryCache | None = field(default=None, repr=False)
+    timeline: Timeline = field(default_factory=Timeline, repr=False)
+    _aggregates: OrdersAggregates | None = field(default=None, init=False, repr=False)
+    _version: int = field(default=0, init=False, repr=False)
+    _client_index: ClientIndex | None = field(default=None, init=False, repr=False)
+    _age_matrix_of_version: tuple[int, AgeCategoryMatrix] | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        # clients of windows are ordered like clients of orders
+        for client in self.orders:
+            self.timeline.register(client)
 
-    def client_with_biggest_spend(self) -> list[Client]:
-        """
-        :return: List of one or more Clients that have biggest spend in all clients pool
-        """
-        if self.orders == {}:
-            return []
-
-        def _count_total_spend(client_cart: dict[Product, int]) -> Decimal:
-            total_spend = sum([product.cost_for_n(client_cart[product]) for product in client_cart])
-            return total_spend if isinstance(total_spend, Decimal) else Decimal(total_spend)
+    @property
+    def data_version(self) -> int:
+        """ Counter of orders changes, part of key of each cached query result """
+        return self._version
 
-        clients_and_total_spends = {}
+    def enable_cache(self, maxsize: int = 128) -> QueryCache:
+        """ Starts memoizing query results in new QueryCache of provided size, if service has no cache yet """
+        if self.cache is None:
+            self.cache = QueryCache(maxsize)
+        return self.cache
 
-        for client in self.orders:
-            clients_and_total_spends[client] = _count_total_spend(self.orders[client])
+    def invalidate(self) -> None:
+        """ Bumps data version, so results cached before are not used anymore, client index is rebuilt on next lookup """
+        self._client_index = None
+        self._bump_version()
 
-        clients_and_total_spends_descending: list[tuple[Client, Decimal]] = sorted(clients_and_total_spends.items(),
-                                                                                   key=lambda item: item[1],
-                                                                                   reverse=True)
-        idx = get_n_top_elements_of_most_common_list(clients_and_total_spends_descending)
-        return [client_and_spend[0] for client_and_spend in clients_and_total_spends_descending[:idx]]
+    def _bump_version(self) -> None:
+        self._version += 1
 
+    def find_clients(self, where: ClientFilter) -> list[Client]:
+        """
+        Finds clients by surname and name prefix and age range in secondary indexes, that are built on first lookup
+        and then kept up to date by add_client() and merge(), see ecommerce2.ecommerce_service.client_index
+        :return: matching clients in order of orders
+        """
+        if not isinstance(where, ClientFilter):
+            raise TypeError("Invalid client filter type")
+        if self._client_index is None:
+            self._client_index = ClientIndex.from_clients(self.orders)
+        return self._client_index.find(where)
+
+    @instrumentation.timed()
+    def save_snapshot(self, filepath: str) -> None:
+        """ Writes orders and dated lines of timeline to binary snapshot file, see ecommerce2.ecommerce_service.snapshot """
+        write_snapshot(filepath, self.orders, self.timeline)
+
+    @classmethod
+    @instrumentation.timed()
+    def load_snapshot(cls, filepath: str, catalog: ProductCatalog | None = None) -> Self:
+        """
+        Creates service out of snapshot written by save_snapshot(). Data is not validated again
+        :param catalog: if provided, products are interned in it
+        """
+        contents = read_snapshot_contents(filepath, catalog)
+        return cls(contents.orders, timeline=contents.timeline)
+
+    def track_aggregates(self) -> None:
+        """ Builds aggregates of current orders, so queries are answered from them from now on """
+        if self._aggregates is None:
+            self._aggregates = OrdersAggregates.from_orders(self.orders)
+
+    def add_client(self, client: Client) -> None:
+        """ Adds client with empty cart to orders """
+        if not isinstance(client, Client):
+            raise TypeError("Invalid client type")
+        if client in self.orders:
+            raise ValueError("Client already exists in orders")
+        self.track_aggregates()
+        self.orders[client] = {}
+        self._aggregates.add_client(client)
+        self.timeline.register(client)
+        if self._client_index is not None:
+            self._client_index.add(client)
+        self._bump_version()
+
+    def add_order_line(self, client: Client, product: Product, quantity: int = 1,
+                       order_date: datetime | date | str | None = None) -> None:
+        """
+        Adds quantity of product to cart of client that already exists in orders
+        :param order_date: if provided, line is added to timeline, see ecommerce2.ecommerce_service.timeline.to_timestamp
+        """
+        cart = self._cart_of(client)
+        if not isinstance(product, Product):
+            raise TypeError("Invalid product type")
+        self._check_quantity(quantity)
+        timestamp = None if order_date is None else to_timestamp(order_date)
+        self.track_aggregates()
+        previous_quantity = cart.get(product, 0)
+        cart[product] = previous_quantity + quantity
+        self._aggregates.add_line(client, product, quantity, previous_quantity)
+        if timestamp is not None:
+            self.timeline.add(timestamp, client, product, quantity)
+        self._bump_version()
+
+    def merge(self, orders: dict[Client, dict[Product, int]], timeline: Timeline | None = None) -> None:
+        """
+        Upserts orders, for example loaded from delta file. Clients that are not in orders yet are added after existing
+        ones, quantities of products that client already has in cart are summed. Work done is proportional to size of
+        merged orders, data that was loaded before isn't rebuilt and tracked aggregates are updated line by line.
+        :param orders: dict that has the same structure as OrdersService.orders
+        :param timeline: dated lines of merged orders, for example filled by OrdersLoader.load_from(), they are added
+                         to timeline of service
+        """
+        aggregates = self._aggregates
+        for client, cart in orders.items():
+            if not isinstance(client, Client):
+                raise TypeError("Invalid client type")
+            if (target := self.orders.get(client)) is None:
+                target = self.orders[client] = {}
+                self.timeline.register(client)
+                if aggregates is not None:
+                    aggregates.add_client(client)
+                if self._client_index is not None:
+                    self._client_index.add(client)
+            for product, quantity in cart.items():
+                if not isinstance(product, Product):
+                    raise TypeError("Invalid product type")
+                self._check_quantity(quantity)
+                previous_quantity = target.get(product, 0)
+                target[product] = previous_quantity + quantity
+                if aggregates is not None:
+                    aggregates.add_line(client, product, quantity, previous_quantity)
+        if timeline is not None:
+            for timestamp, client, product, quantity in timeline.lines_between():
+                self.timeline.add(timestamp, client, product, quantity)
+        self._bump_version()
+
+    def remove_order_line(self, client: Client, product: Product, quantity: int | None = None) -> None:
+        """
+        Removes quantity of product from client cart. Product is removed from cart when its quantity reaches 0.
+        Undated quantity is removed first, then quantity of the latest dated lines
+        :param quantity: quantity to remove, None removes whole line
+        """
+        cart = self._cart_of(client)
+        if product not in cart:
+            raise ValueError("Product does not exist in client cart")
+        previous_quantity = cart[product]
+        if quantity is None:
+            quantity = previous_quantity
+        self._check_quantity(quantity)
+        if quantity > previous_quantity:
+            raise ValueError("Quantity is greater than quantity in cart")
+        self.track_aggregates()
+        if quantity == previous_quantity:
+            del cart[product]
+        else:
+            cart[product] = previous_quantity - quantity
+        self._aggregates.remove_line(client, product, quantity, previous_quantity)
+        undated_quantity = previous_quantity - self.timeline.quantity_of(client, product)
+        if quantity > undated_quantity:
+            self.timeline.remove(client, product, quantity - undated_quantity)
+        self._bump_version()
+
+    def _cart_of(self, client: Client) -> dict[Product, int]:
+        if client not in self.orders:
+            raise ValueError("Client does not exist in orders")
+        return self.orders[client]
+
+    @staticmethod
+    def _check_quantity(quantity: int) -> None:
+        if not isinstance(quantity, int):
+            raise TypeError("Invalid quantity type")
+        if quantity < 1:
+            raise ValueError("Quantity has to be greater than 0")
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
+    def client_with_biggest_spend(self) -> list[Client]:
+        """
+        :return: List of one or more Clients that have biggest spend in all clients pool
+        """
+        if self._aggregates is not None:
+            return self._aggregates.spend.leaders()
+        return [client for client, _ in self.top_clients_by_spend(1)]
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
     def client_with_biggest_spend_in_category(self, category: Category) -> list[Client]:
         """
         :param category: to check available categories find ecommerce2.ecommerce_service.model.Category enum
         :return: List of one or more Clients that have biggest spend on products that match provided Category
         """
-        if self.orders == {}:
+        if self._aggregates is not None:
+            leaderboard = self._aggregates.category_spend[category]
+            return leaderboard.leaders() if leaderboard.max_value() else []
+        top = self.top_clients_by_spend(1, category)
+        if not top or top[0][1] == Decimal('0'):
             return []
+        return [client for client, _ in top]
 
-        def _count_total_spend_in_category(client_cart: dict[Product, int]) -> Decimal:
-            """
-            Auxiliary function that counts total spend of client on products that have same category as in superior functions argument
-            :param client_cart: value of orders dict for particular client
-            :return: Total spend on products with certain category
-            """
-            total_spend = sum(
-                [product.cost_for_n(client_cart[product]) for product in client_cart if product.category == category])
-            return total_spend if isinstance(total_spend, Decimal) else Decimal(total_spend)
-
-        clients_and_total_spends_in_category = {}
-
-        for client in self.orders:
-            clients_and_total_spends_in_category[client] = _count_total_spend_in_category(self.orders[client])
-
-        clients_and_total_spends_in_category_descending: list[tuple[Client, Decimal]] = sorted(
-            clients_and_total_spends_in_category.items(),
-            key=lambda item: item[1],
-            reverse=True)
-        if clients_and_total_spends_in_category_descending[0][1] == Decimal('0'):
-            return []
-        idx = get_n_top_elements_of_most_common_list(clients_and_total_spends_in_category_descending)
-        return [client_and_spend[0] for client_and_spend in clients_and_total_spends_in_category_descending[:idx]]
-
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
+    def top_clients_by_spend(self, k: int, category: Category | None = None) -> list[tuple[Client, Decimal]]:
+        """
+        :param k: number of clients to select, clients tied with k-th one are also selected
+        :param category: if provided, only spend on products of that Category counts and only clients that bought
+                         products of that Category are taken into account
+        :return: list of (Client, spend) pairs ordered descending by spend, tied clients are in order of orders
+        """
+        if self._aggregates is not None:
+            leaderboard = self._aggregates.spend if category is None else self._aggregates.category_spend[category]
+            top = leaderboard.top(k)
+        else:
+            if category is None:
+                clients_and_spends = ReportAccumulator.from_orders(self.orders, [CLIENTS_WITH_CARTS_VALUE]).spend
+            else:
+                clients_and_spends = {}
+                for client, cart in self.orders.items():
+                    costs = [product.price_minor * quantity for product, quantity in cart.items()
+                             if product.category == category]
+                    if costs:
+                        clients_and_spends[client] = sum(costs)
+            top = top_n_with_ties(clients_and_spends.items(), k)
+        return [(client, from_minor_units(spend)) for client, spend in top]
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
+    def top_clients_by_quantity(self, k: int, category: Category) -> list[tuple[Client, int]]:
+        """
+        :param k: number of clients to select, clients tied with k-th one are also selected
+        :param category: only quantities of products of that Category count
+        :return: list of (Client, quantity) pairs ordered descending by quantity, tied clients are in order of orders
+        """
+        if self._aggregates is not None:
+            return self._aggregates.category_quantity[category].top(k)
+
+        clients_and_quantities = {}
+        for client, cart in self.orders.items():
+            quantities = [quantity for product, quantity in cart.items() if product.category == category]
+            if quantities:
+                clients_and_quantities[client] = sum(quantities)
+        return top_n_with_ties(clients_and_quantities.items(), k)
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
     def most_popular_categories_for_clients_ages(self) -> dict[int, list[Category]]:
         """
         Prepares list of one or more Categories are most popular for each age occurrence.
-        Data is stored in dict where age is a key and a list of Categories is a value.
+        Data is stored in dict where age is a key and a list of Categories is a value, tied Categories are in
+        Category order.
         """
-        ages_with_categories = defaultdict(list)
-
-        for client in self.orders.keys():
-            ages_with_categories[client.age].extend([product.category for product in self.orders[client].keys()])
-
-        ages_with_categories = dict(ages_with_categories)
-        ages_with_top_categories = {}
-        for age in ages_with_categories:
-            ages_with_top_categories[age] = Counter(ages_with_categories[age]).most_common()
-            idx = get_n_top_elements_of_most_common_list(ages_with_top_categories[age])
-            ages_with_top_categories[age] = [pair[0] for pair in ages_with_top_categories[age][:idx]]
-
-        return ages_with_top_categories
-
-    def categories_stats(self) -> dict[Category, dict[str, Decimal | list[Product]]]:
+        if self._aggregates is not None:
+            return {age: self._aggregates.most_popular_categories(age) for age in self._aggregates.age_categories}
+        return self._scan(MOST_POPULAR_CATEGORIES_FOR_CLIENTS_AGES)
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
+    def most_popular_categories_for_age_range(self, min_age: int, max_age: int) -> list[Category]:
+        """
+        :param min_age: first age of range
+        :param max_age: last age of range, inclusive
+        :return: list of one or more Categories bought most often by clients of [min_age, max_age] range, in Category
+                 order, empty if clients of that range didn't buy anything
+        """
+        return self._age_matrix().most_popular_in_range(min_age, max_age)
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
+    def most_popular_categories_for_age_buckets(self, bucket_size: int,
+                                                origin: int = 0) -> dict[tuple[int, int], list[Category]]:
+        """
+        Prepares list of one or more most popular Categories for each bucket of bucket_size consecutive ages,
+        buckets start from origin age, for example bucket_size=10 and origin=18 gives buckets 18-27, 28-37 and so on.
+        :return: dict with (first age, last age) of bucket as a key and list of Categories as a value,
+                 only buckets having at least one client are present
+        """
+        return self._age_matrix().most_popular_in_buckets(bucket_size, origin)
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
+    def categories_stats(self, extended: bool = False,
+                         percentiles: tuple[int | float | Decimal, ...] = ()) -> dict[Category, dict[str, Any]]:
         """ Creates statistical data on each Category that is currently used in orders. Value for each Category contains
             dict with three items: price mean, most expensive product and cheapest product. First is Decimal value, second
-            and third are lists of one or more Product
+            and third are lists of one or more Product. Stats of all categories are accumulated in single pass.
+            :param extended: adds price_median and price_stddev items
+            :param percentiles: tuple of percents from 0 to 100, adds price_percentiles dict with percent as a key
         """
-        if self.orders == {}:
-            return {}
-
-        category_with_products = defaultdict(set)
-        for client in self.orders:
-            for product in self.orders[client]:
-                category_with_products[product.category].add(product)
-        category_with_stats = {}
-
-        for category in category_with_products:
-            products = list(category_with_products[category])
-            category_with_stats[category] = {
-                    "price_mean": sum([product.price for product in products]) / len(products),
-                    "most_expensive_product": first_elements_having_same_value(sorted(products, key=lambda p: p.price, reverse=True)),
-                    "cheapest_product": first_elements_having_same_value(sorted(products, key=lambda p: p.price))
-                }
-        return dict(category_with_stats)
-
+        if not extended and not percentiles:
+            return self._scan(CATEGORIES_STATS)
+        accumulator = ReportAccumulator.from_orders(self.orders, [CATEGORIES_STATS], keep_prices=True)
+        return accumulator.categories_stats(extended, percentiles)
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
     def categories_with_biggest_clients(self) -> dict[Category, list[Client]]:
         """ Creates dict with Category as a key and list of one or more Clients that have the biggest quantity of bought
             products in that particular Category
         """
-        def add_counter_as_value(container: dict, key_value: Hashable) -> None:
-            container[key_value] = Counter()
-
-        def update_container_with_client_cart_data(container: dict, key_value: Hashable) -> None:
-            for product in self.orders[key_value]:
-                container[product.category][key_value] += self.orders[key_value][product]
-
-        def arrange_biggest_buyers_to_category(container: dict) -> None:
-            for category in container:
-                clients = container[category].most_common()
-                if not clients:
-                    container[category] = []
-                    continue
-                idx = get_n_top_elements_of_most_common_list(clients)
-
-                container[category] = [client for client, _ in clients][:idx]
-
-        categories_with_clients = {}
-
-        for category_ in Category:
-            add_counter_as_value(categories_with_clients, category_)
-
-        for client in self.orders:
-            update_container_with_client_cart_data(categories_with_clients, client)
-
-        arrange_biggest_buyers_to_category(categories_with_clients)
-
-        return categories_with_clients
-
+        if self._aggregates is not None:
+            return {category: leaderboard.leaders()
+                    for category, leaderboard in self._aggregates.category_quantity.items()}
+        return self._scan(CATEGORIES_WITH_BIGGEST_CLIENTS)
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
     def clients_with_carts_value(self) -> dict[Client, Decimal]:
         """ Calculates total spend for each Client and returns dict with Client as a key and his total spend as a value"""
-        container = {}
-        for client in self.orders:
-            container[client] = sum([product.cost_for_n(q) for product, q in self.orders[client].items()])
-
-        return container
-
+        if self._aggregates is not None:
+            return {client: from_minor_units(spend) for client, spend in self._aggregates.spend.values.items()}
+        return self._scan(CLIENTS_WITH_CARTS_VALUE)
+
+    @instrumentation.timed()
+    @cached_query
+    @windowed_query
+    @filtered_query
     def clients_balances_after_completing_orders(self) -> dict[Client, Decimal]:
         """ Calculates balance of each client if his cart would be processed. Dict with Client as a key,
-            and balance subtracted from cart value
+            and balance subtracted from cart value. Cart values are reused if they are cached or tracked in aggregates
         """
-        container = {}
-        clients_with_spend = self.clients_with_carts_value()
-
-        for client in self.orders:
-            container[client] = client.balance_after_spending(clients_with_spend[client])
-
-        return container
+        if self._aggregates is None and self.cache is None:
+            return self._scan(CLIENTS_BALANCES_AFTER_COMPLETING_ORDERS)
+        return {client: client.balance_after_spending(spend)
+                for client, spend in self.clients_with_carts_value().items()}
+
+    @instrumentation.timed()
+    def compute_report(self, metrics: Iterable[str] = REPORT_METRICS, start: datetime | date | str | None = None,
+                       end: datetime | date | str | None = None, where: ClientFilter | None = None) -> dict[str, Any]:
+        """
+        Computes many metrics at once. Without tracked aggregates all of them are computed in single pass over orders,
+        sharing intermediate sums. Metrics that are already cached are not computed again.
+        :param metrics: names of OrdersService methods, available names are in ecommerce2.ecommerce_service.report.REPORT_METRICS
+        :param start: beginning of time window, see windowed_query()
+        :param end: end of time window, see windowed_query()
+        :param where: restricts report to matching clients, see filtered_query()
+        :return: dict with metric name as a key and value that method of that name would return as a value
+        """
+        if start is not None or end is not None:
+            return self.__class__(self.timeline.orders_between(start, end)).compute_report(metrics, where=where)
+        if where is not None:
+            return self.__class__({client: self.orders[client] for client in self.find_clients(where)}
+                                  ).compute_report(metrics)
+        metrics = ReportAccumulator(metrics).metrics
+        if self._aggregates is not None:
+            return {metric: getattr(self, metric)() for metric in metrics}
+        if self.cache is None:
+            return ReportAccumulator.from_orders(self.orders, metrics).results()
+
+        report = {metric: self.cache.get(query_key(metric, (), {}, self._version), MISSING) for metric in metrics}
+        if missing := [metric for metric, value in report.items() if value is MISSING]:
+            accumulator = ReportAccumulator.from_orders(self.orders, missing)
+            for metric in missing:
+                report[metric] = accumulator.result(metric)
+                self.cache.put(query_key(metric, (), {}, self._version), report[metric])
+        return report
+
+    def _age_matrix(self) -> AgeCategoryMatrix:
+        """ Age x Category matrix of current orders, shared by age range queries while data version doesn't change """
+        if self._age_matrix_of_version is None or self._age_matrix_of_version[0] != self._version:
+            if self._aggregates is not None:
+                matrix = AgeCategoryMatrix.from_counts(self._aggregates.age_categories)
+            else:
+                matrix = AgeCategoryMatrix.from_orders(self.orders)
+            self._age_matrix_of_version = (self._version, matrix)
+        return self._age_matrix_of_version[1]
+
+    def _scan(self, metric: str) -> Any:
+        """ Computes single metric by passing over orders """
+        return ReportAccumulator.from_orders(self.orders, [metric]).result(metric)
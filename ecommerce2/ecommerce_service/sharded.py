@@ -0,0 +1,163 @@
+import multiprocessing
+from functools import partial
+from typing import Any, Callable, Iterable, Self
+
+from ecommerce2.ecommerce_service.model import Client, Product, Category
+from ecommerce2.ecommerce_service.report import ReportAccumulator, REPORT_METRICS, CLIENT_WITH_BIGGEST_SPEND, \
+    CATEGORIES_STATS, MOST_POPULAR_CATEGORIES_FOR_CLIENTS_AGES, CATEGORIES_WITH_BIGGEST_CLIENTS, \
+    CLIENTS_WITH_CARTS_VALUE, CLIENTS_BALANCES_AFTER_COMPLETING_ORDERS
+
+""" Module stores OrdersService partitioned by clients across many processes """
+
+
+def _given_orders(orders: dict[Client, dict[Product, int]]) -> dict[Client, dict[Product, int]]:
+    return orders
+
+
+def _orders_from_files(filepaths: list[str]) -> dict[Client, dict[Product, int]]:
+    from ecommerce2.loader.json_loader import iter_file
+    from ecommerce2.loader.orders_loader import OrdersLoader
+
+    orders = {}
+    for filepath in filepaths:
+        for client, cart in OrdersLoader.load_from(iter_file(filepath)).items():
+            OrdersLoader.add_cart(orders, client, cart)
+    return orders
+
+
+def _shard_main(connection, load_orders: Callable[[], dict[Client, dict[Product, int]]]) -> None:
+    """
+    Loop of shard process. Shard keeps its part of orders and answers requests of coordinator:
+    ('report', metrics) with partial ReportAccumulator, ('close',) ends the process.
+    Leader metrics need only local leaders of shard, because each client belongs to single shard.
+    """
+    try:
+        orders = load_orders()
+        connection.send(('ready', len(orders)))
+    except Exception as e:
+        connection.send(('error', e))
+        return
+
+    while True:
+        request, *args = connection.recv()
+        if request == 'close':
+            break
+        try:
+            accumulator = ReportAccumulator.from_orders(orders, *args)
+            accumulator.keep_leaders_only()
+            connection.send(('ok', accumulator))
+        except Exception as e:
+            connection.send(('error', e))
+    connection.close()
+
+
+class ShardedOrdersService:
+    """
+    Orders partitioned by clients across shard processes. Each shard holds contiguous part of clients and computes
+    partial ReportAccumulator of its orders, coordinator merges them in shard order, so results (including order
+    of tied clients) are exactly the same as OrdersService results for all orders.
+    Each client has to belong to single shard. Service has to be closed, it can be used as context manager.
+    """
+
+    def __init__(self, loaders: list[Callable[[], dict[Client, dict[Product, int]]]]):
+        """ :param loaders: picklable functions, one per shard, that return orders of shard inside shard process """
+        if not loaders:
+            raise ValueError("At least one shard is needed")
+        context = multiprocessing.get_context()
+        self._connections = []
+        self._processes = []
+        for load_orders in loaders:
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(target=_shard_main, args=(child_connection, load_orders), daemon=True)
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+        try:
+            self.shard_sizes = [self._receive(connection) for connection in self._connections]
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def from_orders(cls, orders: dict[Client, dict[Product, int]], shards: int) -> Self:
+        """ Splits orders into shards having contiguous, nearly equal parts of clients """
+        if not isinstance(shards, int) or shards < 1:
+            raise ValueError("Number of shards has to be positive integer")
+        clients = list(orders)
+        bounds = [len(clients) * idx // shards for idx in range(shards + 1)]
+        return cls([partial(_given_orders, {client: orders[client] for client in clients[start:end]})
+                    for start, end in zip(bounds, bounds[1:])])
+
+    @classmethod
+    def from_files(cls, filepaths: list[str], shards: int) -> Self:
+        """ Each shard loads contiguous group of json files by itself, files can't share clients """
+        if not isinstance(shards, int) or shards < 1:
+            raise ValueError("Number of shards has to be positive integer")
+        shards = min(shards, len(filepaths)) or 1
+        bounds = [len(filepaths) * idx // shards for idx in range(shards + 1)]
+        return cls([partial(_orders_from_files, filepaths[start:end]) for start, end in zip(bounds, bounds[1:])])
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """ Stops shard processes """
+        for connection, process in zip(self._connections, self._processes):
+            if process.is_alive():
+                try:
+                    connection.send(('close',))
+                except (BrokenPipeError, OSError):
+                    pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        self._connections, self._processes = [], []
+
+    @staticmethod
+    def _receive(connection) -> Any:
+        status, value = connection.recv()
+        if status == 'error':
+            raise value
+        return value
+
+    def partial_reports(self, metrics: Iterable[str] = REPORT_METRICS) -> list[ReportAccumulator]:
+        """ :return: partial accumulators of all shards in shard order, shards compute them at the same time """
+        metrics = ReportAccumulator(metrics).metrics
+        if not self._connections:
+            raise ValueError("Service is closed")
+        for connection in self._connections:
+            connection.send(('report', metrics))
+        return [self._receive(connection) for connection in self._connections]
+
+    def compute_report(self, metrics: Iterable[str] = REPORT_METRICS) -> dict[str, Any]:
+        """ Same as OrdersService.compute_report() computed by all shards and merged """
+        accumulator, *others = self.partial_reports(metrics)
+        for other in others:
+            accumulator.merge(other)
+        return accumulator.results()
+
+    def _metric(self, metric: str) -> Any:
+        return self.compute_report([metric])[metric]
+
+    def client_with_biggest_spend(self) -> list[Client]:
+        return self._metric(CLIENT_WITH_BIGGEST_SPEND)
+
+    def most_popular_categories_for_clients_ages(self) -> dict[int, list[Category]]:
+        return self._metric(MOST_POPULAR_CATEGORIES_FOR_CLIENTS_AGES)
+
+    def categories_stats(self) -> dict[Category, dict[str, Any]]:
+        return self._metric(CATEGORIES_STATS)
+
+    def categories_with_biggest_clients(self) -> dict[Category, list[Client]]:
+        return self._metric(CATEGORIES_WITH_BIGGEST_CLIENTS)
+
+    def clients_with_carts_value(self) -> dict[Client, Any]:
+        return self._metric(CLIENTS_WITH_CARTS_VALUE)
+
+    def clients_balances_after_completing_orders(self) -> dict[Client, Any]:
+        return self._metric(CLIENTS_BALANCES_AFTER_COMPLETING_ORDERS)
@@ -0,0 +1,254 @@
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Final, Iterator
+
+from ecommerce2.ecommerce_service.catalog import ProductCatalog
+from ecommerce2.ecommerce_service.model import Client, Product, Category
+from ecommerce2.ecommerce_service.timeline import Timeline
+
+"""
+Module stores binary snapshot of orders, that is loaded without parsing json and validating data again.
+
+Layout: 24 bytes header (magic, format version, byte order of columns, crc32 of body, body length) followed by body.
+Body is a sequence of columns in order of COLUMNS, each of them is 8 bytes little endian count of items followed by
+items in byte order from header, padded to 8 bytes, so every column is read straight from memory mapped file through
+memoryview cast, without copying it (only columns written with other byte order are copied and swapped).
+Strings are interned in single table (offsets and utf-8 blob) and referenced by their position. Decimals are kept
+as int coefficient and exponent.
+Client table and product table are followed by order lines, lines of each client are consecutive and in cart order.
+Version 2 adds dated order lines of timeline (microseconds since epoch of naive UTC timestamp), version 1 is still read.
+"""
+
+MAGIC: Final = b'EC2S'
+VERSION: Final = 2
+HEADER: Final = struct.Struct('<4sHB1xIQ4x')
+_COUNT: Final = struct.Struct('<q')
+_BYTE_ORDERS: Final = ('little', 'big')
+
+COLUMNS: Final = (
+    ('string_offsets', 'q'),
+    ('string_blob', 'B'),
+    ('client_names', 'i'),
+    ('client_surnames', 'i'),
+    ('client_ages', 'i'),
+    ('client_balance_coefficients', 'q'),
+    ('client_balance_exponents', 'b'),
+    ('product_names', 'i'),
+    ('product_categories', 'B'),
+    ('product_price_coefficients', 'q'),
+    ('product_price_exponents', 'b'),
+    ('line_clients', 'i'),
+    ('line_products', 'i'),
+    ('line_quantities', 'q'),
+    ('dated_clients', 'i'),
+    ('dated_products', 'i'),
+    ('dated_quantities', 'q'),
+    ('dated_timestamps', 'q'),
+)
+_VERSION_COLUMNS: Final = {1: COLUMNS[:14], 2: COLUMNS}
+_EPOCH: Final = datetime(1970, 1, 1)
+_MICROSECOND: Final = timedelta(microseconds=1)
+
+
+@dataclass
+class SnapshotContents:
+    """ Orders read from snapshot together with their dated lines, timeline is empty for version 1 snapshot """
+    orders: dict[Client, dict[Product, int]]
+    timeline: Timeline = field(default_factory=Timeline)
+
+
+def _decimal_parts(value: Decimal) -> tuple[int, int]:
+    """ :return: int coefficient and exponent, Decimal(coefficient).scaleb(exponent) is equal to value """
+    exponent = value.as_tuple().exponent
+    return int(value.scaleb(-exponent)), exponent
+
+
+def _columns_of(orders: dict[Client, dict[Product, int]], timeline: Timeline | None) -> dict[str, array]:
+    columns = {name: array(typecode) for name, typecode in COLUMNS}
+    string_ids: dict[str, int] = {}
+    blob = bytearray()
+    offsets = columns['string_offsets']
+    offsets.append(0)
+
+    def string_id(value: str) -> int:
+        if (idx := string_ids.get(value)) is None:
+            idx = string_ids[value] = len(string_ids)
+            blob.extend(value.encode())
+            offsets.append(len(blob))
+        return idx
+
+    product_ids: dict[Product, int] = {}
+
+    def product_id_of(product: Product) -> int:
+        if (product_id := product_ids.get(product)) is None:
+            product_id = product_ids[product] = len(product_ids)
+            columns['product_names'].append(string_id(product.name))
+            columns['product_categories'].append(product.category.value)
+            coefficient, exponent = _decimal_parts(product.price)
+            columns['product_price_coefficients'].append(coefficient)
+            columns['product_price_exponents'].append(exponent)
+        return product_id
+
+    client_ids: dict[Client, int] = {}
+    for client_id, (client, cart) in enumerate(orders.items()):
+        client_ids[client] = client_id
+        columns['client_names'].append(string_id(client.name))
+        columns['client_surnames'].append(string_id(client.surname))
+        columns['client_ages'].append(client.age)
+        coefficient, exponent = _decimal_parts(client.balance)
+        columns['client_balance_coefficients'].append(coefficient)
+        columns['client_balance_exponents'].append(exponent)
+
+        for product, quantity in cart.items():
+            columns['line_clients'].append(client_id)
+            columns['line_products'].append(product_id_of(product))
+            columns['line_quantities'].append(quantity)
+
+    if timeline is not None:
+        for timestamp, client, product, quantity in timeline.lines_between():
+            if client not in client_ids:
+                raise ValueError("Dated line of client that is not in orders")
+            columns['dated_clients'].append(client_ids[client])
+            columns['dated_products'].append(product_id_of(product))
+            columns['dated_quantities'].append(quantity)
+            columns['dated_timestamps'].append((timestamp - _EPOCH) // _MICROSECOND)
+
+    columns['string_blob'].frombytes(blob)
+    return columns
+
+
+def write_snapshot(filepath: str, orders: dict[Client, dict[Product, int]], timeline: Timeline | None = None) -> None:
+    """
+    Writes orders to snapshot file. File is replaced atomically, so reader never sees partially written snapshot
+    :param orders: dict that has the same structure as OrdersService.orders
+    :param timeline: if provided, its dated lines are written too, their clients have to be in orders
+    """
+    try:
+        columns = _columns_of(orders, timeline)
+    except OverflowError:
+        raise ValueError("Orders values don't fit snapshot columns")
+
+    body = bytearray()
+    for name, _ in COLUMNS:
+        column = columns[name]
+        body += _COUNT.pack(len(column))
+        body += column.tobytes()
+        body += bytes(-len(body) % 8)
+
+    header = HEADER.pack(MAGIC, VERSION, _BYTE_ORDERS.index(sys.byteorder), zlib.crc32(body), len(body))
+    temporary_path = f'{filepath}.tmp'
+    with open(temporary_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+    os.replace(temporary_path, filepath)
+
+
+def read_snapshot(filepath: str, catalog: ProductCatalog | None = None) -> dict[Client, dict[Product, int]]:
+    """
+    Reads orders from snapshot file. Checksum of body is verified, but values are not validated again,
+    as they were valid when snapshot was written
+    :param catalog: if provided, products are interned in it
+    :return: dict that has the same structure as OrdersService.orders, in the same order as written one
+    """
+    return read_snapshot_contents(filepath, catalog).orders
+
+
+def read_snapshot_contents(filepath: str, catalog: ProductCatalog | None = None) -> SnapshotContents:
+    """ Works like read_snapshot(), but also returns timeline of dated lines that were written """
+    try:
+        f = open(filepath, 'rb')
+    except FileNotFoundError:
+        raise ValueError("Invalid filepath")
+
+    with f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError("Invalid snapshot file")
+        # objects are built while file is mapped, views of columns are released before mapping is closed
+        with mapped, ExitStack() as views:
+            return _contents_of(_read_columns(mapped, views), catalog)
+
+
+def _read_columns(mapped: mmap.mmap, views: ExitStack) -> dict[str, memoryview | array]:
+    if len(mapped) < HEADER.size:
+        raise ValueError("Invalid snapshot file")
+    magic, version, byte_order, checksum, length = HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise ValueError("Invalid snapshot file")
+    if version not in _VERSION_COLUMNS:
+        raise ValueError("Unsupported snapshot version")
+    if len(mapped) != HEADER.size + length:
+        raise ValueError("Invalid snapshot file")
+
+    body = views.enter_context(views.enter_context(memoryview(mapped))[HEADER.size:])
+    if zlib.crc32(body) != checksum:
+        raise ValueError("Snapshot checksum mismatch")
+    swap = _BYTE_ORDERS[byte_order] != sys.byteorder
+    return dict(_iter_columns(body, swap, _VERSION_COLUMNS[version], views))
+
+
+def _iter_columns(body: memoryview, swap: bool, columns: tuple[tuple[str, str], ...],
+                  views: ExitStack) -> Iterator[tuple[str, memoryview | array]]:
+    """ :return: iterator of (name, column), column is view of body cast to its type, or swapped copy """
+    position = 0
+    for name, typecode in columns:
+        count = _COUNT.unpack_from(body, position)[0]
+        position += _COUNT.size
+        size = count * array(typecode).itemsize
+        if count < 0 or position + size > len(body):
+            raise ValueError("Invalid snapshot file")
+        data = views.enter_context(body[position:position + size])
+        if swap and typecode != 'B':
+            column = array(typecode, data.tobytes())
+            column.byteswap()
+            yield name, column
+        else:
+            yield name, views.enter_context(data.cast(typecode))
+        position += size + (-size % 8)
+
+
+def _contents_of(columns: dict[str, memoryview | array], catalog: ProductCatalog | None) -> SnapshotContents:
+    offsets = columns['string_offsets']
+    blob = columns['string_blob']
+    strings = [str(blob[start:end], 'utf-8') for start, end in zip(offsets, offsets[1:])]
+    decimals: dict[tuple[int, int], Decimal] = {}
+
+    def decimal_of(coefficient: int, exponent: int) -> Decimal:
+        if (value := decimals.get((coefficient, exponent))) is None:
+            value = decimals[coefficient, exponent] = Decimal(coefficient).scaleb(exponent)
+        return value
+
+    clients = [Client(strings[name], strings[surname], age, decimal_of(coefficient, exponent))
+               for name, surname, age, coefficient, exponent in zip(
+                   columns['client_names'], columns['client_surnames'], columns['client_ages'],
+                   columns['client_balance_coefficients'], columns['client_balance_exponents'])]
+    products = [Product(strings[name], Category(category), decimal_of(coefficient, exponent))
+                for name, category, coefficient, exponent in zip(
+                    columns['product_names'], columns['product_categories'],
+                    columns['product_price_coefficients'], columns['product_price_exponents'])]
+    if catalog is not None:
+        products = [catalog.intern(product) for product in products]
+
+    orders = {client: {} for client in clients}
+    carts = list(orders.values())
+    for client_id, product_id, quantity in zip(columns['line_clients'], columns['line_products'],
+                                               columns['line_quantities']):
+        carts[client_id][products[product_id]] = quantity
+
+    contents = SnapshotContents(orders)
+    for client in clients:
+        contents.timeline.register(client)
+    for client_id, product_id, quantity, timestamp in zip(
+            columns.get('dated_clients', ()), columns.get('dated_products', ()), columns.get('dated_quantities', ()),
+            columns.get('dated_timestamps', ())):
+        contents.timeline.add(_EPOCH + timestamp * _MICROSECOND, clients[client_id], products[product_id], quantity)
+    return contents
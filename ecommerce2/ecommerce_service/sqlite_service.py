@@ -0,0 +1,323 @@
+import sqlite3
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Iterable, Self
+
+from ecommerce2.ecommerce_service.model import Client, Product, Category
+from ecommerce2.ecommerce_service.money import from_minor_units
+from ecommerce2.ecommerce_service.report import ReportAccumulator, REPORT_METRICS
+
+""" Module stores OrdersService backend that keeps orders in sqlite database and computes queries in SQL """
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    surname TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    balance TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    category INTEGER NOT NULL,
+    price TEXT NOT NULL,
+    price_minor INTEGER NOT NULL,
+    UNIQUE (name, category, price_minor)
+);
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    client_id INTEGER NOT NULL REFERENCES clients (id),
+    product_id INTEGER NOT NULL REFERENCES products (id),
+    quantity INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clients_name_surname ON clients (name, surname);
+CREATE INDEX IF NOT EXISTS clients_age ON clients (age);
+CREATE INDEX IF NOT EXISTS products_category ON products (category);
+CREATE INDEX IF NOT EXISTS lines_client ON lines (client_id, product_id, quantity);
+CREATE INDEX IF NOT EXISTS lines_product ON lines (product_id, client_id, quantity);
+"""
+
+_CLIENT_SPEND = """
+SELECT clients.id AS client_id, COALESCE(SUM(lines.quantity * products.price_minor), 0) AS value
+FROM clients
+LEFT JOIN lines ON lines.client_id = clients.id
+LEFT JOIN products ON products.id = lines.product_id
+GROUP BY clients.id
+"""
+
+_CATEGORY_SPEND = """
+SELECT lines.client_id AS client_id, SUM(lines.quantity * products.price_minor) AS value
+FROM lines JOIN products ON products.id = lines.product_id
+WHERE products.category = :category
+GROUP BY lines.client_id
+"""
+
+_CATEGORY_QUANTITY = """
+SELECT lines.client_id AS client_id, SUM(lines.quantity) AS value
+FROM lines JOIN products ON products.id = lines.product_id
+WHERE products.category = :category
+GROUP BY lines.client_id
+"""
+
+_TOP_WITH_TIES = """
+WITH ranked AS ({values})
+SELECT clients.*, ranked.value FROM ranked JOIN clients ON clients.id = ranked.client_id
+WHERE ranked.value >= COALESCE(
+    (SELECT value FROM ranked ORDER BY value DESC LIMIT 1 OFFSET :offset),
+    (SELECT MIN(value) FROM ranked)
+)
+ORDER BY ranked.value DESC, ranked.client_id
+"""
+
+_MOST_POPULAR_CATEGORIES = """
+WITH counts AS (
+    SELECT clients.age AS age, products.category AS category, COUNT(*) AS lines
+    FROM lines
+    JOIN clients ON clients.id = lines.client_id
+    JOIN products ON products.id = lines.product_id
+    GROUP BY clients.age, products.category
+), ranked AS (
+    SELECT age, category, lines, MAX(lines) OVER (PARTITION BY age) AS top FROM counts
+), ages AS (
+    SELECT age, MIN(id) AS first_client FROM clients GROUP BY age
+)
+SELECT ages.age, ranked.category
+FROM ages
+LEFT JOIN ranked ON ranked.age = ages.age AND ranked.lines = ranked.top
+ORDER BY ages.first_client, ranked.category
+"""
+
+_CATEGORIES_STATS = """
+WITH category_products AS (
+    SELECT products.*, MIN(lines.id) AS first_line
+    FROM lines JOIN products ON products.id = lines.product_id
+    GROUP BY products.id
+), stats AS (
+    SELECT category, SUM(price_minor) AS total, COUNT(*) AS products, MAX(price_minor) AS highest,
+           MIN(price_minor) AS lowest, MIN(first_line) AS first_line
+    FROM category_products GROUP BY category
+)
+SELECT stats.category, stats.total, stats.products, category_products.name, category_products.price,
+       category_products.price_minor = stats.highest, category_products.price_minor = stats.lowest
+FROM stats JOIN category_products ON category_products.category = stats.category
+    AND category_products.price_minor IN (stats.highest, stats.lowest)
+ORDER BY stats.first_line, category_products.first_line
+"""
+
+_BIGGEST_CLIENTS = """
+WITH quantities AS (
+    SELECT products.category AS category, lines.client_id AS client_id, SUM(lines.quantity) AS quantity
+    FROM lines JOIN products ON products.id = lines.product_id
+    GROUP BY products.category, lines.client_id
+), ranked AS (
+    SELECT category, client_id, quantity, MAX(quantity) OVER (PARTITION BY category) AS top FROM quantities
+)
+SELECT ranked.category, clients.*
+FROM ranked JOIN clients ON clients.id = ranked.client_id
+WHERE ranked.quantity = ranked.top
+ORDER BY ranked.client_id
+"""
+
+
+class SqliteOrdersService:
+    """
+    Stores the same data as OrdersService in sqlite database (file or memory), so orders don't have to fit in RAM.
+    Clients, products and order lines are indexed tables, every query is computed by single SQL aggregate
+    and returns the same results as OrdersService method, including order of tied clients.
+    Prices are kept as text (exact Decimal) and int minor units used by aggregates.
+    Service has to be closed, it can be used as context manager.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        """ :param path: path of database file, existing database is opened with its orders """
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+        self._product_ids: dict[Product, int] = {}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM clients").fetchone()[0]
+
+    @classmethod
+    def from_orders(cls, orders: dict[Client, dict[Product, int]], path: str = ':memory:') -> Self:
+        """ Creates sqlite service out of dict that has the same structure as OrdersService.orders """
+        service = cls(path)
+        service.add_records(orders.items())
+        return service
+
+    def add_client_cart(self, client: Client, cart: dict[Product, int]) -> None:
+        """ Adds client and all products of his cart as order lines """
+        self.add_records([(client, cart)])
+
+    def add_records(self, records: Iterable[tuple[Client, dict[Product, int]]], batch_size: int = 10000) -> None:
+        """
+        Bulk inserts clients with their carts, batch of records is inserted in single transaction
+        :param records: pairs of Client and cart, for example built by OrdersLoader.build_record(), consumed lazily
+        :param batch_size: number of records inserted at once
+        """
+        records = iter(records)
+        while batch := list(islice(records, batch_size)):
+            try:
+                with self.connection:
+                    self._insert_batch(batch)
+            except Exception:
+                # ids of products inserted by rolled back transaction are not valid anymore
+                self._product_ids.clear()
+                raise
+
+    def _insert_batch(self, batch: list[tuple[Client, dict[Product, int]]]) -> None:
+        next_id = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM clients").fetchone()[0]
+        clients = []
+        lines = []
+        for client_id, (client, cart) in enumerate(batch, next_id):
+            self._check_new_client(client, clients)
+            clients.append((client_id, client.name, client.surname, client.age, str(client.balance)))
+            lines.extend((client_id, self._product_id(product), quantity) for product, quantity in cart.items())
+        self.connection.executemany("INSERT INTO clients VALUES (?, ?, ?, ?, ?)", clients)
+        self.connection.executemany("INSERT INTO lines (client_id, product_id, quantity) VALUES (?, ?, ?)", lines)
+
+    def _check_new_client(self, client: Client, batch: list[tuple]) -> None:
+        if not isinstance(client, Client):
+            raise TypeError("Invalid client type")
+        same_names = self.connection.execute(
+            "SELECT * FROM clients WHERE name = ? AND surname = ?", (client.name, client.surname)
+        ).fetchall()
+        same_names += [row[1:] for row in batch if row[1:3] == (client.name, client.surname)]
+        if any(self._client_of(row[-4:]) == client for row in same_names):
+            raise ValueError("Client already exists in orders")
+
+    def _product_id(self, product: Product) -> int:
+        """ :return: id of product, product is inserted if it's not in products table yet """
+        if (product_id := self._product_ids.get(product)) is None:
+            if not isinstance(product, Product):
+                raise TypeError("Invalid product type")
+            key = (product.name, product.category.value, product.price_minor)
+            self.connection.execute(
+                "INSERT OR IGNORE INTO products (name, category, price, price_minor) VALUES (?, ?, ?, ?)",
+                (product.name, product.category.value, str(product.price), product.price_minor)
+            )
+            product_id = self._product_ids[product] = self.connection.execute(
+                "SELECT id FROM products WHERE name = ? AND category = ? AND price_minor = ?", key
+            ).fetchone()[0]
+        return product_id
+
+    @staticmethod
+    def _client_of(row: sqlite3.Row | tuple) -> Client:
+        """ :param row: name, surname, age and balance, optionally preceded by other columns """
+        name, surname, age, balance = tuple(row)[-4:]
+        return Client(name, surname, age, Decimal(balance))
+
+    @staticmethod
+    def _product_of(name: str, category: int, price: str) -> Product:
+        return Product(name, Category(category), Decimal(price))
+
+    def _top(self, values: str, k: int, parameters: dict[str, Any]) -> list[tuple[Client, int]]:
+        if not isinstance(k, int):
+            raise TypeError("Invalid n type")
+        if k < 1:
+            raise ValueError("n has to be greater than 0")
+        rows = self.connection.execute(_TOP_WITH_TIES.format(values=values), {**parameters, 'offset': k - 1})
+        return [(self._client_of(tuple(row)[1:5]), row['value']) for row in rows]
+
+    def client_with_biggest_spend(self) -> list[Client]:
+        """
+        :return: List of one or more Clients that have biggest spend in all clients pool
+        """
+        return [client for client, _ in self.top_clients_by_spend(1)]
+
+    def client_with_biggest_spend_in_category(self, category: Category) -> list[Client]:
+        """
+        :param category: to check available categories find ecommerce2.ecommerce_service.model.Category enum
+        :return: List of one or more Clients that have biggest spend on products that match provided Category
+        """
+        top = self.top_clients_by_spend(1, category)
+        if not top or top[0][1] == Decimal('0'):
+            return []
+        return [client for client, _ in top]
+
+    def top_clients_by_spend(self, k: int, category: Category | None = None) -> list[tuple[Client, Decimal]]:
+        """ Same as OrdersService.top_clients_by_spend() """
+        if category is None:
+            top = self._top(_CLIENT_SPEND, k, {})
+        else:
+            top = self._top(_CATEGORY_SPEND, k, {'category': category.value})
+        return [(client, from_minor_units(spend)) for client, spend in top]
+
+    def top_clients_by_quantity(self, k: int, category: Category) -> list[tuple[Client, int]]:
+        """ Same as OrdersService.top_clients_by_quantity() """
+        return self._top(_CATEGORY_QUANTITY, k, {'category': category.value})
+
+    def most_popular_categories_for_clients_ages(self) -> dict[int, list[Category]]:
+        """
+        Prepares list of one or more Categories are most popular for each age occurrence.
+        Data is stored in dict where age is a key and a list of Categories is a value.
+        """
+        ages_with_categories = {}
+        for age, category in self.connection.execute(_MOST_POPULAR_CATEGORIES):
+            categories = ages_with_categories.setdefault(age, [])
+            if category is not None:
+                categories.append(Category(category))
+        return ages_with_categories
+
+    def categories_stats(self) -> dict[Category, dict[str, Decimal | list[Product]]]:
+        """ Creates statistical data on each Category that is currently used in orders. Value for each Category contains
+            dict with three items: price mean, most expensive product and cheapest product. First is Decimal value, second
+            and third are lists of one or more Product
+        """
+        category_with_stats = {}
+        for code, total, products, name, price, is_highest, is_lowest in self.connection.execute(_CATEGORIES_STATS):
+            category = Category(code)
+            if (stats := category_with_stats.get(category)) is None:
+                stats = category_with_stats[category] = {
+                    "price_mean": from_minor_units(total) / products,
+                    "most_expensive_product": [],
+                    "cheapest_product": []
+                }
+            product = self._product_of(name, code, price)
+            if is_highest:
+                stats["most_expensive_product"].append(product)
+            if is_lowest:
+                stats["cheapest_product"].append(product)
+        return category_with_stats
+
+    def categories_with_biggest_clients(self) -> dict[Category, list[Client]]:
+        """ Creates dict with Category as a key and list of one or more Clients that have the biggest quantity of bought
+            products in that particular Category
+        """
+        category_with_clients = {category: [] for category in Category}
+        for row in self.connection.execute(_BIGGEST_CLIENTS):
+            category_with_clients[Category(row['category'])].append(self._client_of(row))
+        return category_with_clients
+
+    def clients_with_carts_value(self) -> dict[Client, Decimal]:
+        """ Calculates total spend for each Client and returns dict with Client as a key and his total spend as a value"""
+        return {client: from_minor_units(spend) for client, spend in self._clients_spend()}
+
+    def clients_balances_after_completing_orders(self) -> dict[Client, Decimal]:
+        """ Calculates balance of each client if his cart would be processed. Dict with Client as a key,
+            and balance subtracted from cart value
+        """
+        return {client: client.balance_after_spending(from_minor_units(spend))
+                for client, spend in self._clients_spend()}
+
+    def _clients_spend(self) -> list[tuple[Client, int]]:
+        rows = self.connection.execute(
+            f"SELECT clients.*, spend.value FROM ({_CLIENT_SPEND}) AS spend "
+            f"JOIN clients ON clients.id = spend.client_id ORDER BY clients.id"
+        )
+        return [(self._client_of(tuple(row)[:5]), row['value']) for row in rows]
+
+    def compute_report(self, metrics: Iterable[str] = REPORT_METRICS) -> dict[str, Any]:
+        """ Same as OrdersService.compute_report(), each metric is computed by its own SQL query """
+        return {metric: getattr(self, metric)() for metric in ReportAccumulator(metrics).metrics}
@@ -0,0 +1,140 @@
+from bisect import bisect_left
+from heapq import merge
+from datetime import date, datetime, timezone
+from functools import wraps
+from typing import Any, Callable, Iterator
+
+from ecommerce2.ecommerce_service.model import Client, Product
+
+""" Module stores time sorted index of dated order lines, that answers time window queries by binary search """
+
+
+def to_timestamp(value: datetime | date | str) -> datetime:
+    """
+    Normalizes order date, so all of them can be compared: aware datetime is converted to naive UTC one,
+    date is midnight of that day, str has to be in ISO 8601 format
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError("Invalid order date format")
+    if not isinstance(value, date):
+        raise TypeError("Invalid order date type")
+    if not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class Timeline:
+    """
+    Dated order lines sorted by timestamp. Lines are stored in columns by id, ascending timestamps and ids of lines
+    are kept in two parallel lists, so lines of [start, end) window are found by two binary searches.
+    Added lines are only appended, they are sorted and merged into sorted lists before the next window lookup.
+    Clients are ranked in order they were registered, which is used to order clients of window like OrdersService.orders.
+    """
+
+    def __init__(self):
+        self._timestamps: list[datetime] = []
+        self._clients: list[Client] = []
+        self._products: list[Product] = []
+        self._quantities: list[int] = []
+        self._sorted_timestamps: list[datetime] = []
+        self._sorted_ids: list[int] = []
+        self._unsorted_ids: list[int] = []
+        self._pair_ids: dict[tuple[Client, Product], list[int]] = {}
+        self._client_ranks: dict[Client, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def register(self, client: Client) -> None:
+        """ Ranks client after all clients that were registered before, if he isn't ranked yet """
+        self._client_ranks.setdefault(client, len(self._client_ranks))
+
+    def add(self, timestamp: datetime | date | str, client: Client, product: Product, quantity: int = 1) -> None:
+        """ Adds order line having provided date """
+        timestamp = to_timestamp(timestamp)
+        line_id = len(self._timestamps)
+        self._timestamps.append(timestamp)
+        self._clients.append(client)
+        self._products.append(product)
+        self._quantities.append(quantity)
+        self._pair_ids.setdefault((client, product), []).append(line_id)
+        self.register(client)
+        self._unsorted_ids.append(line_id)
+
+    def _sort(self) -> None:
+        """ Sorts lines added since last lookup and merges them into sorted lists, lines of equal timestamp stay in
+            order they were added """
+        if not self._unsorted_ids:
+            return
+        timestamp_of = self._timestamps.__getitem__
+        added = sorted(self._unsorted_ids, key=timestamp_of)
+        self._unsorted_ids = []
+        if self._sorted_ids:
+            self._sorted_ids = list(merge(self._sorted_ids, added, key=timestamp_of))
+        else:
+            self._sorted_ids = added
+        self._sorted_timestamps = [self._timestamps[line_id] for line_id in self._sorted_ids]
+
+    def quantity_of(self, client: Client, product: Product) -> int:
+        """ :return: dated quantity of product in client cart """
+        return sum(self._quantities[line_id] for line_id in self._pair_ids.get((client, product), ()))
+
+    def remove(self, client: Client, product: Product, quantity: int) -> None:
+        """ Removes quantity of product from dated lines of client, starting from the latest line """
+        line_ids = self._pair_ids.get((client, product), [])
+        for line_id in sorted(line_ids, key=self._timestamps.__getitem__, reverse=True):
+            if quantity <= 0:
+                break
+            removed = min(quantity, self._quantities[line_id])
+            self._quantities[line_id] -= removed
+            quantity -= removed
+
+    def _window(self, start: datetime | date | str | None, end: datetime | date | str | None) -> range:
+        self._sort()
+        low = 0 if start is None else bisect_left(self._sorted_timestamps, to_timestamp(start))
+        high = len(self._sorted_timestamps) if end is None else bisect_left(self._sorted_timestamps, to_timestamp(end))
+        return range(low, max(low, high))
+
+    def lines_between(self, start: datetime | date | str | None = None,
+                      end: datetime | date | str | None = None) -> Iterator[tuple[datetime, Client, Product, int]]:
+        """
+        :param start: beginning of window, included, None means no lower bound
+        :param end: end of window, excluded, None means no upper bound
+        :return: iterator of (timestamp, client, product, quantity) lines of window in ascending timestamp order
+        """
+        for position in self._window(start, end):
+            line_id = self._sorted_ids[position]
+            if quantity := self._quantities[line_id]:
+                yield self._timestamps[line_id], self._clients[line_id], self._products[line_id], quantity
+
+    def orders_between(self, start: datetime | date | str | None = None,
+                       end: datetime | date | str | None = None) -> dict[Client, dict[Product, int]]:
+        """
+        :return: dict that has the same structure as OrdersService.orders, made of lines of [start, end) window only.
+                 Clients are in order of their rank, products of each cart in order they were first bought in window
+        """
+        orders: dict[Client, dict[Product, int]] = {}
+        for _, client, product, quantity in self.lines_between(start, end):
+            cart = orders.setdefault(client, {})
+            cart[product] = cart.get(product, 0) + quantity
+        ranks = self._client_ranks
+        return {client: orders[client] for client in sorted(orders, key=ranks.__getitem__)}
+
+
+def windowed_query(method: Callable) -> Callable:
+    """
+    Decorator of OrdersService query methods, that adds start and end keyword arguments. If any of them is provided,
+    method answers query for orders made of dated lines of [start, end) window only.
+    """
+    @wraps(method)
+    def wrapper(self, *args, start: datetime | date | str | None = None, end: datetime | date | str | None = None,
+                **kwargs) -> Any:
+        if start is None and end is None:
+            return method(self, *args, **kwargs)
+        return method(self.__class__(self.timeline.orders_between(start, end)), *args, **kwargs)
+    return wrapper
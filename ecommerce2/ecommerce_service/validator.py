@@ -1,8 +1,12 @@
+import re
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
 from enum import Enum
-from typing import Final
+from typing import Any, Callable, Final, Iterable
 
-from ecommerce2.common import matches_regex, ClientUnstandardizedData, ProductUnstandardizedData
+from ecommerce2.common import matches_regex, lazy_class_attribute, ClientUnstandardizedData, ProductUnstandardizedData
 from ecommerce2.ecommerce_service.model import Category
+from ecommerce2.ecommerce_service.money import to_minor_units
 from ecommerce2.settings import ValidatorSettings
 
 
@@ -72,17 +76,152 @@ class BasicValidator:
         return errors
 
 
+@dataclass(frozen=True, slots=True)
+class ValidationError:
+    """
+    Compact description of single invalid value found by validate_many() methods. Message is formatted only on demand.
+    index: position of record in validated records
+    key: name of invalid key
+    code: 'type' for value of incorrect type, 'format' for value not matching regex, 'range' for value outside range,
+          'undefined' for name that doesn't exist in enumerator, 'precision' for money more precise than minor unit
+    detail: type of value for 'type' code, enumerator name for 'undefined' code
+    """
+    index: int
+    key: str
+    code: str
+    detail: Any = None
+
+    @property
+    def message(self) -> str:
+        """ Same message as BasicValidator methods return for particular error """
+        match self.code:
+            case 'type':
+                return f"Invalid expression type: {self.detail}"
+            case 'format':
+                return f'{self.key.title()} is not formatted correctly'
+            case 'range':
+                return f'{self.key.title()} is not valid'
+            case 'undefined':
+                return f'Category is not defined in {self.detail}'
+            case 'precision':
+                return f'{self.key.title()} is more precise than minor unit'
+        raise ValueError(f'Unknown error code: {self.code}')
+
+
+Check = Callable[[Any], tuple[str, Any] | None]
+
+
+class ValidationPlan:
+    """
+    Checks of all keys of particular schema, prepared once. Each check is a function that returns None for valid value
+    or tuple (code, detail) describing an error, so no messages are built during validation.
+    """
+
+    def __init__(self, checks: dict[str, Check]):
+        self.checks: Final = tuple(checks.items())
+
+    @staticmethod
+    def regex_check(regex: str, enumerator: type[Enum] | None = None) -> Check:
+        """ Check of str value that has to match regex and optionally has to be a name of enumerator member """
+        match = re.compile(regex).match
+        names = frozenset(e.name for e in enumerator) if enumerator is not None else None
+
+        def _check(value: Any) -> tuple[str, Any] | None:
+            if not isinstance(value, str):
+                return 'type', type(value)
+            if match(value) is None:
+                return 'format', None
+            if names is not None and value not in names:
+                return 'undefined', enumerator.__name__
+            return None
+        return _check
+
+    @staticmethod
+    def decimal_check(regex: str) -> Check:
+        """ Check of str value that has to match regex and represent finite Decimal """
+        regex_check = ValidationPlan.regex_check(regex)
+
+        def _check(value: Any) -> tuple[str, Any] | None:
+            if (error := regex_check(value)) is not None:
+                return error
+            try:
+                amount = Decimal(value)
+            except InvalidOperation:
+                return 'format', None
+            if not amount.is_finite():
+                return 'format', None
+            return None
+        return _check
+
+    @staticmethod
+    def money_check(regex: str) -> Check:
+        """ Check of str value that has to match regex and represent Decimal of at most currency precision """
+        decimal_check = ValidationPlan.decimal_check(regex)
+
+        def _check(value: Any) -> tuple[str, Any] | None:
+            if (error := decimal_check(value)) is not None:
+                return error
+            amount = Decimal(value)
+            try:
+                to_minor_units(amount)
+            except ValueError:
+                return 'precision', None
+            return None
+        return _check
+
+    @staticmethod
+    def integer_check(min_range: int) -> Check:
+        """ Check of int value that can't be lower than min_range """
+        def _check(value: Any) -> tuple[str, Any] | None:
+            if not isinstance(value, int):
+                return 'type', type(value)
+            if value < min_range:
+                return 'range', None
+            return None
+        return _check
+
+    def validate(self, record: dict[str, Any], index: int = 0) -> list[ValidationError]:
+        """ Returns errors of single record, record has to contain all keys of the plan """
+        errors = []
+        for key, check in self.checks:
+            if (error := check(record[key])) is not None:
+                errors.append(ValidationError(index, key, *error))
+        return errors
+
+    def validate_many(self, records: Iterable[dict[str, Any]]) -> list[ValidationError]:
+        """ Returns errors of all records in order of records and keys """
+        errors = []
+        checks = self.checks
+        for index, record in enumerate(records):
+            for key, check in checks:
+                if (error := check(record[key])) is not None:
+                    errors.append(ValidationError(index, key, *error))
+        return errors
+
+    @staticmethod
+    def as_messages(errors: list[ValidationError]) -> dict[str, list[str]]:
+        """ Formats errors of single record the same way as validate_client_data() or validate_product_data() """
+        return {error.key: [error.message] for error in errors}
+
+
 class ClientValidator(BasicValidator):
     """
         Validates client_data dict which is representing object that most likely is obtained by loading json file,
         and it's used to create from_dict() method of Client class.
         ClientValidator is subclass of BasicValidator, and it's strongly dependent on its methods.
+        Regexes are read from settings and PLAN is compiled on first use, not at import.
     """
 
-    NAME_REGEX: Final = ValidatorSettings.CLIENT_NAME_REGEX
-    SURNAME_REGEX: Final = ValidatorSettings.CLIENT_SURNAME_REGEX
-    BALANCE_REGEX: Final = ValidatorSettings.CLIENT_BALANCE_REGEX
+    NAME_REGEX: Final = lazy_class_attribute(lambda cls: ValidatorSettings.CLIENT_NAME_REGEX)
+    SURNAME_REGEX: Final = lazy_class_attribute(lambda cls: ValidatorSettings.CLIENT_SURNAME_REGEX)
+    BALANCE_REGEX: Final = lazy_class_attribute(lambda cls: ValidatorSettings.CLIENT_BALANCE_REGEX)
     AGE_RANGE_MIN: Final = 18
+    PLAN: Final = lazy_class_attribute(lambda cls: ValidationPlan({
+        'name': ValidationPlan.regex_check(cls.NAME_REGEX),
+        'surname': ValidationPlan.regex_check(cls.SURNAME_REGEX),
+        'age': ValidationPlan.integer_check(cls.AGE_RANGE_MIN),
+        'balance': ValidationPlan.decimal_check(cls.BALANCE_REGEX),
+    }))
 
     @staticmethod
     def validate_client_data(client_data: ClientUnstandardizedData) -> dict[str, list[str]]:
@@ -91,17 +230,18 @@ class ClientValidator(BasicValidator):
         :param client_data: dict with keys: name, surname, age, balance
         :return: dict that contains name of an argument as a key and list with errors that might or might not occur
         """
-        errors = {}
-        if name_err := ClientValidator._validate_name(client_data['name']):
-            errors['name'] = name_err
-        if surname_err := ClientValidator._validate_name(client_data['surname']):
-            errors['surname'] = surname_err
-        if age_err := ClientValidator._validate_age(client_data['age']):
-            errors['age'] = age_err
-        if balance_err := ClientValidator._validate_balance(client_data['balance']):
-            errors['balance'] = balance_err
+        if errors := ClientValidator.PLAN.validate(client_data):
+            return ValidationPlan.as_messages(errors)
+        return {}
 
-        return errors
+    @staticmethod
+    def validate_many(clients_data: Iterable[ClientUnstandardizedData]) -> list[ValidationError]:
+        """
+        Validates many client_data dicts at once
+        :param clients_data: dicts with keys: name, surname, age, balance
+        :return: list of ValidationError, where index is position of client_data in clients_data
+        """
+        return ClientValidator.PLAN.validate_many(clients_data)
 
     @staticmethod
     def _validate_name(client_name: str) -> list[str]:
@@ -117,7 +257,13 @@ class ClientValidator(BasicValidator):
 
     @staticmethod
     def _validate_balance(client_balance: str) -> list[str]:
-        return ClientValidator.validate_using_regex('balance', client_balance, ClientValidator.BALANCE_REGEX)
+        if errors := ClientValidator.validate_using_regex('balance', client_balance, ClientValidator.BALANCE_REGEX):
+            return errors
+        try:
+            Decimal(client_balance)
+        except InvalidOperation:
+            return ['Balance is not formatted correctly']
+        return []
 
 
 class ProductValidator(BasicValidator):
@@ -126,9 +272,14 @@ class ProductValidator(BasicValidator):
         and it's used to create from_dict() method of Product class.
         ProductValidator is subclass of BasicValidator, and it's strongly dependent on its methods.
     """
-    NAME_REGEX: Final = ValidatorSettings.PRODUCT_NAME_REGEX
-    CATEGORY_REGEX: Final = ValidatorSettings.PRODUCT_CATEGORY_REGEX
-    PRICE_REGEX: Final = ValidatorSettings.PRODUCT_PRICE_REGEX
+    NAME_REGEX: Final = lazy_class_attribute(lambda cls: ValidatorSettings.PRODUCT_NAME_REGEX)
+    CATEGORY_REGEX: Final = lazy_class_attribute(lambda cls: ValidatorSettings.PRODUCT_CATEGORY_REGEX)
+    PRICE_REGEX: Final = lazy_class_attribute(lambda cls: ValidatorSettings.PRODUCT_PRICE_REGEX)
+    PLAN: Final = lazy_class_attribute(lambda cls: ValidationPlan({
+        'name': ValidationPlan.regex_check(cls.NAME_REGEX),
+        'category': ValidationPlan.regex_check(cls.CATEGORY_REGEX, Category),
+        'price': ValidationPlan.money_check(cls.PRICE_REGEX),
+    }))
 
     @staticmethod
     def validate_product_data(product_data: ProductUnstandardizedData) -> dict[str, list[str]]:
@@ -137,15 +288,18 @@ class ProductValidator(BasicValidator):
                 :param product_data: dict with keys: name, category, price
                 :return: dict that contains name of an argument as a key and list with errors that might or might not occur
                 """
-        errors = {}
-        if name_err := ProductValidator._validate_name(product_data['name']):
-            errors['name'] = name_err
-        if category_err := ProductValidator._validate_category(product_data['category']):
-            errors['category'] = category_err
-        if price_err := ProductValidator._validate_price(product_data['price']):
-            errors['price'] = price_err
+        if errors := ProductValidator.PLAN.validate(product_data):
+            return ValidationPlan.as_messages(errors)
+        return {}
 
-        return errors
+    @staticmethod
+    def validate_many(products_data: Iterable[ProductUnstandardizedData]) -> list[ValidationError]:
+        """
+        Validates many product_data dicts at once
+        :param products_data: dicts with keys: name, category, price
+        :return: list of ValidationError, where index is position of product_data in products_data
+        """
+        return ProductValidator.PLAN.validate_many(products_data)
 
     @staticmethod
     def _validate_name(product_name: str) -> list[str]:
@@ -162,4 +316,7 @@ class ProductValidator(BasicValidator):
     def _validate_price(product_price: str) -> list[str]:
         if errors := ProductValidator.validate_using_regex('price', product_price, ProductValidator.PRICE_REGEX):
             return errors
+        # the same check as in PLAN, so prices accepted by Product are the only valid ones
+        if (error := ValidationPlan.money_check(ProductValidator.PRICE_REGEX)(product_price)) is not None:
+            return [ValidationError(0, 'price', *error).message]
         return []
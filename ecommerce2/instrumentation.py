@@ -0,0 +1,161 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from functools import wraps
+from typing import Any, Callable, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import cProfile
+
+""" Module stores instrumentation of load and query paths: stage timers, event counters and profiles """
+
+
+@dataclass
+class StageTimer:
+    """ Statistics of timed stage, times are in seconds """
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class Instrumentation:
+    """
+    Collects time spent in each stage, counters of events (loaded records, invalid records, errors) and cProfile
+    captures. It's disabled by default, then timers and counters only check enabled flag.
+    Each process has its own instrumentation, timers and counters of worker processes are sent back with results
+    and added to the coordinator ones with merge().
+    """
+
+    _DISABLED_TIMER = nullcontext()
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.timers: dict[str, StageTimer] = {}
+        self.counters: dict[str, int] = {}
+        # cProfile and pstats are imported only when profile is captured
+        self.profiles: dict[str, 'cProfile.Profile'] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """ Removes all collected timers, counters and profiles """
+        self.timers.clear()
+        self.counters.clear()
+        self.profiles.clear()
+
+    def merge(self, timers: dict[str, StageTimer], counters: dict[str, int]) -> None:
+        """ Adds timers and counters collected by other process to these ones """
+        for stage, other in timers.items():
+            timer = self.timers.setdefault(stage, StageTimer())
+            timer.calls += other.calls
+            timer.total += other.total
+            timer.max = max(timer.max, other.max)
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def count(self, name: str, n: int = 1) -> None:
+        """ Increases counter of event by n """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def timer(self, stage: str):
+        """ :return: context manager that times its block as one call of stage """
+        if not self.enabled:
+            return self._DISABLED_TIMER
+        return self._timer(stage)
+
+    @contextmanager
+    def _timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.count(f'errors.{stage}')
+            raise
+        finally:
+            self.timers.setdefault(stage, StageTimer()).record(time.perf_counter() - start)
+
+    def timed(self, stage: str | None = None) -> Callable[[Callable], Callable]:
+        """
+        Decorator that times each call of function as stage and counts exceptions it raises
+        :param stage: name of stage, qualified name of function is used if not provided
+        """
+        def decorator(function: Callable) -> Callable:
+            name = function.__qualname__ if stage is None else stage
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self._timer(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator['cProfile.Profile']:
+        """ Captures cProfile of its block under provided name, regardless of enabled flag """
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            self.profiles[name] = profiler
+
+    def profile_report(self, name: str, limit: int = 20, sort: str = 'cumulative') -> str:
+        """ :return: text table of limit functions of captured profile, sorted by provided key """
+        if name not in self.profiles:
+            raise ValueError(f"Profile {name} was not captured")
+        import io
+        import pstats
+
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiles[name], stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def as_dict(self) -> dict[str, Any]:
+        """ :return: dict with 'timers' (stage statistics) and 'counters' """
+        return {
+            'timers': {stage: asdict(timer) for stage, timer in self.timers.items()},
+            'counters': dict(self.counters),
+        }
+
+    def to_json(self, **kwargs) -> str:
+        """ :param kwargs: passed to json.dumps() """
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def to_prometheus(self, prefix: str = 'ecommerce2') -> str:
+        """ :return: timers and counters in Prometheus text exposition format """
+        lines = []
+        for metric, field, kind in (('stage_calls_total', 'calls', 'counter'),
+                                    ('stage_seconds_total', 'total', 'counter'),
+                                    ('stage_seconds_max', 'max', 'gauge')):
+            lines.append(f'# TYPE {prefix}_{metric} {kind}')
+            lines.extend(f'{prefix}_{metric}{{stage="{_escape(stage)}"}} {getattr(timer, field)}'
+                         for stage, timer in self.timers.items())
+        lines.append(f'# TYPE {prefix}_events_total counter')
+        lines.extend(f'{prefix}_events_total{{name="{_escape(name)}"}} {value}'
+                     for name, value in self.counters.items())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(label: str) -> str:
+    return label.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,159 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator
+
+from ecommerce2.ecommerce_service.catalog import ProductCatalog
+from ecommerce2.ecommerce_service.model import Product
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.instrumentation import instrumentation
+from ecommerce2.loader.json_loader import iter_file
+from ecommerce2.loader.orders_loader import OrdersLoader, RecordError, default_workers, _validate_chunk
+
+""" Module stores asyncio runner that ingests many orders files into live OrdersService """
+
+
+@dataclass
+class IngestionReport:
+    """
+    Summary of ingestion.
+    loaded: number of valid records applied to service for each file
+    errors: RecordError of each invalid record for each file, index is position of record in its file
+    failed: message of error that stopped reading of file (invalid json or OS error like missing file or directory),
+            records read before error are applied
+    """
+    loaded: dict[str, int] = field(default_factory=dict)
+    errors: dict[str, list[RecordError]] = field(default_factory=dict)
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+class IngestionRunner:
+    """
+    Reads many orders files concurrently and feeds their valid records into OrdersService while it stays available
+    for queries. For each file, chunks of records are parsed in thread pool and validated in process pool (or thread
+    pool if workers is 1), so reading of next chunk overlaps with validation of previous ones. Validated chunks wait
+    in bounded queue, so reader is suspended when validation or applying falls behind.
+    Records are applied in order of their file through OrdersService mutation API, quantities of client that appears
+    again are added to his cart.
+    """
+
+    def __init__(self, service: OrdersService | None = None, catalog: ProductCatalog | None = None,
+                 workers: int | None = 1, chunk_size: int = 1000, queue_size: int = 4, max_open_files: int = 4):
+        """
+        :param service: service fed with records, new one is used if not provided
+        :param catalog: catalog used to intern products, new one is used if not provided
+        :param workers: number of processes validating records, None uses all cores
+        :param chunk_size: number of records parsed and validated at once
+        :param queue_size: number of chunks of single file that can wait for applying
+        :param max_open_files: number of files read at the same time
+        """
+        workers = default_workers() if workers is None else workers
+        if not all(isinstance(value, int) for value in (workers, chunk_size, queue_size, max_open_files)):
+            raise TypeError("Invalid ingestion parameter type")
+        if min(workers, chunk_size, queue_size, max_open_files) < 1:
+            raise ValueError("Ingestion parameters have to be greater than 0")
+        self.service = OrdersService({}) if service is None else service
+        self.catalog = ProductCatalog() if catalog is None else catalog
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.max_open_files = max_open_files
+
+    async def ingest(self, filepaths: Iterable[str]) -> IngestionReport:
+        """ Ingests all files concurrently, returns when all of them are applied to service """
+        report = IngestionReport()
+        files_limit = asyncio.Semaphore(self.max_open_files)
+        with ThreadPoolExecutor(self.max_open_files) as io_executor, self._cpu_executor() as cpu_executor:
+            async def ingest_one(filepath: str) -> None:
+                async with files_limit:
+                    await self._ingest_file(filepath, io_executor, cpu_executor, report)
+
+            await asyncio.gather(*[ingest_one(filepath) for filepath in filepaths])
+        return report
+
+    def _cpu_executor(self) -> Executor:
+        return ThreadPoolExecutor(1) if self.workers == 1 else ProcessPoolExecutor(self.workers)
+
+    async def _ingest_file(self, filepath: str, io_executor: Executor, cpu_executor: Executor,
+                           report: IngestionReport) -> None:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        report.loaded[filepath] = 0
+
+        async def read() -> None:
+            try:
+                records_iterator = iter_file(filepath)
+                start = 0
+                error = None
+                while error is None:
+                    records, error = await loop.run_in_executor(io_executor, _next_chunk, records_iterator,
+                                                                self.chunk_size)
+                    if not records:
+                        break
+                    validation = loop.run_in_executor(cpu_executor, _validate_chunk, start, records)
+                    await queue.put((start, records, validation))
+                    start += len(records)
+                if error is not None:
+                    report.failed[filepath] = error.args[0]
+                    instrumentation.count('errors.files')
+            except OSError as e:
+                report.failed[filepath] = e.strerror or str(e)
+                instrumentation.count('errors.files')
+            finally:
+                await queue.put(None)
+
+        reader = asyncio.create_task(read())
+        try:
+            while (item := await queue.get()) is not None:
+                start, records, validation = item
+                errors = await validation
+                if errors:
+                    report.errors.setdefault(filepath, []).extend(errors)
+                with instrumentation.timer('apply'):
+                    applied = self._apply(records, start, {error.index for error in errors})
+                report.loaded[filepath] += applied
+                instrumentation.count('records.loaded', applied)
+                instrumentation.count('records.invalid', len(errors))
+            # other errors of reader are raised here instead of being lost with the task
+            await reader
+        finally:
+            reader.cancel()
+
+    def _apply(self, records: list[dict], start: int, invalid: set[int]) -> int:
+        """ Builds valid records and adds them to service, :return: number of applied records """
+        service = self.service
+        applied = 0
+        for index, data in enumerate(records, start):
+            if index in invalid:
+                continue
+            client, cart, dated = OrdersLoader.build_dated_record(data, self.catalog)
+            if client not in service.orders:
+                service.add_client(client)
+            order_dates: dict[Product, list[datetime]] = {}
+            for order_date, product in dated:
+                order_dates.setdefault(product, []).append(order_date)
+            for product, quantity in cart.items():
+                for order_date in order_dates.get(product, ()):
+                    service.add_order_line(client, product, 1, order_date)
+                    quantity -= 1
+                if quantity:
+                    service.add_order_line(client, product, quantity)
+            applied += 1
+        return applied
+
+
+def _next_chunk(records_iterator: Iterator, chunk_size: int) -> tuple[list, ValueError | None]:
+    """ :return: up to chunk_size next records and error that stopped reading, records before it are kept """
+    records = []
+    try:
+        records.extend(islice(records_iterator, chunk_size))
+    except ValueError as e:
+        return records, e
+    return records, None
+
+
+def ingest_files(filepaths: Iterable[str], service: OrdersService | None = None, **options) -> IngestionReport:
+    """ Synchronous entry point, runs IngestionRunner with provided options in new event loop """
+    return asyncio.run(IngestionRunner(service, **options).ingest(filepaths))
@@ -1,7 +1,11 @@
 import json
-from typing import Any
+import os
+from typing import Any, Iterator
 
+from ecommerce2.instrumentation import instrumentation
 
+
+@instrumentation.timed('load_file')
 def load_file(filepath: str) -> Any:
     """ Basic json file loader """
     try:
@@ -9,3 +13,155 @@ def load_file(filepath: str) -> Any:
             return json.load(f)
     except FileNotFoundError:
         raise ValueError("Invalid filepath")
+
+
+def iter_file(filepath: str, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Streams elements of top level json array one by one. File is read in chunks, so only currently parsed element
+    is kept in memory, which lets to process files that are much bigger than available memory.
+    :param filepath: path to json file containing array as a top level value
+    :param chunk_size: number of characters read from file at once
+    :return: iterator of decoded array elements
+    """
+    if not isinstance(chunk_size, int) or chunk_size <= 0:
+        raise ValueError("Chunk size has to be positive integer")
+    try:
+        f = open(filepath, 'r')
+    except FileNotFoundError:
+        raise ValueError("Invalid filepath")
+
+    parsed = 0
+    with f:
+        try:
+            for element in _iter_array(f, chunk_size):
+                parsed += 1
+                yield element
+        finally:
+            instrumentation.count('records.parsed', parsed)
+
+
+def _iter_array(f, chunk_size: int) -> Iterator[Any]:
+    """ Incremental parser of top level json array that yields every decoded element as soon as it's complete """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    idx = 0
+    eof = False
+
+    def _read_more() -> bool:
+        """ Appends next chunk to the buffer. Chunk grows with buffer, so huge elements are not re-parsed too often """
+        nonlocal buffer, idx, eof
+        if eof:
+            return False
+        chunk = f.read(max(chunk_size, len(buffer) - idx))
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[idx:] + chunk
+        idx = 0
+        return True
+
+    def _next_char() -> str:
+        """ Skips whitespaces and returns next significant character without consuming it, empty str if eof """
+        nonlocal idx
+        while True:
+            while idx < len(buffer) and buffer[idx].isspace():
+                idx += 1
+            if idx < len(buffer):
+                return buffer[idx]
+            if not _read_more():
+                return ''
+
+    if _next_char() != '[':
+        raise ValueError("File does not contain json array")
+    idx += 1
+
+    if _next_char() == ']':
+        idx += 1
+    else:
+        while True:
+            if not _next_char():
+                raise ValueError("Unexpected end of json file")
+            while True:
+                try:
+                    element, end = decoder.raw_decode(buffer, idx)
+                except json.JSONDecodeError:
+                    if _read_more():
+                        continue
+                    raise ValueError("Invalid json structure")
+                if (end == len(buffer) or buffer[end] not in ',]' and not buffer[end].isspace()) and _read_more():
+                    # number or literal could be cut by the end of chunk, it's complete only when separator follows it
+                    continue
+                break
+            idx = end
+            yield element
+
+            separator = _next_char()
+            idx += 1
+            if separator == ']':
+                break
+            if separator != ',':
+                raise ValueError("Invalid json structure")
+
+    if _next_char():
+        raise ValueError("Invalid json structure")
+
+
+def ndjson_ranges(filepath: str, chunk_bytes: int = 1 << 20) -> list[tuple[int, int]]:
+    """
+    Splits NDJSON (one json value per line) file into byte ranges that start and end on line boundaries,
+    so each range can be parsed independently, for example by different processes.
+    :param chunk_bytes: approximate size of range, range is extended to the end of line it ends in
+    :return: list of (start, end) byte offsets covering whole file
+    """
+    if not isinstance(chunk_bytes, int) or chunk_bytes <= 0:
+        raise ValueError("Chunk size has to be positive integer")
+    try:
+        f = open(filepath, 'rb')
+    except FileNotFoundError:
+        raise ValueError("Invalid filepath")
+
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        ranges = []
+        start = 0
+        while start < size:
+            end = start + chunk_bytes
+            if end < size:
+                f.seek(end - 1)
+                f.readline()
+                end = f.tell()
+            end = min(end, size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+@instrumentation.timed('parse_ndjson_range')
+def parse_ndjson_range(filepath: str, start: int, end: int) -> tuple[int, list[tuple[int, Any]], list[tuple[int, str]]]:
+    """
+    Parses lines of NDJSON file range returned by ndjson_ranges(). Empty lines are skipped, malformed ones are reported.
+    :return: number of lines in range, list of (line number, decoded value) and list of (line number, error message).
+             Line numbers start from 1 at the beginning of range
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+    except FileNotFoundError:
+        raise ValueError("Invalid filepath")
+
+    lines = data.split(b'\n')
+    if lines[-1] == b'':
+        lines.pop()
+    values = []
+    malformed = []
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            values.append((line_number, json.loads(line)))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            malformed.append((line_number, "Invalid json line"))
+    instrumentation.count('records.parsed', len(values))
+    instrumentation.count('records.malformed', len(malformed))
+    return len(lines), values, malformed
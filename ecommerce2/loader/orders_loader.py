@@ -1,37 +1,363 @@
-from collections import defaultdict
-from dataclasses import dataclass
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
 
+from ecommerce2.common import is_dict_structure_correct
+from ecommerce2.ecommerce_service.catalog import ProductCatalog
 from ecommerce2.ecommerce_service.model import Client, Product
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.ecommerce_service.timeline import Timeline, to_timestamp
 from ecommerce2.ecommerce_service.validator import ClientValidator, ProductValidator
+from ecommerce2.instrumentation import instrumentation, StageTimer
+from ecommerce2.loader.json_loader import ndjson_ranges, parse_ndjson_range
+
+
+@dataclass(frozen=True)
+class RecordError:
+    """
+    Describes record of orders data that couldn't be loaded.
+    index: position of record in orders data
+    errors: dict with 'line' key if NDJSON line is not valid json, 'record' key if structure of record is invalid,
+            otherwise 'client' and/or 'client_orders' keys.
+            'client' value is dict returned by ClientValidator, 'client_orders' value is dict with position of product
+            in client_orders as a key and dict returned by ProductValidator as a value
+    """
+    index: int
+    errors: dict[str, Any]
+
+
+@dataclass
+class LoadResult:
+    """
+    Orders that were loaded successfully together with errors of records that were skipped.
+    loaded: number of valid records, records of the same client are counted separately, so it's not number of orders
+    """
+    orders: dict[Client, dict[Product, int]] = field(default_factory=dict)
+    errors: list[RecordError] = field(default_factory=list)
+    loaded: int = 0
 
 
 @dataclass
 class OrdersLoader:
     """ Class that holds namespace for method that is specifically designed to load orders into OrdersService"""
+    RECORD_KEYS = frozenset({'client', 'client_orders'})
+    CLIENT_KEYS = frozenset({'name', 'surname', 'age', 'balance'})
+    PRODUCT_KEYS = frozenset({'name', 'category', 'price'})
+    ORDER_DATE_KEY = 'order_date'
+
     @staticmethod
-    def load_from(orders_data: list[dict[str, dict | list[dict]]]) -> dict[Client, dict[Product, int]]:
+    def load_from(orders_data: Iterable[dict[str, dict | list[dict]]], catalog: ProductCatalog | None = None,
+                  workers: int | None = 1, chunk_size: int = 1000,
+                  timeline: Timeline | None = None) -> dict[Client, dict[Product, int]]:
         """
 
-        :param orders_data: List of dicts that are most likely loaded from json file. As a result of it, data types are limited by JSON
-                            Therefor any transformations that are necessary are processed in from_dict() methods of Client and Product
+        :param orders_data: Iterable of dicts that are most likely loaded from json file. As a result of it, data types are limited by JSON
+                            Therefor any transformations that are necessary are processed in from_dict() methods of Client and Product.
+                            Data is consumed only once, so it can be an iterator like ecommerce2.loader.json_loader.iter_file()
+        :param catalog: catalog used to intern products, new one is used if not provided
+        :param workers: number of processes validating records, 1 validates in current process, None uses all cores
+        :param chunk_size: number of records sent to worker at once
+        :param timeline: if provided, products having 'order_date' key are added to it as dated order lines
         :return:
         """
+        catalog = ProductCatalog() if catalog is None else catalog
+        orders = {}
+        for _, records, errors in OrdersLoader._validated_chunks(orders_data, workers, chunk_size):
+            if errors:
+                instrumentation.count('records.invalid', len(errors))
+                raise ValueError("Orders data is not correct. Cannot load it into Orders Service")
+            with instrumentation.timer('build'):
+                for data in records:
+                    OrdersLoader._add_record(orders, data, catalog, timeline)
+            instrumentation.count('records.loaded', len(records))
+
+        return orders
+
+    @staticmethod
+    def load_collecting_errors(orders_data: Iterable[dict[str, dict | list[dict]]],
+                               catalog: ProductCatalog | None = None, workers: int | None = 1,
+                               chunk_size: int = 1000, timeline: Timeline | None = None) -> LoadResult:
+        """
+        Works like load_from(), but invalid records don't stop loading. They are skipped and reported with their index.
+        :param orders_data: same as in load_from()
+        :param catalog: same as in load_from()
+        :param workers: same as in load_from()
+        :param chunk_size: same as in load_from()
+        :param timeline: same as in load_from()
+        :return: LoadResult containing orders built from valid records and RecordError for each invalid one
+        """
+        catalog = ProductCatalog() if catalog is None else catalog
+        result = LoadResult()
+        for start, records, errors in OrdersLoader._validated_chunks(orders_data, workers, chunk_size):
+            invalid = {error.index for error in errors}
+            result.errors.extend(errors)
+            with instrumentation.timer('build'):
+                for index, data in enumerate(records, start):
+                    if index in invalid:
+                        continue
+                    OrdersLoader._add_record(result.orders, data, catalog, timeline)
+            result.loaded += len(records) - len(invalid)
+            instrumentation.count('records.loaded', len(records) - len(invalid))
+            instrumentation.count('records.invalid', len(invalid))
+
+        return result
+
+    @staticmethod
+    def validate(orders_data: Iterable[dict[str, dict | list[dict]]], workers: int | None = 1,
+                 chunk_size: int = 1000) -> list[RecordError]:
+        """
+        Validates records without building them
+        :return: RecordError for each invalid record, in order of orders_data
+        """
+        return [error for _, _, errors in OrdersLoader._validated_chunks(orders_data, workers, chunk_size)
+                for error in errors]
+
+    @staticmethod
+    def _validated_chunks(orders_data: Iterable[dict[str, dict | list[dict]]], workers: int | None,
+                          chunk_size: int) -> Iterator[tuple[int, list[dict], list[RecordError]]]:
+        """
+        Splits orders data into chunks and validates them, in process pool if workers is greater than 1.
+        Orders data is consumed lazily, see _ordered_map().
+        :return: iterator of (index of first record, records, errors of records) in order of orders data
+        """
+        workers = default_workers() if workers is None else workers
+        if not isinstance(workers, int) or not isinstance(chunk_size, int):
+            raise TypeError("Invalid workers or chunk_size type")
+        if workers < 1 or chunk_size < 1:
+            raise ValueError("Workers and chunk_size have to be greater than 0")
+
+        chunks = _chunks(iter(orders_data), chunk_size)
+        for (start, records), errors in _ordered_map(_validate_chunk, chunks, workers):
+            yield start, records, errors
+
+    @staticmethod
+    def load_ndjson(filepath: str, catalog: ProductCatalog | None = None, workers: int | None = 1,
+                    chunk_bytes: int = 1 << 20, timeline: Timeline | None = None) -> LoadResult:
+        """
+        Loads NDJSON file, that has one orders data record per line. File is split into byte ranges on line boundaries
+        and each range is parsed and validated by worker. Malformed and invalid lines are skipped and reported.
+        :param filepath: path to NDJSON file, empty lines are ignored
+        :param catalog: same as in load_from()
+        :param workers: same as in load_from()
+        :param chunk_bytes: approximate size of range parsed by worker at once
+        :param timeline: same as in load_from()
+        :return: LoadResult with RecordError for each skipped line, index of RecordError is line number starting from 1
+        """
+        workers = default_workers() if workers is None else workers
+        if not isinstance(workers, int):
+            raise TypeError("Invalid workers type")
+        if workers < 1:
+            raise ValueError("Workers have to be greater than 0")
+        catalog = ProductCatalog() if catalog is None else catalog
+        result = LoadResult()
+        lines_before = 0
+        ranges = ((filepath, start, end) for start, end in ndjson_ranges(filepath, chunk_bytes))
+        for _, (lines, records, errors) in _ordered_map(_load_ndjson_range, ranges, workers):
+            result.errors.extend(RecordError(lines_before + error.index, error.errors) for error in errors)
+            with instrumentation.timer('build'):
+                for _, data in records:
+                    OrdersLoader._add_record(result.orders, data, catalog, timeline)
+            result.loaded += len(records)
+            instrumentation.count('records.loaded', len(records))
+            instrumentation.count('records.invalid', len(errors))
+            lines_before += lines
+        return result
+
+    @staticmethod
+    def record_errors(data: Any) -> dict[str, Any]:
+        """
+        Validates structure and values of single orders data record
+        :param data: dict with 'client' and 'client_orders' keys
+        :return: empty dict if record is valid, otherwise errors in format described in RecordError
+        """
         try:
-            for data in orders_data:
-                err1 = ClientValidator.validate_client_data(data['client'])
-                err2 = [True for order in data['client_orders'] if ProductValidator.validate_product_data(order)]
-                if err1 or err2:
-                    raise TypeError(f'Invalid data')
-        except TypeError:
-            raise ValueError("Orders data is not correct. Cannot load it into Orders Service")
+            is_dict_structure_correct(data, 'record', OrdersLoader.RECORD_KEYS)
+            is_dict_structure_correct(data['client'], 'client', OrdersLoader.CLIENT_KEYS)
+            if not isinstance(data['client_orders'], list):
+                raise TypeError('Invalid client_orders type')
+            for product_data in data['client_orders']:
+                keys = OrdersLoader.PRODUCT_KEYS
+                if isinstance(product_data, dict) and OrdersLoader.ORDER_DATE_KEY in product_data:
+                    keys = keys | {OrdersLoader.ORDER_DATE_KEY}
+                is_dict_structure_correct(product_data, 'product', keys)
+        except (TypeError, ValueError, KeyError) as e:
+            return {'record': [e.args[0]]}
+
+        errors = {}
+        if client_errors := ClientValidator.validate_client_data(data['client']):
+            errors['client'] = client_errors
+        products_errors = {}
+        for idx, product_data in enumerate(data['client_orders']):
+            product_errors = ProductValidator.validate_product_data(product_data)
+            if OrdersLoader.ORDER_DATE_KEY in product_data:
+                try:
+                    to_timestamp(product_data[OrdersLoader.ORDER_DATE_KEY])
+                except (TypeError, ValueError) as e:
+                    product_errors[OrdersLoader.ORDER_DATE_KEY] = [e.args[0]]
+            if product_errors:
+                products_errors[idx] = product_errors
+        if products_errors:
+            errors['client_orders'] = products_errors
+        return errors
+
+    @staticmethod
+    def merge_into(service: OrdersService, orders_data: Iterable[dict[str, dict | list[dict]]],
+                   catalog: ProductCatalog | None = None, workers: int | None = 1,
+                   chunk_size: int = 1000) -> OrdersService:
+        """
+        Loads additional orders data, for example delta file, into service that already has orders, see
+        OrdersService.merge(). Only new records are validated and built, products having 'order_date' key are added
+        to timeline of service.
+        :param orders_data: same as in load_from()
+        :param catalog: same as in load_from(), catalog used to load service before lets to share its products
+        :param workers: same as in load_from()
+        :param chunk_size: same as in load_from()
+        :return: provided service
+        """
+        timeline = Timeline()
+        service.merge(OrdersLoader.load_from(orders_data, catalog, workers, chunk_size, timeline), timeline)
+        return service
+
+    @staticmethod
+    def add_cart(orders: dict[Client, dict[Product, int]], client: Client, cart: dict[Product, int]) -> None:
+        """
+        Adds client cart to orders. If client is already in orders, carts are merged by summing quantities of products,
+        so client appearing in many records doesn't overwrite his earlier cart
+        """
+        if (existing := orders.get(client)) is None:
+            orders[client] = cart
+            return
+        for product, quantity in cart.items():
+            existing[product] = existing.get(product, 0) + quantity
+
+    @staticmethod
+    def _add_record(orders: dict[Client, dict[Product, int]], data: dict[str, dict | list[dict]],
+                    catalog: ProductCatalog, timeline: Timeline | None) -> None:
+        client, cart, dated = OrdersLoader.build_dated_record(data, catalog)
+        OrdersLoader.add_cart(orders, client, cart)
+        if timeline is not None:
+            timeline.register(client)
+            for order_date, product in dated:
+                timeline.add(order_date, client, product)
+
+    @staticmethod
+    def build_record(data: dict[str, dict | list[dict]],
+                     catalog: ProductCatalog | None = None) -> tuple[Client, dict[Product, int]]:
+        """
+        Creates Client and his cart out of record that was already validated
+        :param data: valid orders data record
+        :param catalog: if provided, products are interned in it
+        :return: Client and dict with Product as a key and bought quantity as a value
+        """
+        client, cart, _ = OrdersLoader.build_dated_record(data, catalog)
+        return client, cart
+
+    @staticmethod
+    def build_dated_record(data: dict[str, dict | list[dict]], catalog: ProductCatalog | None = None
+                           ) -> tuple[Client, dict[Product, int], list[tuple[datetime, Product]]]:
+        """
+        Works like build_record(), but also returns order date of each product that has 'order_date' key
+        :return: Client, his cart and list of (order date, Product) in order of client_orders
+        """
+        client = Client.from_dict(data['client'])
+        product_from_dict = Product.from_dict if catalog is None else catalog.from_dict
+        cart = {}
+        dated = []
+        for product_data in data['client_orders']:
+            if OrdersLoader.ORDER_DATE_KEY in product_data:
+                product_data = dict(product_data)
+                order_date = to_timestamp(product_data.pop(OrdersLoader.ORDER_DATE_KEY))
+                product = product_from_dict(product_data)
+                dated.append((order_date, product))
+            else:
+                product = product_from_dict(product_data)
+            cart[product] = cart.get(product, 0) + 1
+        return client, cart, dated
+
+
+def default_workers() -> int:
+    """ Number of workers that uses all available cores """
+    return os.cpu_count() or 1
+
+
+def _chunks(iterator: Iterator, chunk_size: int) -> Iterator[tuple[int, list]]:
+    start = 0
+    while records := list(islice(iterator, chunk_size)):
+        yield start, records
+        start += len(records)
+
+
+def _ordered_map(function: Callable, arguments: Iterable[tuple], workers: int) -> Iterator[tuple[tuple, Any]]:
+    """
+    Applies function to each tuple of arguments, in process pool if workers is greater than 1.
+    At most two calls per worker are in flight, so arguments are consumed lazily.
+    When instrumentation is enabled, timers and counters of each call in worker are merged into the current process.
+    :return: iterator of (arguments, result) in order of arguments
+    """
+    if workers == 1:
+        for args in arguments:
+            yield args, function(*args)
+        return
+
+    # imported here, so processes that don't use pool don't pay for importing multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    instrumented = instrumentation.enabled
+
+    def _result(future) -> Any:
+        if not instrumented:
+            return future.result()
+        result, timers, counters = future.result()
+        instrumentation.merge(timers, counters)
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for args in arguments:
+            future = executor.submit(_instrumented_call, function, args) if instrumented \
+                else executor.submit(function, *args)
+            in_flight.append((args, future))
+            if len(in_flight) >= 2 * workers:
+                args, future = in_flight.popleft()
+                yield args, _result(future)
+        while in_flight:
+            args, future = in_flight.popleft()
+            yield args, _result(future)
+
+
+def _instrumented_call(function: Callable, args: tuple) -> tuple[Any, dict[str, StageTimer], dict[str, int]]:
+    """ Calls function in worker process with reset instrumentation, so timers and counters of this call are returned """
+    instrumentation.reset()
+    instrumentation.enable()
+    result = function(*args)
+    return result, instrumentation.timers, instrumentation.counters
+
+
+@instrumentation.timed('validate_ndjson_range')
+def _load_ndjson_range(filepath: str, start: int,
+                       end: int) -> tuple[int, list[tuple[int, dict]], list[RecordError]]:
+    """
+    Parses and validates byte range of NDJSON file, it's module level function, so it can be sent to worker process
+    :return: number of lines in range, valid records with their line numbers and errors of skipped lines,
+             line numbers start from 1 at the beginning of range
+    """
+    lines, values, malformed = parse_ndjson_range(filepath, start, end)
+    errors = [RecordError(line_number, {'line': [message]}) for line_number, message in malformed]
+    records = []
+    for line_number, data in values:
+        if record_errors := OrdersLoader.record_errors(data):
+            errors.append(RecordError(line_number, record_errors))
         else:
-            orders = {}
-            for client_order in orders_data:
-                client = Client.from_dict(client_order['client'])
-                cl_orders = [Product.from_dict(data) for data in client_order['client_orders']]
-                cl_orders_default = defaultdict(int)
-                for order in cl_orders:
-                    cl_orders_default[order] += 1
-                orders[client] = dict(cl_orders_default)
-
-            return orders
+            records.append((line_number, data))
+    errors.sort(key=lambda error: error.index)
+    return lines, records, errors
+
+
+@instrumentation.timed('validate')
+def _validate_chunk(start: int, records: list[dict[str, dict | list[dict]]]) -> list[RecordError]:
+    """ Validates chunk of records, it's module level function, so it can be sent to worker process """
+    return [RecordError(index, errors) for index, data in enumerate(records, start)
+            if (errors := OrdersLoader.record_errors(data))]
@@ -1,22 +1,59 @@
 import os
+from functools import cache
 from os.path import join, dirname
-from dotenv import load_dotenv
-from typing import Final
+from typing import Any, Callable, Final
+
+from ecommerce2.common import lazy_class_attribute
+
+""" Module stores settings resolved lazily from environment and .env file, with defaults for missing variables """
 
 dotenv_path = join(dirname(__file__), '.env')
-load_dotenv(dotenv_path)
+
+DEFAULTS: Final = {
+    'CLIENT_NAME_REGEX': r'^[A-Z]+$',
+    'CLIENT_SURNAME_REGEX': r'^[A-Z-]+$',
+    'CLIENT_BALANCE_REGEX': r'^\d+\.?\d*',
+    'CLIENT_AGE_RANGE_MIN': '18',
+    'PRODUCT_NAME_REGEX': r'^[A-Z-]+$',
+    'PRODUCT_CATEGORY_REGEX': r'^[A-Z]+$',
+    'PRODUCT_PRICE_REGEX': r'^[^-]\d+\.?\d*',
+}
+
+
+@cache
+def load_env() -> None:
+    """ Loads .env file into environment once, variables that are already set are not overridden """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv(dotenv_path)
+
+
+def get_setting(name: str) -> str | None:
+    """ :return: value of environment variable (.env file is loaded on first call) or its default """
+    load_env()
+    return os.getenv(name, DEFAULTS.get(name))
+
+
+class setting(lazy_class_attribute):
+    """ Class attribute resolved by get_setting() using its own name on first access, then cached in class """
+
+    def __init__(self, convert: Callable[[str | None], Any] = str):
+        super().__init__(lambda owner: convert(get_setting(self.name)))
+
 
 class TestSettings:
-    VALID_FILEPATH: Final = os.getenv('VALID_FILEPATH')
-    INVALID_FILEPATH: Final = str(os.getenv('INVALID_FILEPATH'))
-    FILEPATH_HAVING_INVALID_TYPE: Final = str(os.getenv('FILEPATH_HAVING_INVALID_TYPE'))
+    VALID_FILEPATH: Final = setting(lambda value: value)
+    INVALID_FILEPATH: Final = setting()
+    FILEPATH_HAVING_INVALID_TYPE: Final = setting()
 
 
 class ValidatorSettings:
-    CLIENT_NAME_REGEX = fr"{os.getenv('CLIENT_NAME_REGEX')}"
-    CLIENT_SURNAME_REGEX = fr"{os.getenv('CLIENT_SURNAME_REGEX')}"
-    CLIENT_BALANCE_REGEX = fr"{os.getenv('CLIENT_BALANCE_REGEX')}"
-    CLIENT_AGE_RANGE_MIN = int(os.getenv('CLIENT_AGE_RANGE_MIN'))
-    PRODUCT_NAME_REGEX = fr"{os.getenv('PRODUCT_NAME_REGEX')}"
-    PRODUCT_CATEGORY_REGEX = fr"{os.getenv('PRODUCT_CATEGORY_REGEX')}"
-    PRODUCT_PRICE_REGEX = fr"{os.getenv('PRODUCT_PRICE_REGEX')}"
+    CLIENT_NAME_REGEX = setting()
+    CLIENT_SURNAME_REGEX = setting()
+    CLIENT_BALANCE_REGEX = setting()
+    CLIENT_AGE_RANGE_MIN = setting(int)
+    PRODUCT_NAME_REGEX = setting()
+    PRODUCT_CATEGORY_REGEX = setting()
+    PRODUCT_PRICE_REGEX = setting()
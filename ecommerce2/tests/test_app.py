@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+from ecommerce2.app import main, to_jsonable, load_service
+from ecommerce2.benchmarks.generator import write_orders, write_orders_ndjson
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.instrumentation import instrumentation
+from ecommerce2.loader.json_loader import iter_file
+from ecommerce2.loader.orders_loader import OrdersLoader
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3
+
+
+@pytest.fixture
+def orders_files(tmp_path):
+    json_path = str(tmp_path / 'orders.json')
+    ndjson_path = str(tmp_path / 'orders.ndjson')
+    write_orders(json_path, 30, 3, 10, invalid_ratio=0.1, seed=1)
+    write_orders_ndjson(ndjson_path, 20, 2, 10, seed=2)
+    return json_path, ndjson_path
+
+
+def expected_service(json_path: str, ndjson_path: str) -> OrdersService:
+    orders = OrdersLoader.load_collecting_errors(iter_file(json_path)).orders
+    orders.update(OrdersLoader.load_ndjson(ndjson_path).orders)
+    return OrdersService(orders)
+
+
+class TestMain:
+    def test_json_output_of_all_reports(self, orders_files, capsys):
+        assert main(list(orders_files)) == 0
+        captured = capsys.readouterr()
+
+        expected = expected_service(*orders_files).compute_report()
+        assert json.loads(captured.out) == json.loads(json.dumps(to_jsonable(expected)))
+        assert captured.err.splitlines()[1] == f'{orders_files[1]}: 20 loaded, 0 invalid'
+
+    def test_csv_output_of_chosen_reports_to_file(self, orders_files, tmp_path, capsys):
+        output = tmp_path / 'report.csv'
+        main([*orders_files, '-r', 'clients_with_carts_value', '-r', 'client_with_biggest_spend', '--format', 'csv',
+              '--output', str(output), '--workers', '2', '--chunk-size', '7', '--chunk-bytes', '500'])
+        assert capsys.readouterr().out == ''
+
+        rows = list(csv.reader(io.StringIO(output.read_text())))
+        service = expected_service(*orders_files)
+        assert rows[0] == ['metric', 'key', 'value']
+        assert {row[0] for row in rows[1:]} == {'clients_with_carts_value', 'client_with_biggest_spend'}
+        assert [row[1:] for row in rows if row[0] == 'clients_with_carts_value'] == \
+               [[f'{client.name} {client.surname}', str(value)]
+                for client, value in service.clients_with_carts_value().items()]
+
+    def test_snapshot_is_written_and_reused(self, orders_files, tmp_path, capsys):
+        snapshot = str(tmp_path / 'orders.snapshot')
+        main([*orders_files, '--snapshot', snapshot, '-r', 'categories_stats'])
+        first = capsys.readouterr()
+        assert os.path.exists(snapshot)
+
+        main([*orders_files, '--snapshot', snapshot, '-r', 'categories_stats'])
+        second = capsys.readouterr()
+        assert second.out == first.out
+        assert second.err == ''
+
+    def test_snapshot_is_not_reused_for_other_files(self, orders_files, tmp_path, capsys):
+        snapshot = str(tmp_path / 'orders.snapshot')
+        main([orders_files[0], '--snapshot', snapshot, '-r', 'clients_with_carts_value'])
+        capsys.readouterr()
+        # second file is older than snapshot, but it wasn't loaded into it
+        os.utime(orders_files[1], (0, 0))
+        main([*orders_files, '--snapshot', snapshot, '-r', 'clients_with_carts_value'])
+        captured = capsys.readouterr()
+        assert captured.err.splitlines()[1] == f'{orders_files[1]}: 20 loaded, 0 invalid'
+        expected = expected_service(*orders_files).compute_report(['clients_with_carts_value'])
+        assert json.loads(captured.out) == json.loads(json.dumps(to_jsonable(expected)))
+
+    def test_snapshot_with_missing_file(self, orders_files, tmp_path, capsys):
+        snapshot = str(tmp_path / 'orders.snapshot')
+        main([*orders_files, '--snapshot', snapshot])
+        with pytest.raises(SystemExit) as e:
+            main([*orders_files, str(tmp_path / 'typo.json'), '--snapshot', snapshot])
+        assert e.value.code == 1
+        assert capsys.readouterr().err.endswith('error: Invalid filepath\n')
+
+    def test_snapshot_keeps_order_dates(self, tmp_path):
+        path = tmp_path / 'orders.json'
+        path.write_text(json.dumps([{
+            "client": {"name": "A", "surname": "B", "age": 18, "balance": "2000"},
+            "client_orders": [{"name": "TV", "category": "HOME", "price": "2000", "order_date": "2024-01-02"},
+                              {"name": "FRIDGE", "category": "HOME", "price": "3000"}]
+        }]))
+        snapshot = str(tmp_path / 'orders.snapshot')
+        loaded = load_service([str(path)], snapshot)
+        reused = load_service([str(path)], snapshot)
+        assert reused.orders == loaded.orders
+        assert reused.clients_with_carts_value(start='2024-01-01') == \
+               loaded.clients_with_carts_value(start='2024-01-01')
+        assert list(reused.clients_with_carts_value(start='2024-01-01').values()) == [Decimal('2000')]
+
+    def test_summary_counts_records(self, tmp_path, capsys):
+        record = {"client": {"name": "A", "surname": "B", "age": 18, "balance": "2000"},
+                  "client_orders": [{"name": "TV", "category": "HOME", "price": "2000"}]}
+        path = tmp_path / 'orders.json'
+        path.write_text(json.dumps([record, record, {"client": {}}]))
+        main([str(path), '-r', 'clients_with_carts_value'])
+        assert capsys.readouterr().err == f'{path}: 2 loaded, 1 invalid\n'
+
+    def test_output_error(self, orders_files, tmp_path, capsys):
+        with pytest.raises(SystemExit) as e:
+            main([orders_files[0], '--output', str(tmp_path)])
+        assert e.value.code == 1
+        assert f'error: Is a directory: {tmp_path}' in capsys.readouterr().err
+
+    def test_profile_prints_stages(self, orders_files, capsys):
+        main([orders_files[0], '--profile', '-r', 'categories_stats'])
+        err = capsys.readouterr().err
+        assert 'validate' in err and 'OrdersService.compute_report' in err and 'records.loaded' in err
+        assert not instrumentation.enabled
+
+    def test_invalid_file(self, tmp_path, capsys):
+        with pytest.raises(SystemExit) as e:
+            main([str(tmp_path / 'missing.json')])
+        assert e.value.code == 1
+        assert capsys.readouterr().err.endswith('error: Invalid filepath\n')
+
+    def test_ingest(self, orders_files, tmp_path, capsys):
+        main([orders_files[0], str(tmp_path / 'missing.json'), '--ingest', '-r', 'clients_with_carts_value'])
+        captured = capsys.readouterr()
+
+        expected = OrdersService(OrdersLoader.load_collecting_errors(iter_file(orders_files[0])).orders)
+        assert json.loads(captured.out) == json.loads(json.dumps(to_jsonable(expected.compute_report(
+            ['clients_with_carts_value']))))
+        assert captured.err.splitlines()[1] == f'{tmp_path / "missing.json"}: 0 loaded, 0 invalid, stopped: ' \
+                                               f'Invalid filepath'
+
+    def test_ingest_with_snapshot(self, orders_files, tmp_path, capsys):
+        with pytest.raises(SystemExit) as e:
+            main([orders_files[0], '--ingest', '--snapshot', str(tmp_path / 'orders.snapshot')])
+        assert e.value.code == 2
+
+    def test_without_input(self, capsys):
+        with pytest.raises(SystemExit) as e:
+            main([])
+        assert e.value.code == 2
+
+
+class TestToJsonable:
+    def test_client_keys_become_list(self, basic_orders_service, client_1):
+        converted = to_jsonable(basic_orders_service.clients_with_carts_value())
+        assert converted[0] == {
+            'key': {'name': client_1.name, 'surname': client_1.surname, 'age': client_1.age,
+                    'balance': str(client_1.balance)},
+            'value': str(basic_orders_service.clients_with_carts_value()[client_1])
+        }
@@ -0,0 +1,60 @@
+import pytest
+
+from ecommerce2.benchmarks.generator import letters_for, generate_catalog, generate_orders, write_orders
+from ecommerce2.loader.json_loader import iter_file
+from ecommerce2.loader.orders_loader import OrdersLoader
+
+
+class TestLettersFor:
+    @pytest.mark.parametrize(('idx', 'name'), [
+        (0, 'A'),
+        (25, 'Z'),
+        (26, 'BA'),
+        (27, 'BB'),
+    ])
+    def test_names(self, idx, name):
+        assert letters_for(idx) == name
+
+    def test_names_are_unique(self):
+        assert len({letters_for(idx) for idx in range(10000)}) == 10000
+
+
+class TestGenerateOrders:
+    def test_generated_orders_are_valid(self):
+        result = OrdersLoader.load_collecting_errors(generate_orders(50, 4, 10))
+        assert result.errors == []
+        assert len(result.orders) == 50
+        assert sum(sum(cart.values()) for cart in result.orders.values()) == 200
+
+    def test_catalog_size(self):
+        catalog = generate_catalog(7)
+        assert len({product['name'] for product in catalog}) == 7
+
+    def test_data_is_reproducible(self):
+        assert list(generate_orders(5, 3, 4, seed=1)) == list(generate_orders(5, 3, 4, seed=1))
+        assert list(generate_orders(5, 3, 4, seed=1)) != list(generate_orders(5, 3, 4, seed=2))
+
+    def test_with_invalid_records(self):
+        result = OrdersLoader.load_collecting_errors(generate_orders(200, 2, 10, invalid_ratio=0.5))
+        assert 0 < len(result.errors) < 200
+        assert len(result.orders) + len(result.errors) == 200
+
+    def test_with_all_records_invalid(self):
+        result = OrdersLoader.load_collecting_errors(generate_orders(20, 2, 10, invalid_ratio=1))
+        assert len(result.errors) == 20
+
+    @pytest.mark.parametrize(('kwargs',), [
+        ({'clients': -1},),
+        ({'invalid_ratio': 1.5},),
+        ({'products': 0},),
+    ])
+    def test_with_invalid_arguments(self, kwargs):
+        with pytest.raises(ValueError):
+            list(generate_orders(**{'clients': 1, 'lines_per_client': 1, 'products': 1, **kwargs}))
+
+
+class TestWriteOrders:
+    def test_written_file_can_be_streamed(self, tmp_path):
+        path = str(tmp_path / 'orders.json')
+        write_orders(path, 10, 2, 5)
+        assert list(iter_file(path)) == list(generate_orders(10, 2, 5))
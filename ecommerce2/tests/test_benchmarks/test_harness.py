@@ -0,0 +1,39 @@
+import json
+
+from ecommerce2.benchmarks.harness import compare, run_benchmark, main
+from ecommerce2.ecommerce_service.report import REPORT_METRICS
+
+
+class TestRunBenchmark:
+    def test_all_stages_are_measured(self):
+        results = run_benchmark(20, lines_per_client=2, products=5, memory=True)
+        assert {'generate', 'parse', 'validate', 'load', 'compute_report', *REPORT_METRICS} <= set(results)
+        assert all(result.seconds >= 0 and result.peak_bytes is not None for result in results.values())
+
+
+class TestCompare:
+    def test_regression_is_reported(self):
+        regressions = compare({'10k': {'load': {'seconds': 1.5, 'peak_bytes': 100}}},
+                              {'10k': {'load': {'seconds': 1.0, 'peak_bytes': 100}}})
+        assert regressions == ['10k load: seconds 1.5s > 1s (+50%)']
+
+    def test_within_tolerance(self):
+        assert compare({'10k': {'load': {'seconds': 1.1, 'peak_bytes': None}}},
+                       {'10k': {'load': {'seconds': 1.0, 'peak_bytes': 100}}}) == []
+
+    def test_stage_missing_in_baseline(self):
+        assert compare({'10k': {'load': {'seconds': 1.0, 'peak_bytes': None}}}, {}) == []
+
+
+class TestMain:
+    def test_output_and_baseline(self, tmp_path, capsys):
+        output = tmp_path / 'results.json'
+        assert main(['--sizes', '20', '--lines-per-client', '2', '--output', str(output)]) == 0
+        results = json.loads(output.read_text())
+        assert 'load' in results['20']
+
+        for stage in results['20'].values():
+            stage['seconds'] = 0.0 if stage['seconds'] == 0 else stage['seconds'] / 1000
+        output.write_text(json.dumps(results))
+        assert main(['--sizes', '20', '--lines-per-client', '2', '--baseline', str(output)]) == 1
+        assert 'REGRESSION' in capsys.readouterr().out
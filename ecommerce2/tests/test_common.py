@@ -1,3 +1,4 @@
+import re
 from collections import Counter
 
 import pytest
@@ -5,7 +6,7 @@ import pytest
 from decimal import Decimal
 
 from ecommerce2.common import first_elements_having_same_value, matches_regex, is_dict_structure_correct, \
-    get_n_top_elements_of_most_common_list
+    get_n_top_elements_of_most_common_list, top_n_with_ties, lazy_class_attribute
 
 
 class TestFirstElementsHavingSameValue:
@@ -53,6 +54,10 @@ class TestMatchingRegex:
     def test_for_expression_not_matching_regex(self):
         assert not matches_regex('123', r'^12$')
 
+    def test_for_compiled_regex(self):
+        assert matches_regex('ABC', re.compile(r'^ABC$'))
+        assert not matches_regex('123', re.compile(r'^12$'))
+
     @pytest.mark.parametrize(('expression',), [
         (1,),
         (1.1,),
@@ -116,3 +121,44 @@ class TestGetNTopElementsOfMostCommonList:
         with pytest.raises(IndexError) as e:
             get_n_top_elements_of_most_common_list(counter.most_common())
         assert e.value.args[0] == 'List is empty therefor index will be invalid'
+
+
+class TestTopNWithTies:
+    def test_when_no_ties(self):
+        assert top_n_with_ties([('a', 1), ('b', 3), ('c', 2)], 2) == [('b', 3), ('c', 2)]
+
+    def test_when_n_th_element_has_ties(self):
+        assert top_n_with_ties([('a', 1), ('b', 3), ('c', 1), ('d', 2), ('e', 1)], 3) == [
+            ('b', 3), ('d', 2), ('a', 1), ('c', 1), ('e', 1)]
+
+    def test_ties_above_n_th_element_keep_order(self):
+        assert top_n_with_ties([('a', 2), ('b', 3), ('c', 3), ('d', 1)], 2) == [('b', 3), ('c', 3)]
+
+    def test_when_n_is_greater_than_length(self):
+        assert top_n_with_ties([('a', 1), ('b', 2)], 5) == [('b', 2), ('a', 1)]
+
+    def test_with_empty_items(self):
+        assert top_n_with_ties([], 1) == []
+
+    @pytest.mark.parametrize(('n', 'error', 'message'), [
+        (0, ValueError, "n has to be greater than 0"),
+        ('1', TypeError, "Invalid n type"),
+    ])
+    def test_with_invalid_n(self, n, error, message):
+        with pytest.raises(error) as e:
+            top_n_with_ties([('a', 1)], n)
+        assert e.value.args[0] == message
+
+
+class TestLazyClassAttribute:
+    def test_value_is_computed_once_and_cached_in_class(self):
+        calls = []
+
+        class Owner:
+            VALUE = lazy_class_attribute(lambda cls: calls.append(cls) or len(calls))
+
+        assert calls == []
+        assert Owner.VALUE == 1
+        assert Owner().VALUE == 1
+        assert calls == [Owner]
+        assert Owner.__dict__['VALUE'] == 1
@@ -0,0 +1,128 @@
+import pickle
+from decimal import Decimal
+
+import pytest
+
+from ecommerce2.ecommerce_service.age_matrix import AgeCategoryMatrix
+from ecommerce2.ecommerce_service.model import Client, Category
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3, empty_orders_service
+
+
+class TestAgeCategoryMatrix:
+    def test_only_ages_of_clients_are_kept(self, basic_orders_service):
+        matrix = AgeCategoryMatrix.from_orders(basic_orders_service.orders)
+        assert list(matrix.ages) == [18, 24, 22]
+
+    def test_distant_ages(self, client_1, product_1, product_2):
+        matrix = AgeCategoryMatrix()
+        matrix.add(client_1, [product_1])
+        matrix.add(Client('ADAM', 'NOWAK', 500_000_000, Decimal('10.00')), [product_2])
+        assert matrix.most_popular(500_000_000) == [Category.HOME]
+        assert matrix.most_popular_in_range(18, 1_000_000_000) == [Category.HOME, Category.ELECTRONICS]
+        assert matrix.most_popular_in_range(19, 499_999_999) == []
+        assert len(matrix._prefix) == 3
+
+    def test_tied_categories_are_in_category_order(self, basic_orders_service):
+        matrix = AgeCategoryMatrix.from_orders(basic_orders_service.orders)
+        assert matrix.counts(18) == {Category.ELECTRONICS: 1, Category.HOME: 1}
+        assert matrix.most_popular(18) == [Category.HOME, Category.ELECTRONICS]
+        assert matrix.most_popular(19) == []
+
+    def test_range_counts_are_sums_of_rows(self, basic_orders_service):
+        matrix = AgeCategoryMatrix.from_orders(basic_orders_service.orders)
+        for min_age in range(15, 27):
+            for max_age in range(min_age, 27):
+                expected = [0] * len(Category)
+                for age in range(min_age, max_age + 1):
+                    for category, count in matrix.counts(age).items():
+                        expected[list(Category).index(category)] += count
+                assert matrix.range_counts(min_age, max_age) == expected
+
+    def test_prefix_sums_follow_new_counts(self, basic_orders_service):
+        matrix = AgeCategoryMatrix.from_orders(basic_orders_service.orders)
+        assert matrix.most_popular_in_range(18, 25) == [Category.HOME]
+        matrix.add_counts(22, {Category.AGD: 2})
+        assert matrix.most_popular_in_range(18, 25) == [Category.AGD]
+
+    def test_merge_gives_the_same_matrix(self, basic_orders_service):
+        orders = list(basic_orders_service.orders.items())
+        matrix = AgeCategoryMatrix.from_orders(dict(orders[:1]))
+        matrix.merge(pickle.loads(pickle.dumps(AgeCategoryMatrix.from_orders(dict(orders[1:])))))
+        expected = AgeCategoryMatrix.from_orders(basic_orders_service.orders)
+        assert matrix.ages == expected.ages
+
+    @pytest.mark.parametrize(('min_age', 'max_age', 'error', 'message'), [
+        ('18', 25, TypeError, "Invalid age type"),
+        (18, None, TypeError, "Invalid age type"),
+        (25, 18, ValueError, "Minimal age can't be greater than maximal age"),
+    ])
+    def test_invalid_range(self, basic_orders_service, min_age, max_age, error, message):
+        with pytest.raises(error) as e:
+            AgeCategoryMatrix.from_orders(basic_orders_service.orders).range_counts(min_age, max_age)
+        assert e.value.args[0] == message
+
+    @pytest.mark.parametrize(('bucket_size', 'error', 'message'), [
+        (2.5, TypeError, "Invalid bucket size type"),
+        (0, ValueError, "Bucket size has to be greater than 0"),
+    ])
+    def test_invalid_bucket_size(self, bucket_size, error, message):
+        with pytest.raises(error) as e:
+            AgeCategoryMatrix().most_popular_in_buckets(bucket_size)
+        assert e.value.args[0] == message
+
+
+class TestOrdersServiceAgeQueries:
+    @pytest.mark.parametrize(('min_age', 'max_age', 'expected'), [
+        (18, 25, [Category.HOME]),
+        (22, 24, [Category.HOME, Category.AGD]),
+        (18, 18, [Category.HOME, Category.ELECTRONICS]),
+        (19, 21, []),
+        (30, 40, []),
+    ])
+    def test_age_range(self, basic_orders_service, min_age, max_age, expected):
+        assert basic_orders_service.most_popular_categories_for_age_range(min_age, max_age) == expected
+
+    def test_age_buckets(self, basic_orders_service):
+        assert basic_orders_service.most_popular_categories_for_age_buckets(5, origin=18) == {
+            (18, 22): [Category.HOME, Category.ELECTRONICS, Category.AGD],
+            (23, 27): [Category.HOME]
+        }
+        assert basic_orders_service.most_popular_categories_for_age_buckets(10) == {
+            (10, 19): [Category.HOME, Category.ELECTRONICS],
+            (20, 29): [Category.HOME, Category.AGD]
+        }
+
+    def test_with_empty_orders(self, empty_orders_service):
+        assert empty_orders_service.most_popular_categories_for_age_range(18, 99) == []
+        assert empty_orders_service.most_popular_categories_for_age_buckets(10) == {}
+
+    def test_tracked_aggregates_follow_removed_lines(self, basic_orders_service, client_2, product_2):
+        basic_orders_service.track_aggregates()
+        basic_orders_service.remove_order_line(client_2, product_2)
+        assert basic_orders_service.most_popular_categories_for_age_range(22, 24) == [Category.AGD]
+
+    def test_cached_matrix_is_shared_by_ranges(self, basic_orders_service, client_2, product_1):
+        basic_orders_service.enable_cache()
+        assert basic_orders_service.most_popular_categories_for_age_range(18, 25) == [Category.HOME]
+        matrix = basic_orders_service._age_matrix()
+        basic_orders_service.most_popular_categories_for_age_range(20, 30)
+        assert basic_orders_service._age_matrix() is matrix
+        basic_orders_service.add_order_line(client_2, product_1)
+        assert basic_orders_service._age_matrix() is not matrix
+
+    def test_matrix_is_shared_without_cache(self, basic_orders_service, client_2, product_1):
+        basic_orders_service.most_popular_categories_for_age_range(18, 25)
+        matrix = basic_orders_service._age_matrix()
+        basic_orders_service.most_popular_categories_for_age_range(20, 30)
+        assert basic_orders_service._age_matrix() is matrix
+        basic_orders_service.invalidate()
+        assert basic_orders_service._age_matrix() is not matrix
+
+    def test_report_with_distant_ages(self, client_1, product_1, product_2):
+        oldest = Client('ADAM', 'NOWAK', 500_000_000, Decimal('10.00'))
+        service = OrdersService({client_1: {product_1: 1}, oldest: {product_2: 1}})
+        assert service.compute_report()['most_popular_categories_for_clients_ages'] == {
+            18: [Category.ELECTRONICS], 500_000_000: [Category.HOME]
+        }
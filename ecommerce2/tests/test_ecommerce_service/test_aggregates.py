@@ -0,0 +1,109 @@
+from ecommerce2.ecommerce_service.aggregates import Leaderboard, OrdersAggregates
+from ecommerce2.ecommerce_service.model import Category
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3
+
+
+class TestLeaderboard:
+    def test_leaders_are_ordered_by_rank(self):
+        leaderboard = Leaderboard(rank=lambda key: key)
+        leaderboard.set('C', 2)
+        leaderboard.set('A', 2)
+        leaderboard.set('B', 1)
+        assert leaderboard.leaders() == ['A', 'C']
+        assert leaderboard.max_value() == 2
+
+    def test_add_changes_leaders(self):
+        leaderboard = Leaderboard(rank=lambda key: key)
+        leaderboard.add('A', 1)
+        leaderboard.add('B', 2)
+        leaderboard.add('A', 2)
+        assert leaderboard.leaders() == ['A']
+        leaderboard.add('A', -1)
+        assert leaderboard.leaders() == ['A', 'B']
+        assert leaderboard.values == {'A': 2, 'B': 2}
+
+    def test_remove(self):
+        leaderboard = Leaderboard(rank=lambda key: key)
+        leaderboard.set('A', 3)
+        leaderboard.set('B', 1)
+        leaderboard.remove('A')
+        assert 'A' not in leaderboard
+        assert len(leaderboard) == 1
+        assert leaderboard.leaders() == ['B']
+        assert leaderboard.max_value() == 1
+
+    def test_top_with_ties(self):
+        leaderboard = Leaderboard(rank=lambda key: key)
+        for key, value in [('D', 1), ('C', 2), ('B', 3), ('A', 2)]:
+            leaderboard.set(key, value)
+        assert leaderboard.top(1) == [('B', 3)]
+        assert leaderboard.top(2) == [('B', 3), ('A', 2), ('C', 2)]
+        assert leaderboard.top(10) == [('B', 3), ('A', 2), ('C', 2), ('D', 1)]
+
+    def test_when_empty(self):
+        leaderboard = Leaderboard(rank=lambda key: key)
+        assert leaderboard.leaders() == []
+        assert leaderboard.top(3) == []
+        assert leaderboard.max_value() is None
+
+    def test_top_skips_stale_and_repeated_values(self):
+        leaderboard = Leaderboard(rank=lambda key: key)
+        leaderboard.set('A', 5)
+        leaderboard.set('A', 1)
+        leaderboard.set('B', 5)
+        leaderboard.set('C', 3)
+        assert leaderboard.top(2) == [('B', 5), ('C', 3)]
+        assert leaderboard.top(2) == [('B', 5), ('C', 3)]
+        assert leaderboard.top(3) == [('B', 5), ('C', 3), ('A', 1)]
+        assert leaderboard.leaders() == ['B']
+
+    def test_stale_values_are_skipped(self):
+        leaderboard = Leaderboard(rank=lambda key: key)
+        for value in range(100):
+            leaderboard.set('A', value)
+        leaderboard.set('B', 5)
+        assert leaderboard.max_value() == 99
+        leaderboard.set('A', 1)
+        assert leaderboard.max_value() == 5
+        assert leaderboard.leaders() == ['B']
+        assert len(leaderboard._heap) <= 2 * len(leaderboard._keys_by_value) + 16
+
+    def test_load(self):
+        leaderboard = Leaderboard(rank=lambda key: key)
+        leaderboard.set('Z', 10)
+        leaderboard.load({'C': 2, 'A': 3, 'B': 3})
+        assert 'Z' not in leaderboard
+        assert leaderboard.leaders() == ['A', 'B']
+        assert leaderboard.top(3) == [('A', 3), ('B', 3), ('C', 2)]
+        leaderboard.add('C', 2)
+        assert leaderboard.leaders() == ['C']
+
+
+class TestOrdersAggregates:
+    def test_from_orders(self, basic_orders_service, client_1, client_2, client_3):
+        aggregates = OrdersAggregates.from_orders(basic_orders_service.orders)
+        assert aggregates.spend.values == {client_1: 760000, client_2: 320000, client_3: 200000}
+        assert aggregates.category_spend[Category.HOME].values == {client_1: 640000, client_2: 320000}
+        assert aggregates.category_quantity[Category.HOME].values == {client_1: 2, client_2: 1}
+        assert aggregates.age_categories == {
+            18: {Category.ELECTRONICS: 1, Category.HOME: 1},
+            24: {Category.HOME: 1},
+            22: {Category.AGD: 1}
+        }
+
+    def test_removing_last_line_of_category(self, basic_orders_service, client_2, product_2):
+        aggregates = OrdersAggregates.from_orders(basic_orders_service.orders)
+        aggregates.remove_line(client_2, product_2, 1, 1)
+        assert client_2 not in aggregates.category_quantity[Category.HOME]
+        assert aggregates.spend.get(client_2) == 0
+        assert aggregates.most_popular_categories(24) == []
+
+    def test_tied_categories_do_not_depend_on_history(self, basic_orders_service, client_1, product_1, product_2):
+        basic_orders_service.track_aggregates()
+        basic_orders_service.remove_order_line(client_1, product_1)
+        basic_orders_service.add_order_line(client_1, product_1)
+        expected = {18: [Category.HOME, Category.ELECTRONICS], 24: [Category.HOME], 22: [Category.AGD]}
+        assert basic_orders_service.most_popular_categories_for_clients_ages() == expected
+        assert OrdersService(dict(basic_orders_service.orders)).most_popular_categories_for_clients_ages() == expected
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+import pytest
+
+from ecommerce2.ecommerce_service.cache import QueryCache
+from ecommerce2.ecommerce_service.model import Category
+from ecommerce2.ecommerce_service.report import REPORT_METRICS
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3
+
+
+class TestQueryCache:
+    def test_least_recently_used_is_evicted(self):
+        cache = QueryCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1 and cache.get('c') == 3
+        assert len(cache) == 2
+        assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (3, 1, 1)
+        assert cache.stats.hit_ratio == 0.75
+
+    @pytest.mark.parametrize(('maxsize', 'error', 'message'), [
+        (0, ValueError, "Maxsize has to be greater than 0"),
+        ('1', TypeError, "Invalid maxsize type"),
+    ])
+    def test_with_invalid_maxsize(self, maxsize, error, message):
+        with pytest.raises(error) as e:
+            QueryCache(maxsize)
+        assert e.value.args[0] == message
+
+
+class TestCachedOrdersService:
+    def test_repeated_query_is_hit(self, basic_orders_service):
+        cache = basic_orders_service.enable_cache()
+        first = basic_orders_service.categories_stats()
+        assert basic_orders_service.categories_stats() is first
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    def test_arguments_are_part_of_key(self, basic_orders_service, client_1):
+        cache = basic_orders_service.enable_cache()
+        assert basic_orders_service.client_with_biggest_spend_in_category(Category.HOME) == [client_1]
+        assert basic_orders_service.client_with_biggest_spend_in_category(Category.RTV) == []
+        assert basic_orders_service.client_with_biggest_spend_in_category(Category.HOME) == [client_1]
+        assert cache.stats.hits == 1
+
+    def test_balances_reuse_cached_carts_value(self, basic_orders_service, client_1):
+        cache = basic_orders_service.enable_cache()
+        carts_value = basic_orders_service.clients_with_carts_value()
+        balances = basic_orders_service.clients_balances_after_completing_orders()
+        assert cache.stats.hits == 1
+        assert balances == {client: client.balance_after_spending(value) for client, value in carts_value.items()}
+
+    def test_mutation_bumps_version(self, basic_orders_service, client_2, product_1):
+        basic_orders_service.enable_cache()
+        before = basic_orders_service.clients_with_carts_value()
+        version = basic_orders_service.data_version
+        basic_orders_service.add_order_line(client_2, product_1)
+
+        assert basic_orders_service.data_version == version + 1
+        assert basic_orders_service.clients_with_carts_value()[client_2] == before[client_2] + product_1.price
+
+    def test_invalidate_after_direct_change(self, basic_orders_service, client_2, product_2):
+        basic_orders_service.enable_cache()
+        assert basic_orders_service.clients_with_carts_value()[client_2] == Decimal('3200')
+        basic_orders_service.orders[client_2][product_2] = 2
+        basic_orders_service.invalidate()
+        assert basic_orders_service.clients_with_carts_value()[client_2] == Decimal('6400')
+
+    def test_report_fills_and_uses_cache(self, basic_orders_service):
+        expected = OrdersService(basic_orders_service.orders).compute_report()
+        cache = basic_orders_service.enable_cache()
+        basic_orders_service.categories_stats()
+
+        assert basic_orders_service.compute_report() == expected
+        assert cache.stats.hits == 1
+        assert basic_orders_service.clients_with_carts_value() == expected['clients_with_carts_value']
+        assert len(cache) == len(REPORT_METRICS)
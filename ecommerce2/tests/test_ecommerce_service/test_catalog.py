@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+import pytest
+
+from ecommerce2.ecommerce_service.catalog import ProductCatalog
+from ecommerce2.ecommerce_service.model import Product, Category
+from ecommerce2.tests.fixtures import product_1, product_2, product1_data
+
+
+class TestProductCatalog:
+    def test_ids_are_dense(self, product_1, product_2):
+        catalog = ProductCatalog()
+        assert catalog.id_of(product_1) == 0
+        assert catalog.id_of(product_2) == 1
+        assert catalog.id_of(Product("TV", Category.ELECTRONICS, Decimal("1200"))) == 0
+        assert len(catalog) == 2
+        assert catalog.get(1) is product_2
+
+    def test_intern_returns_canonical_instance(self, product_1):
+        catalog = ProductCatalog()
+        catalog.intern(product_1)
+        assert catalog.intern(Product("TV", Category.ELECTRONICS, Decimal("1200"))) is product_1
+        assert product_1 in catalog
+
+    def test_from_dict_returns_canonical_instance(self, product1_data, product_1):
+        catalog = ProductCatalog()
+        first = catalog.from_dict(dict(product1_data))
+        assert first == product_1
+        assert catalog.from_dict(dict(product1_data)) is first
+        assert catalog.from_dict({**product1_data, 'price': '1200.00'}) is first
+        assert len(catalog) == 1
+
+    @pytest.mark.parametrize(('product_data',), [
+        ({},),
+        ({'name': 'TV', 'category': 'ELECTRONICS', 'price': '1', 'extra': 1},),
+        ({'name': 'TV', 'category': 'ELECTRONICS', 'cost': '1'},),
+    ])
+    def test_from_dict_with_invalid_structure(self, product_data):
+        with pytest.raises(ValueError) as e:
+            ProductCatalog().from_dict(product_data)
+        assert e.value.args[0] == "Invalid structure of product_data"
+
+    def test_with_invalid_product_type(self):
+        with pytest.raises(TypeError) as e:
+            ProductCatalog().id_of(('TV', 'ELECTRONICS', '1200'))
+        assert e.value.args[0] == "Invalid product type"
+
+    def test_products_are_slotted(self, product_1):
+        assert not hasattr(product_1, '__dict__')
@@ -0,0 +1,107 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from ecommerce2.ecommerce_service.category_stats import CategoryStats, select
+from ecommerce2.ecommerce_service.model import Product, Category
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3, home_product1, home_product2, home_product3
+
+
+def home_products(*prices: str) -> list[Product]:
+    return [Product(f"P{idx}", Category.HOME, Decimal(price)) for idx, price in enumerate(prices)]
+
+
+class TestSelect:
+    @pytest.mark.parametrize(('values',), [
+        ([5, 1, 4, 2, 3],),
+        ([1, 2, 3, 4, 5, 6],),
+        ([6, 5, 4, 3, 2, 1],),
+        ([2, 2, 2, 1, 1, 3, 3],),
+        ([7],),
+    ])
+    def test_selects_each_rank(self, values):
+        for k in range(len(values)):
+            assert select(list(values), k) == sorted(values)[k]
+
+    def test_with_random_values(self):
+        generator = random.Random(7)
+        values = [generator.randint(0, 50) for _ in range(501)]
+        for k in (0, 250, 500):
+            assert select(list(values), k) == sorted(values)[k]
+
+
+class TestCategoryStats:
+    def test_ties_are_kept_in_order_of_adding(self):
+        products = home_products('2.00', '1.00', '2.00', '1.00', '1.50')
+        stats = CategoryStats.from_products(products)
+        assert stats.most_expensive == [products[0], products[2]]
+        assert stats.cheapest == [products[1], products[3]]
+        assert stats.price_mean == Decimal('1.5')
+
+    def test_same_product_is_counted_once(self, home_product1, home_product2):
+        stats = CategoryStats.from_products([home_product1, home_product2, home_product1])
+        assert len(stats) == 2
+        assert stats.price_mean == Decimal('1.5')
+        assert stats.cheapest == [home_product1]
+
+    def test_merge(self, home_product1, home_product2, home_product3):
+        stats = CategoryStats.from_products([home_product3, home_product1])
+        stats.merge(CategoryStats.from_products([home_product1, home_product2]))
+        assert list(stats.products) == [home_product3, home_product1, home_product2]
+        assert stats.result() == CategoryStats.from_products([home_product3, home_product1, home_product2]).result()
+
+    def test_extended_result(self):
+        stats = CategoryStats.from_products(home_products('2', '4', '4', '4', '5', '5', '7', '9'), keep_prices=True)
+        result = stats.result(extended=True)
+        assert result["price_mean"] == Decimal('5')
+        assert result["price_median"] == Decimal('4.5')
+        assert result["price_stddev"] == Decimal('2')
+
+    def test_percentiles_are_interpolated(self):
+        stats = CategoryStats.from_products(home_products('40', '10', '30', '20'), keep_prices=True)
+        assert stats.result(percentiles=(0, 25, 50, 100))["price_percentiles"] == {
+            0: Decimal('10'), 25: Decimal('17.5'), 50: Decimal('25'), 100: Decimal('40')
+        }
+        assert stats.prices == [4000, 1000, 3000, 2000]
+
+    def test_percentile_without_kept_prices(self, home_product1):
+        with pytest.raises(ValueError) as e:
+            CategoryStats.from_products([home_product1]).percentile(50)
+        assert e.value.args[0] == "Prices were not kept"
+
+    @pytest.mark.parametrize(('percent', 'error', 'message'), [
+        ('50', TypeError, "Invalid percentile type"),
+        (True, TypeError, "Invalid percentile type"),
+        (-1, ValueError, "Percentile has to be between 0 and 100"),
+        (100.5, ValueError, "Percentile has to be between 0 and 100"),
+    ])
+    def test_invalid_percentile(self, home_product1, percent, error, message):
+        with pytest.raises(error) as e:
+            CategoryStats.from_products([home_product1], keep_prices=True).percentile(percent)
+        assert e.value.args[0] == message
+
+
+class TestOrdersServiceCategoriesStats:
+    def test_extended(self, basic_orders_service, product_1):
+        stats = basic_orders_service.categories_stats(extended=True, percentiles=(90,))[Category.ELECTRONICS]
+        assert stats == {
+            "price_mean": Decimal('1200'),
+            "most_expensive_product": [product_1],
+            "cheapest_product": [product_1],
+            "price_median": Decimal('1200'),
+            "price_stddev": Decimal('0'),
+            "price_percentiles": {90: Decimal('1200')}
+        }
+
+    def test_default_result_is_not_changed(self, basic_orders_service):
+        extended = basic_orders_service.categories_stats(extended=True)
+        assert {category: {key: stats[key] for key in ("price_mean", "most_expensive_product", "cheapest_product")}
+                for category, stats in extended.items()} == basic_orders_service.categories_stats()
+
+    def test_with_cache(self, basic_orders_service):
+        basic_orders_service.enable_cache()
+        assert basic_orders_service.categories_stats(percentiles=(50,)) is \
+               basic_orders_service.categories_stats(percentiles=(50,))
+        assert "price_percentiles" not in basic_orders_service.categories_stats()[Category.HOME]
@@ -0,0 +1,146 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from ecommerce2.ecommerce_service.client_index import ClientFilter, ClientIndex
+from ecommerce2.ecommerce_service.model import Client, Category
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.ecommerce_service.report import REPORT_METRICS
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3
+
+
+@pytest.fixture
+def clients():
+    return [
+        Client('ANNA', 'KOWALSKA', 34, Decimal('100')),
+        Client('JAN', 'NOWAK', 30, Decimal('100')),
+        Client('ADAM', 'KOWALSKI', 41, Decimal('100')),
+        Client('JAN', 'KOWAL', 40, Decimal('100')),
+        Client('PIOTR', 'KOZA', 35, Decimal('100')),
+        Client('ANNA', 'KOW', 29, Decimal('100')),
+    ]
+
+
+class TestClientFilter:
+    @pytest.mark.parametrize(('kwargs', 'error', 'message'), [
+        ({'surname_prefix': 1}, TypeError, "Invalid prefix type"),
+        ({'name_prefix': b'A'}, TypeError, "Invalid prefix type"),
+        ({'min_age': '18'}, TypeError, "Invalid age type"),
+        ({'max_age': True}, TypeError, "Invalid age type"),
+        ({'min_age': 40, 'max_age': 30}, ValueError, "Minimal age can't be greater than maximal age"),
+    ])
+    def test_invalid_filter(self, kwargs, error, message):
+        with pytest.raises(error) as e:
+            ClientFilter(**kwargs)
+        assert e.value.args[0] == message
+
+    def test_filter_is_hashable(self):
+        assert hash(ClientFilter('KOW', min_age=30)) == hash(ClientFilter('KOW', min_age=30))
+
+
+class TestClientIndex:
+    @pytest.mark.parametrize(('where', 'expected'), [
+        (ClientFilter(surname_prefix='KOW'), [0, 2, 3, 5]),
+        (ClientFilter(surname_prefix='KOWAL'), [0, 2, 3]),
+        (ClientFilter(surname_prefix='KO'), [0, 2, 3, 4, 5]),
+        (ClientFilter(surname_prefix='Z'), []),
+        (ClientFilter(name_prefix='AN'), [0, 5]),
+        (ClientFilter(min_age=30, max_age=40), [0, 1, 3, 4]),
+        (ClientFilter(min_age=35), [2, 3, 4]),
+        (ClientFilter(max_age=30), [1, 5]),
+        (ClientFilter(surname_prefix='KOW', min_age=30, max_age=40), [0, 3]),
+        (ClientFilter(surname_prefix='KOW', name_prefix='JAN', max_age=40), [3]),
+        (ClientFilter(), [0, 1, 2, 3, 4, 5]),
+    ])
+    def test_find(self, clients, where, expected):
+        assert ClientIndex.from_clients(clients).find(where) == [clients[idx] for idx in expected]
+
+    def test_find_is_the_same_as_scan(self):
+        generator = random.Random(5)
+        clients = [Client(''.join(generator.choices('AB', k=3)), ''.join(generator.choices('ABC', k=4)),
+                          generator.randint(18, 60), Decimal('1')) for _ in range(300)]
+        clients = list(dict.fromkeys(clients))
+        index = ClientIndex.from_clients(clients)
+        for where in [ClientFilter('AB', min_age=25, max_age=40), ClientFilter('C', 'B'), ClientFilter(max_age=20),
+                      ClientFilter(name_prefix='AAA', min_age=30)]:
+            assert index.find(where) == [client for client in clients if where.matches(client)]
+
+    def test_bulk_build_is_the_same_as_adding(self, clients):
+        added = ClientIndex()
+        for client in clients + clients[:2]:
+            added.add(client)
+        built = ClientIndex.from_clients(clients + clients[:2])
+        assert len(built) == len(clients)
+        for where in [ClientFilter('KOW'), ClientFilter(name_prefix='J'), ClientFilter(min_age=30, max_age=35)]:
+            assert built.find(where) == added.find(where)
+        built.add(Client('OLA', 'KOWAL', 33, Decimal('1')))
+        assert built.find(ClientFilter('KOWAL', min_age=33, max_age=40))[-1] == Client('OLA', 'KOWAL', 33, Decimal('1'))
+
+    def test_remove(self, clients):
+        index = ClientIndex.from_clients(clients)
+        index.remove(clients[0])
+        assert clients[0] not in index
+        assert len(index) == 5
+        assert index.find(ClientFilter(surname_prefix='KOWAL')) == [clients[2], clients[3]]
+        with pytest.raises(ValueError) as e:
+            index.remove(clients[0])
+        assert e.value.args[0] == "Client is not indexed"
+
+
+class TestOrdersServiceClientFilters:
+    def test_find_clients(self, basic_orders_service, client_2, client_3):
+        assert basic_orders_service.find_clients(ClientFilter(min_age=20)) == [client_2, client_3]
+
+    def test_find_clients_with_invalid_filter(self, basic_orders_service):
+        with pytest.raises(TypeError) as e:
+            basic_orders_service.find_clients({'min_age': 20})
+        assert e.value.args[0] == "Invalid client filter type"
+
+    def test_index_follows_added_clients(self, basic_orders_service, client_2, client_3, product_1):
+        where = ClientFilter(surname_prefix='S')
+        assert basic_orders_service.find_clients(where) == [client_2, client_3]
+        new_client = Client('ZOE', 'SMALL', 50, Decimal('10'))
+        basic_orders_service.add_client(new_client)
+        basic_orders_service.merge({Client('ADA', 'STONE', 19, Decimal('10')): {product_1: 1}})
+        assert basic_orders_service.find_clients(where)[-2:] == [new_client, Client('ADA', 'STONE', 19, Decimal('10'))]
+
+    def test_index_is_rebuilt_after_invalidate(self, basic_orders_service, client_1):
+        assert basic_orders_service.find_clients(ClientFilter(max_age=18)) == [client_1]
+        del basic_orders_service.orders[client_1]
+        basic_orders_service.invalidate()
+        assert basic_orders_service.find_clients(ClientFilter(max_age=18)) == []
+
+    def test_restricted_queries(self, basic_orders_service, client_2):
+        where = ClientFilter(min_age=20)
+        assert basic_orders_service.client_with_biggest_spend(where=where) == [client_2]
+        assert basic_orders_service.categories_with_biggest_clients(where=where)[Category.ELECTRONICS] == []
+        assert basic_orders_service.most_popular_categories_for_clients_ages(where=where) == {
+            24: [Category.HOME], 22: [Category.AGD]
+        }
+
+    def test_restricted_report(self, basic_orders_service):
+        where = ClientFilter(surname_prefix='S')
+        subset = OrdersService({client: cart for client, cart in basic_orders_service.orders.items()
+                                if client.surname.startswith('S')})
+        assert basic_orders_service.compute_report(where=where) == subset.compute_report()
+        for metric in REPORT_METRICS:
+            assert getattr(basic_orders_service, metric)(where=where) == getattr(subset, metric)(), metric
+
+    def test_restricted_and_windowed_query(self, client_1, client_2, product_1, product_2):
+        service = OrdersService({})
+        service.add_client(client_1)
+        service.add_client(client_2)
+        service.add_order_line(client_1, product_1, 1, '2024-01-10')
+        service.add_order_line(client_2, product_2, 1, '2024-01-10')
+        service.add_order_line(client_2, product_1, 1, '2023-01-10')
+        assert service.clients_with_carts_value(start='2024-01-01', where=ClientFilter(min_age=20)) == {
+            client_2: Decimal('3200')
+        }
+
+    def test_cache_keeps_results_of_each_filter(self, basic_orders_service, client_1, client_2):
+        basic_orders_service.enable_cache()
+        assert basic_orders_service.client_with_biggest_spend(where=ClientFilter(min_age=20)) == [client_2]
+        assert basic_orders_service.client_with_biggest_spend(where=ClientFilter(max_age=20)) == [client_1]
+        assert basic_orders_service.client_with_biggest_spend() == [client_1]
@@ -0,0 +1,52 @@
+from ecommerce2.ecommerce_service.columnar import ColumnarOrdersService
+from ecommerce2.ecommerce_service.model import Category
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3, empty_orders_service, orders_service_with_two_clients_having_same_age, client_2_ghost, rtv_product1, \
+    kitchen_product1
+
+QUERIES = [
+    ('client_with_biggest_spend', ()),
+    ('client_with_biggest_spend_in_category', (Category.HOME,)),
+    ('client_with_biggest_spend_in_category', (Category.RTV,)),
+    ('most_popular_categories_for_clients_ages', ()),
+    ('categories_stats', ()),
+    ('categories_with_biggest_clients', ()),
+    ('clients_with_carts_value', ()),
+    ('clients_balances_after_completing_orders', ()),
+]
+
+
+def assert_same_results(service: OrdersService) -> None:
+    columnar = ColumnarOrdersService.from_orders(service.orders)
+    for method, args in QUERIES:
+        assert getattr(columnar, method)(*args) == getattr(service, method)(*args), method
+
+
+class TestColumnarOrdersService:
+    def test_columns_are_filled(self, basic_orders_service, product_2):
+        columnar = ColumnarOrdersService.from_orders(basic_orders_service.orders)
+        assert list(columnar.client_ids) == [0, 0, 1, 2]
+        assert list(columnar.product_ids) == [0, 1, 1, 2]
+        assert list(columnar.categories) == [Category.ELECTRONICS.value, Category.HOME.value, Category.HOME.value,
+                                             Category.AGD.value]
+        assert list(columnar.quantities) == [1, 2, 1, 1]
+        assert list(columnar.prices) == [120000, 320000, 320000, 200000]
+        assert columnar.products[1] is product_2
+
+    def test_with_basic_service(self, basic_orders_service):
+        assert_same_results(basic_orders_service)
+
+    def test_with_clients_having_same_age(self, orders_service_with_two_clients_having_same_age):
+        assert_same_results(orders_service_with_two_clients_having_same_age)
+
+    def test_with_ties(self, basic_orders_service, client_1, client_2, product_1, product_2, rtv_product1,
+                       kitchen_product1):
+        basic_orders_service.orders[client_2][product_2] = 2
+        basic_orders_service.orders[client_2][product_1] = 1
+        basic_orders_service.orders[client_1][rtv_product1] = 3
+        basic_orders_service.orders[client_1][kitchen_product1] = 1
+        assert_same_results(basic_orders_service)
+
+    def test_with_empty_service(self, empty_orders_service):
+        assert_same_results(empty_orders_service)
@@ -1,3 +1,4 @@
+import pickle
 from decimal import Decimal
 
 import pytest
@@ -52,6 +53,12 @@ class TestClient:
 
 
 class TestProduct:
+    def test_pickled_product_has_the_same_hash(self, product_1):
+        unpickled = pickle.loads(pickle.dumps(product_1))
+        assert unpickled == product_1
+        assert hash(unpickled) == hash(product_1)
+        assert unpickled.price_minor == product_1.price_minor
+
     class TestFromDict:
         def test_for_all_values_valid(self, product1_data, product_1):
             assert Product.from_dict(product1_data) == product_1
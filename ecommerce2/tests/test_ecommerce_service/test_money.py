@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+import pytest
+
+from ecommerce2.ecommerce_service.model import Product, Category
+from ecommerce2.ecommerce_service.money import to_minor_units, from_minor_units
+from ecommerce2.tests.fixtures import product_1
+
+
+class TestMinorUnits:
+    @pytest.mark.parametrize(('value', 'minor'), [
+        (Decimal('12'), 1200),
+        (Decimal('12.3'), 1230),
+        (Decimal('0.01'), 1),
+        (Decimal('-5.50'), -550),
+    ])
+    def test_conversion(self, value, minor):
+        assert to_minor_units(value) == minor
+        assert from_minor_units(minor) == value
+
+    def test_when_value_is_too_precise(self):
+        with pytest.raises(ValueError) as e:
+            to_minor_units(Decimal('0.001'))
+        assert e.value.args[0] == "Value is more precise than minor unit"
+
+    def test_with_invalid_type(self):
+        with pytest.raises(TypeError) as e:
+            to_minor_units(1.5)
+        assert e.value.args[0] == "Invalid value type"
+
+
+    def test_with_int(self):
+        assert to_minor_units(12) == 1200
+
+    def test_when_trailing_zeros_exceed_precision(self):
+        assert to_minor_units(Decimal('1.500')) == 150
+
+
+class TestProductPriceMinor:
+    def test_price_minor_is_computed(self, product_1):
+        assert product_1.price_minor == 120000
+
+    def test_price_minor_is_not_compared(self, product_1):
+        assert product_1 == Product("TV", Category.ELECTRONICS, Decimal("1200.00"))
+        assert hash(product_1) == hash(Product("TV", Category.ELECTRONICS, Decimal("1200.00")))
+
+    def test_with_too_precise_price(self):
+        with pytest.raises(ValueError) as e:
+            Product("TV", Category.ELECTRONICS, Decimal("0.001"))
+        assert e.value.args[0] == "Value is more precise than minor unit"
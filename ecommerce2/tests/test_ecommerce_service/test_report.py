@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+import pytest
+
+from ecommerce2.ecommerce_service.report import ReportAccumulator, REPORT_METRICS, CLIENTS_WITH_CARTS_VALUE, \
+    CATEGORIES_STATS
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3, empty_orders_service
+
+
+class TestReportAccumulator:
+    def test_unknown_metric(self):
+        with pytest.raises(ValueError) as e:
+            ReportAccumulator(['clients_with_carts_value', 'unknown'])
+        assert e.value.args[0] == "Unknown metrics: unknown"
+
+    def test_result_of_not_accumulated_metric(self, basic_orders_service):
+        accumulator = ReportAccumulator.from_orders(basic_orders_service.orders, [CLIENTS_WITH_CARTS_VALUE])
+        with pytest.raises(ValueError) as e:
+            accumulator.result(CATEGORIES_STATS)
+        assert e.value.args[0] == "Metric categories_stats was not accumulated"
+
+    def test_only_requested_sums_are_collected(self):
+        accumulator = ReportAccumulator([CATEGORIES_STATS])
+        assert accumulator.spend is None
+        assert accumulator.age_matrix is None
+        assert accumulator.category_quantities is None
+        assert accumulator.category_stats == {}
+
+
+class TestComputeReport:
+    @pytest.mark.parametrize(('tracked',), [(False,), (True,)])
+    def test_with_all_metrics(self, basic_orders_service, tracked):
+        if tracked:
+            basic_orders_service.track_aggregates()
+        report = basic_orders_service.compute_report()
+        assert list(report) == list(REPORT_METRICS)
+        for metric in REPORT_METRICS:
+            assert report[metric] == getattr(basic_orders_service, metric)(), metric
+
+    def test_with_subset_of_metrics(self, basic_orders_service, client_1, client_2, client_3):
+        assert basic_orders_service.compute_report(['clients_balances_after_completing_orders',
+                                                    'client_with_biggest_spend']) == {
+            'clients_balances_after_completing_orders': {
+                client_1: Decimal("-5600"),
+                client_2: Decimal("18800"),
+                client_3: Decimal("0")
+            },
+            'client_with_biggest_spend': [client_1]
+        }
+
+    def test_with_empty_service(self, empty_orders_service):
+        assert empty_orders_service.compute_report() == {
+            'client_with_biggest_spend': [],
+            'most_popular_categories_for_clients_ages': {},
+            'categories_stats': {},
+            'categories_with_biggest_clients': {category: [] for category in
+                                                empty_orders_service.categories_with_biggest_clients()},
+            'clients_with_carts_value': {},
+            'clients_balances_after_completing_orders': {},
+        }
+
+    def test_with_unknown_metric_when_tracked(self, basic_orders_service):
+        basic_orders_service.track_aggregates()
+        with pytest.raises(ValueError) as e:
+            basic_orders_service.compute_report(['unknown'])
+        assert e.value.args[0] == "Unknown metrics: unknown"
@@ -1,5 +1,10 @@
 from decimal import Decimal
-from ecommerce2.ecommerce_service.model import Category
+
+import pytest
+
+from ecommerce2.ecommerce_service.model import Category, Product
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.ecommerce_service.timeline import Timeline
 
 # TODO To mi się nie podoba
 from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
@@ -36,10 +41,47 @@ class TestOrdersService:
         def test_when_service_has_no_orders(self, empty_orders_service):
             assert empty_orders_service.client_with_biggest_spend_in_category(Category.HOME) == []
 
+    class TestTopClientsBySpend:
+        @pytest.mark.parametrize(('tracked',), [(False,), (True,)])
+        def test_top_clients(self, basic_orders_service, client_1, client_2, client_3, tracked):
+            if tracked:
+                basic_orders_service.track_aggregates()
+            assert basic_orders_service.top_clients_by_spend(2) == [
+                (client_1, Decimal('7600')), (client_2, Decimal('3200'))]
+
+        @pytest.mark.parametrize(('tracked',), [(False,), (True,)])
+        def test_clients_tied_with_k_th_are_included(self, basic_orders_service, client_1, client_2, client_3,
+                                                     product_3, tracked):
+            basic_orders_service.orders[client_3][product_3] = 2
+            basic_orders_service.orders[client_2] = {product_3: 2}
+            if tracked:
+                basic_orders_service.track_aggregates()
+            assert basic_orders_service.top_clients_by_spend(2) == [
+                (client_1, Decimal('7600')), (client_2, Decimal('4000')), (client_3, Decimal('4000'))]
+
+        @pytest.mark.parametrize(('tracked',), [(False,), (True,)])
+        def test_in_category(self, basic_orders_service, client_1, client_2, tracked):
+            if tracked:
+                basic_orders_service.track_aggregates()
+            assert basic_orders_service.top_clients_by_spend(5, Category.HOME) == [
+                (client_1, Decimal('6400')), (client_2, Decimal('3200'))]
+            assert basic_orders_service.top_clients_by_spend(5, Category.RTV) == []
+
+    class TestTopClientsByQuantity:
+        @pytest.mark.parametrize(('tracked',), [(False,), (True,)])
+        def test_in_category(self, basic_orders_service, client_1, client_2, product_2, tracked):
+            if tracked:
+                basic_orders_service.track_aggregates()
+            assert basic_orders_service.top_clients_by_quantity(1, Category.HOME) == [(client_1, 2)]
+            assert basic_orders_service.top_clients_by_quantity(2, Category.HOME) == [(client_1, 2), (client_2, 1)]
+
+        def test_when_no_clients_in_category(self, basic_orders_service):
+            assert basic_orders_service.top_clients_by_quantity(1, Category.KITCHEN) == []
+
     class TestMostPopularCategoriesForClientsAges:
         def test_when_three_clients_have_unique_age(self, basic_orders_service):
             assert basic_orders_service.most_popular_categories_for_clients_ages() == {
-                18: [Category.ELECTRONICS, Category.HOME],
+                18: [Category.HOME, Category.ELECTRONICS],
                 24: [Category.HOME],
                 22: [Category.AGD]
             }
@@ -47,7 +89,7 @@ class TestOrdersService:
         def test_when_two_clients_have_same_age_but_different_categories(self,
                                                                          orders_service_with_two_clients_having_same_age):
             assert orders_service_with_two_clients_having_same_age.most_popular_categories_for_clients_ages() == {
-                18: [Category.ELECTRONICS, Category.HOME]
+                18: [Category.HOME, Category.ELECTRONICS]
             }
 
         def test_when_empty_service(self, empty_orders_service):
@@ -150,3 +192,126 @@ class TestOrdersService:
 
         def test_for_empty_service(self, empty_orders_service):
             assert empty_orders_service.clients_balances_after_completing_orders() == {}
+
+    class TestMutations:
+        QUERIES = [
+            ('client_with_biggest_spend', ()),
+            ('client_with_biggest_spend_in_category', (Category.HOME,)),
+            ('client_with_biggest_spend_in_category', (Category.RTV,)),
+            ('most_popular_categories_for_clients_ages', ()),
+            ('categories_stats', ()),
+            ('categories_with_biggest_clients', ()),
+            ('clients_with_carts_value', ()),
+            ('clients_balances_after_completing_orders', ()),
+        ]
+
+        def assert_same_as_recomputed(self, service: OrdersService) -> None:
+            recomputed = OrdersService({client: dict(cart) for client, cart in service.orders.items()})
+            for method, args in self.QUERIES:
+                assert getattr(service, method)(*args) == getattr(recomputed, method)(*args), method
+
+        def test_add_order_line(self, basic_orders_service, client_1, client_2, product_1, product_2):
+            basic_orders_service.add_order_line(client_2, product_2)
+            basic_orders_service.add_order_line(client_2, product_1, 3)
+            assert basic_orders_service.orders[client_2] == {product_2: 2, product_1: 3}
+            assert basic_orders_service.client_with_biggest_spend() == [client_2]
+            self.assert_same_as_recomputed(basic_orders_service)
+
+        def test_ties_are_ordered_like_orders(self, basic_orders_service, client_1, client_2, product_1, product_2):
+            basic_orders_service.add_order_line(client_2, product_2)
+            basic_orders_service.add_order_line(client_2, product_1)
+            assert basic_orders_service.client_with_biggest_spend() == [client_1, client_2]
+            self.assert_same_as_recomputed(basic_orders_service)
+
+        def test_remove_order_line(self, basic_orders_service, client_1, client_3, product_2, product_3):
+            basic_orders_service.remove_order_line(client_1, product_2, 1)
+            basic_orders_service.remove_order_line(client_3, product_3)
+            assert basic_orders_service.orders[client_1][product_2] == 1
+            assert basic_orders_service.orders[client_3] == {}
+            self.assert_same_as_recomputed(basic_orders_service)
+
+        def test_add_client(self, basic_orders_service, client_2_ghost, product_2):
+            del basic_orders_service.orders[next(iter(basic_orders_service.orders))]
+            basic_orders_service.add_client(client_2_ghost)
+            basic_orders_service.add_order_line(client_2_ghost, product_2, 5)
+            assert basic_orders_service.client_with_biggest_spend() == [client_2_ghost]
+            self.assert_same_as_recomputed(basic_orders_service)
+
+        def test_mutations_of_empty_service(self, empty_orders_service, client_1, product_1):
+            empty_orders_service.add_client(client_1)
+            assert empty_orders_service.client_with_biggest_spend() == [client_1]
+            assert empty_orders_service.client_with_biggest_spend_in_category(Category.ELECTRONICS) == []
+            empty_orders_service.add_order_line(client_1, product_1)
+            assert empty_orders_service.client_with_biggest_spend_in_category(Category.ELECTRONICS) == [client_1]
+
+        def test_add_existing_client(self, basic_orders_service, client_1):
+            with pytest.raises(ValueError) as e:
+                basic_orders_service.add_client(client_1)
+            assert e.value.args[0] == "Client already exists in orders"
+
+        def test_add_line_of_not_existing_client(self, empty_orders_service, client_1, product_1):
+            with pytest.raises(ValueError) as e:
+                empty_orders_service.add_order_line(client_1, product_1)
+            assert e.value.args[0] == "Client does not exist in orders"
+
+        @pytest.mark.parametrize(('quantity', 'error', 'message'), [
+            (0, ValueError, "Quantity has to be greater than 0"),
+            (1.5, TypeError, "Invalid quantity type"),
+        ])
+        def test_add_line_with_invalid_quantity(self, basic_orders_service, client_1, product_1, quantity, error,
+                                                message):
+            with pytest.raises(error) as e:
+                basic_orders_service.add_order_line(client_1, product_1, quantity)
+            assert e.value.args[0] == message
+
+        def test_remove_more_than_in_cart(self, basic_orders_service, client_1, product_1):
+            with pytest.raises(ValueError) as e:
+                basic_orders_service.remove_order_line(client_1, product_1, 2)
+            assert e.value.args[0] == "Quantity is greater than quantity in cart"
+
+        def test_remove_product_not_in_cart(self, basic_orders_service, client_2, product_1):
+            with pytest.raises(ValueError) as e:
+                basic_orders_service.remove_order_line(client_2, product_1)
+            assert e.value.args[0] == "Product does not exist in client cart"
+
+    class TestMerge:
+        @pytest.mark.parametrize(('tracked',), [(False,), (True,)])
+        def test_quantities_are_summed(self, basic_orders_service, client_1, client_2_ghost, product_1, product_3,
+                                       tracked):
+            if tracked:
+                basic_orders_service.track_aggregates()
+            basic_orders_service.merge({client_1: {product_1: 2, product_3: 1}, client_2_ghost: {product_1: 1}})
+            assert basic_orders_service.orders[client_1] == {
+                product_1: 3, Product("SOFA", Category.HOME, Decimal("3200")): 2, product_3: 1
+            }
+            assert list(basic_orders_service.orders)[-1] == client_2_ghost
+            recomputed = OrdersService({client: dict(cart) for client, cart in basic_orders_service.orders.items()})
+            for method, args in TestOrdersService.TestMutations.QUERIES:
+                assert getattr(basic_orders_service, method)(*args) == getattr(recomputed, method)(*args), method
+
+        def test_cached_results_are_invalidated(self, basic_orders_service, client_3, product_2):
+            basic_orders_service.enable_cache()
+            assert basic_orders_service.client_with_biggest_spend() != [client_3]
+            basic_orders_service.merge({client_3: {product_2: 5}})
+            assert basic_orders_service.client_with_biggest_spend() == [client_3]
+
+        def test_dated_lines_are_added_to_timeline(self, empty_orders_service, client_1, product_1, product_2):
+            timeline = Timeline()
+            timeline.add('2024-01-01', client_1, product_1)
+            empty_orders_service.merge({client_1: {product_1: 1, product_2: 1}}, timeline)
+            assert empty_orders_service.clients_with_carts_value(start='2024-01-01') == {client_1: Decimal('1200')}
+            assert empty_orders_service.clients_with_carts_value() == {client_1: Decimal('4400')}
+
+        def test_with_invalid_client(self, empty_orders_service):
+            with pytest.raises(TypeError) as e:
+                empty_orders_service.merge({'client': {}})
+            assert e.value.args[0] == "Invalid client type"
+
+        @pytest.mark.parametrize(('quantity', 'error', 'message'), [
+            (0, ValueError, "Quantity has to be greater than 0"),
+            ('1', TypeError, "Invalid quantity type"),
+        ])
+        def test_with_invalid_quantity(self, basic_orders_service, client_1, product_1, quantity, error, message):
+            with pytest.raises(error) as e:
+                basic_orders_service.merge({client_1: {product_1: quantity}})
+            assert e.value.args[0] == message
@@ -0,0 +1,97 @@
+import pytest
+
+from ecommerce2.benchmarks.generator import generate_orders, write_orders
+from ecommerce2.ecommerce_service.report import ReportAccumulator, REPORT_METRICS, CLIENT_WITH_BIGGEST_SPEND, \
+    CATEGORIES_WITH_BIGGEST_CLIENTS
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.ecommerce_service.sharded import ShardedOrdersService
+from ecommerce2.loader.orders_loader import OrdersLoader
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3
+
+
+@pytest.fixture
+def generated_orders():
+    return OrdersLoader.load_from(generate_orders(60, 3, 8, seed=3))
+
+
+class TestReportAccumulatorMerge:
+    def test_merged_parts_equal_whole(self, generated_orders):
+        clients = list(generated_orders)
+        parts = [clients[:10], clients[10:35], clients[35:]]
+        accumulator, *others = [ReportAccumulator.from_orders({client: generated_orders[client] for client in part})
+                                for part in parts]
+        for other in others:
+            accumulator.merge(other)
+        assert accumulator.results() == ReportAccumulator.from_orders(generated_orders).results()
+
+    @pytest.mark.parametrize(('metrics',), [
+        (REPORT_METRICS,),
+        ([CLIENT_WITH_BIGGEST_SPEND, CATEGORIES_WITH_BIGGEST_CLIENTS],),
+    ])
+    def test_merged_leaders_only_parts_equal_whole(self, generated_orders, metrics):
+        clients = list(generated_orders)
+        parts = [ReportAccumulator.from_orders({client: generated_orders[client] for client in part}, metrics)
+                 for part in [clients[:10], clients[10:35], clients[35:]]]
+        for part in parts:
+            part.keep_leaders_only()
+        accumulator, *others = parts
+        for other in others:
+            accumulator.merge(other)
+        assert accumulator.results() == ReportAccumulator.from_orders(generated_orders, metrics).results()
+
+    def test_keep_leaders_only(self, basic_orders_service, client_1, client_2):
+        basic_orders_service.orders[client_2] = dict(basic_orders_service.orders[client_1])
+        accumulator = ReportAccumulator.from_orders(basic_orders_service.orders,
+                                                    [CLIENT_WITH_BIGGEST_SPEND, CATEGORIES_WITH_BIGGEST_CLIENTS])
+        accumulator.keep_leaders_only()
+        assert list(accumulator.spend) == [client_1, client_2]
+        assert all(len(set(clients.values())) <= 1 for clients in accumulator.category_quantities.values())
+
+    def test_with_different_metrics(self):
+        with pytest.raises(ValueError) as e:
+            ReportAccumulator(['categories_stats']).merge(ReportAccumulator(['clients_with_carts_value']))
+        assert e.value.args[0] == "Accumulators have different metrics"
+
+
+class TestShardedOrdersService:
+    @pytest.mark.parametrize(('shards',), [(1,), (3,)])
+    def test_same_results_as_orders_service(self, generated_orders, shards):
+        service = OrdersService(generated_orders)
+        with ShardedOrdersService.from_orders(generated_orders, shards) as sharded:
+            assert sharded.shard_sizes == [len(generated_orders) * (idx + 1) // shards -
+                                           len(generated_orders) * idx // shards for idx in range(shards)]
+            assert sharded.compute_report() == service.compute_report()
+            for metric in REPORT_METRICS:
+                assert getattr(sharded, metric)() == getattr(service, metric)(), metric
+
+    def test_ties_keep_order_of_clients(self, basic_orders_service, client_1, client_2):
+        basic_orders_service.orders[client_2] = dict(basic_orders_service.orders[client_1])
+        with ShardedOrdersService.from_orders(basic_orders_service.orders, 3) as sharded:
+            assert sharded.client_with_biggest_spend() == [client_1, client_2]
+
+    def test_partial_reports_of_leader_metrics_have_only_leaders(self, generated_orders):
+        with ShardedOrdersService.from_orders(generated_orders, 3) as sharded:
+            partials = sharded.partial_reports([CLIENT_WITH_BIGGEST_SPEND])
+        assert all(len(partial.spend) == 1 for partial in partials)
+
+    def test_from_files(self, tmp_path):
+        filepaths = []
+        for idx in range(3):
+            filepaths.append(str(tmp_path / f'orders_{idx}.json'))
+            write_orders(filepaths[-1], 10, 2, 5, seed=idx)
+        with ShardedOrdersService.from_files(filepaths, 2) as sharded:
+            assert sum(sharded.shard_sizes) == 30
+            assert len(sharded.clients_with_carts_value()) == 30
+
+    def test_shard_loading_error(self, tmp_path):
+        with pytest.raises(ValueError) as e:
+            ShardedOrdersService.from_files([str(tmp_path / 'missing.json')], 1)
+        assert e.value.args[0] == "Invalid filepath"
+
+    def test_closed_service(self, basic_orders_service):
+        sharded = ShardedOrdersService.from_orders(basic_orders_service.orders, 2)
+        sharded.close()
+        with pytest.raises(ValueError) as e:
+            sharded.compute_report()
+        assert e.value.args[0] == "Service is closed"
@@ -0,0 +1,134 @@
+import zlib
+from array import array
+from decimal import Decimal
+
+import pytest
+
+from ecommerce2.benchmarks.generator import generate_orders
+from ecommerce2.ecommerce_service.catalog import ProductCatalog
+from ecommerce2.ecommerce_service.model import Client, Product, Category
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.ecommerce_service.snapshot import HEADER, COLUMNS, read_snapshot, write_snapshot
+from ecommerce2.loader.orders_loader import OrdersLoader
+from ecommerce2.tests.fixtures import basic_orders_service, empty_orders_service, client_1, client_2, client_3, \
+    product_1, product_2, product_3
+
+
+def swap_byte_order(path) -> None:
+    """ Rewrites snapshot, as if it was written on machine of other byte order """
+    data = path.read_bytes()
+    magic, version, byte_order, _, _ = HEADER.unpack_from(data)
+    body = memoryview(data)[HEADER.size:]
+    swapped = bytearray()
+    position = 0
+    for _, typecode in COLUMNS:
+        count = int.from_bytes(body[position:position + 8], 'little', signed=True)
+        size = count * array(typecode).itemsize
+        column = array(typecode, body[position + 8:position + 8 + size].tobytes())
+        column.byteswap()
+        swapped += body[position:position + 8].tobytes() + column.tobytes() + bytes(-size % 8)
+        position += 8 + size + (-size % 8)
+    path.write_bytes(HEADER.pack(magic, version, 1 - byte_order, zlib.crc32(swapped), len(swapped)) + swapped)
+
+
+class TestSnapshot:
+    def test_round_trip_keeps_orders_and_their_order(self, basic_orders_service, tmp_path):
+        path = str(tmp_path / 'orders.snapshot')
+        basic_orders_service.save_snapshot(path)
+        loaded = OrdersService.load_snapshot(path)
+
+        assert loaded.orders == basic_orders_service.orders
+        assert list(loaded.orders) == list(basic_orders_service.orders)
+        assert [list(cart) for cart in loaded.orders.values()] == \
+               [list(cart) for cart in basic_orders_service.orders.values()]
+        assert loaded.compute_report() == basic_orders_service.compute_report()
+
+    def test_decimals_keep_their_exponent(self, tmp_path):
+        path = str(tmp_path / 'orders.snapshot')
+        client = Client('A', 'B', 20, Decimal('-12.50'))
+        product = Product('TV', Category.RTV, Decimal('3200'))
+        write_snapshot(path, {client: {product: 3}})
+
+        [(loaded_client, cart)] = read_snapshot(path).items()
+        [(loaded_product, quantity)] = cart.items()
+        assert str(loaded_client.balance) == '-12.50'
+        assert str(loaded_product.price) == '3200'
+        assert quantity == 3
+
+    def test_generated_orders_with_catalog(self, tmp_path):
+        orders = OrdersLoader.load_from(generate_orders(200, 5, 30))
+        path = str(tmp_path / 'orders.snapshot')
+        write_snapshot(path, orders)
+        catalog = ProductCatalog()
+
+        assert read_snapshot(path, catalog) == orders
+        assert len(catalog) == len({product for cart in orders.values() for product in cart})
+
+    def test_other_byte_order(self, basic_orders_service, client_1, product_2, tmp_path):
+        basic_orders_service.add_order_line(client_1, product_2, 1, '2023-12-31')
+        path = tmp_path / 'orders.snapshot'
+        basic_orders_service.save_snapshot(str(path))
+        swap_byte_order(path)
+
+        loaded = OrdersService.load_snapshot(str(path))
+        assert loaded.orders == basic_orders_service.orders
+        assert list(loaded.timeline.lines_between()) == list(basic_orders_service.timeline.lines_between())
+
+    def test_empty_service(self, empty_orders_service, tmp_path):
+        path = str(tmp_path / 'orders.snapshot')
+        empty_orders_service.save_snapshot(path)
+        assert OrdersService.load_snapshot(path).orders == {}
+
+    def test_dated_lines_are_kept(self, basic_orders_service, client_1, client_2, product_1, product_2, tmp_path):
+        basic_orders_service.add_order_line(client_2, product_1, 2, '2024-03-01T10:30:00.000123+02:00')
+        basic_orders_service.add_order_line(client_1, product_2, 1, '2023-12-31')
+        path = str(tmp_path / 'orders.snapshot')
+        basic_orders_service.save_snapshot(path)
+
+        loaded = OrdersService.load_snapshot(path)
+        assert loaded.orders == basic_orders_service.orders
+        assert list(loaded.timeline.lines_between()) == list(basic_orders_service.timeline.lines_between())
+        assert loaded.compute_report(start='2024-01-01') == basic_orders_service.compute_report(start='2024-01-01')
+
+    def test_corrupted_body(self, basic_orders_service, tmp_path):
+        path = tmp_path / 'orders.snapshot'
+        basic_orders_service.save_snapshot(str(path))
+        data = bytearray(path.read_bytes())
+        data[HEADER.size + 10] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(ValueError) as e:
+            read_snapshot(str(path))
+        assert e.value.args[0] == "Snapshot checksum mismatch"
+
+    def test_unsupported_version(self, basic_orders_service, tmp_path):
+        path = tmp_path / 'orders.snapshot'
+        basic_orders_service.save_snapshot(str(path))
+        data = bytearray(path.read_bytes())
+        data[4] = 99
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(ValueError) as e:
+            read_snapshot(str(path))
+        assert e.value.args[0] == "Unsupported snapshot version"
+
+    @pytest.mark.parametrize('content', [b'', b'EC2S', b'{"not": "snapshot"} and some more bytes'])
+    def test_invalid_file(self, tmp_path, content):
+        path = tmp_path / 'orders.snapshot'
+        path.write_bytes(content)
+        with pytest.raises(ValueError) as e:
+            read_snapshot(str(path))
+        assert e.value.args[0] == "Invalid snapshot file"
+
+    def test_truncated_file(self, basic_orders_service, tmp_path):
+        path = tmp_path / 'orders.snapshot'
+        basic_orders_service.save_snapshot(str(path))
+        path.write_bytes(path.read_bytes()[:-8])
+        with pytest.raises(ValueError) as e:
+            read_snapshot(str(path))
+        assert e.value.args[0] == "Invalid snapshot file"
+
+    def test_not_existing_file(self, tmp_path):
+        with pytest.raises(ValueError) as e:
+            read_snapshot(str(tmp_path / 'missing.snapshot'))
+        assert e.value.args[0] == "Invalid filepath"
@@ -0,0 +1,79 @@
+import pytest
+
+from ecommerce2.benchmarks.generator import generate_orders
+from ecommerce2.ecommerce_service.model import Category
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.ecommerce_service.sqlite_service import SqliteOrdersService
+from ecommerce2.loader.orders_loader import OrdersLoader
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3, empty_orders_service, orders_service_with_two_clients_having_same_age, client_2_ghost
+
+QUERIES = [
+    ('client_with_biggest_spend', ()),
+    ('client_with_biggest_spend_in_category', (Category.HOME,)),
+    ('client_with_biggest_spend_in_category', (Category.RTV,)),
+    ('top_clients_by_spend', (2,)),
+    ('top_clients_by_spend', (3, Category.KITCHEN)),
+    ('top_clients_by_quantity', (2, Category.HOME)),
+    ('most_popular_categories_for_clients_ages', ()),
+    ('categories_stats', ()),
+    ('categories_with_biggest_clients', ()),
+    ('clients_with_carts_value', ()),
+    ('clients_balances_after_completing_orders', ()),
+]
+
+
+def assert_identical_results(service: OrdersService) -> None:
+    """ Results have to be equal and ordered the same way, so their repr is compared too """
+    with SqliteOrdersService.from_orders(service.orders) as sqlite_service:
+        for method, args in QUERIES:
+            expected = getattr(service, method)(*args)
+            result = getattr(sqlite_service, method)(*args)
+            assert result == expected, method
+            assert repr(result) == repr(expected), method
+
+
+class TestSqliteOrdersService:
+    def test_with_basic_service(self, basic_orders_service):
+        assert_identical_results(basic_orders_service)
+
+    def test_with_clients_having_same_age(self, orders_service_with_two_clients_having_same_age):
+        assert_identical_results(orders_service_with_two_clients_having_same_age)
+
+    def test_with_empty_service(self, empty_orders_service):
+        assert_identical_results(empty_orders_service)
+
+    def test_with_generated_orders_having_ties(self):
+        orders = OrdersLoader.load_from(generate_orders(300, 4, 12, seed=5))
+        assert_identical_results(OrdersService(orders))
+
+    def test_bulk_insert_in_batches_into_file(self, basic_orders_service, tmp_path):
+        path = str(tmp_path / 'orders.sqlite')
+        with SqliteOrdersService(path) as sqlite_service:
+            sqlite_service.add_records(basic_orders_service.orders.items(), batch_size=2)
+        with SqliteOrdersService(path) as reopened:
+            assert len(reopened) == 3
+            assert reopened.clients_with_carts_value() == basic_orders_service.clients_with_carts_value()
+            assert reopened.compute_report() == basic_orders_service.compute_report()
+
+    def test_with_existing_client(self, basic_orders_service, client_1):
+        with SqliteOrdersService.from_orders(basic_orders_service.orders) as sqlite_service:
+            with pytest.raises(ValueError) as e:
+                sqlite_service.add_client_cart(client_1, {})
+            assert e.value.args[0] == "Client already exists in orders"
+
+    def test_with_duplicated_client_in_batch(self, client_1, client_2, product_1):
+        with SqliteOrdersService() as sqlite_service:
+            with pytest.raises(ValueError) as e:
+                sqlite_service.add_records([(client_1, {product_1: 1}), (client_1, {})])
+            assert e.value.args[0] == "Client already exists in orders"
+            assert len(sqlite_service) == 0
+
+            sqlite_service.add_client_cart(client_2, {product_1: 2})
+            assert sqlite_service.clients_with_carts_value() == {client_2: product_1.price * 2}
+
+    def test_with_invalid_k(self, basic_orders_service):
+        with SqliteOrdersService.from_orders(basic_orders_service.orders) as sqlite_service:
+            with pytest.raises(ValueError) as e:
+                sqlite_service.top_clients_by_spend(0)
+            assert e.value.args[0] == "n has to be greater than 0"
@@ -0,0 +1,159 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from ecommerce2.ecommerce_service.model import Category
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.ecommerce_service.timeline import Timeline, to_timestamp
+from ecommerce2.loader.orders_loader import OrdersLoader
+from ecommerce2.tests.fixtures import client_1, client_2, client_3, product_1, product_2, product_3, json_orders
+
+DAY = datetime(2023, 1, 10)
+
+
+@pytest.fixture
+def dated_service(client_1, client_2, client_3, product_1, product_2, product_3):
+    service = OrdersService({})
+    for client in (client_1, client_2, client_3):
+        service.add_client(client)
+    service.add_order_line(client_1, product_1, 1, DAY)
+    service.add_order_line(client_2, product_2, 2, DAY + timedelta(days=1))
+    service.add_order_line(client_1, product_2, 1, DAY + timedelta(days=2))
+    service.add_order_line(client_3, product_3, 1, DAY - timedelta(days=1))
+    service.add_order_line(client_3, product_1, 4)
+    return service
+
+
+class TestToTimestamp:
+    @pytest.mark.parametrize(('value', 'timestamp'), [
+        ('2023-01-10', DAY),
+        ('2023-01-10T12:30:00', DAY.replace(hour=12, minute=30)),
+        (date(2023, 1, 10), DAY),
+        (datetime(2023, 1, 10, 2, tzinfo=timezone(timedelta(hours=2))), DAY),
+    ])
+    def test_normalization(self, value, timestamp):
+        assert to_timestamp(value) == timestamp
+
+    @pytest.mark.parametrize(('value', 'error', 'message'), [
+        ('10.01.2023', ValueError, "Invalid order date format"),
+        (20230110, TypeError, "Invalid order date type"),
+    ])
+    def test_with_invalid_value(self, value, error, message):
+        with pytest.raises(error) as e:
+            to_timestamp(value)
+        assert e.value.args[0] == message
+
+
+class TestTimeline:
+    def test_window_is_half_open_and_sorted(self, client_1, client_2, product_1, product_2):
+        timeline = Timeline()
+        timeline.add(DAY + timedelta(days=2), client_1, product_1)
+        timeline.add(DAY, client_2, product_2, 3)
+        timeline.add(DAY + timedelta(days=1), client_1, product_2)
+
+        assert [line[0] for line in timeline.lines_between()] == [DAY + timedelta(days=n) for n in range(3)]
+        assert list(timeline.lines_between(DAY, DAY + timedelta(days=1))) == [(DAY, client_2, product_2, 3)]
+        assert timeline.orders_between(DAY + timedelta(days=1)) == {client_1: {product_2: 1, product_1: 1}}
+        assert timeline.orders_between(DAY + timedelta(days=5), DAY) == {}
+
+    def test_clients_of_window_keep_registration_order(self, client_1, client_2, product_1):
+        timeline = Timeline()
+        timeline.register(client_1)
+        timeline.add(DAY, client_2, product_1)
+        timeline.add(DAY, client_1, product_1)
+        assert list(timeline.orders_between()) == [client_1, client_2]
+
+    def test_lines_added_after_lookup_are_merged(self, client_1, client_2, product_1, product_2):
+        timeline = Timeline()
+        timeline.add(DAY + timedelta(days=1), client_1, product_1)
+        timeline.add(DAY + timedelta(days=3), client_1, product_1)
+        assert len(list(timeline.lines_between())) == 2
+        timeline.add(DAY + timedelta(days=1), client_2, product_2)
+        timeline.add(DAY, client_2, product_1)
+        assert len(timeline) == 4
+        assert [(line[0], line[1]) for line in timeline.lines_between()] == [
+            (DAY, client_2), (DAY + timedelta(days=1), client_1), (DAY + timedelta(days=1), client_2),
+            (DAY + timedelta(days=3), client_1)
+        ]
+        assert list(timeline.lines_between(DAY + timedelta(days=2))) == [
+            (DAY + timedelta(days=3), client_1, product_1, 1)
+        ]
+
+    def test_remove_starts_from_latest_line(self, client_1, product_1):
+        timeline = Timeline()
+        timeline.add(DAY, client_1, product_1, 2)
+        timeline.add(DAY + timedelta(days=1), client_1, product_1, 2)
+        timeline.remove(client_1, product_1, 3)
+        assert list(timeline.lines_between()) == [(DAY, client_1, product_1, 1)]
+        assert timeline.quantity_of(client_1, product_1) == 1
+
+
+class TestWindowedQueries:
+    QUERIES = [
+        ('client_with_biggest_spend', ()),
+        ('client_with_biggest_spend_in_category', (Category.HOME,)),
+        ('top_clients_by_spend', (2,)),
+        ('most_popular_categories_for_clients_ages', ()),
+        ('categories_stats', ()),
+        ('categories_with_biggest_clients', ()),
+        ('clients_with_carts_value', ()),
+        ('clients_balances_after_completing_orders', ()),
+    ]
+
+    @pytest.mark.parametrize(('start', 'end'), [
+        (DAY, DAY + timedelta(days=2)),
+        ('2023-01-11', None),
+        (None, date(2023, 1, 11)),
+    ])
+    def test_same_as_service_of_window_lines(self, dated_service, start, end):
+        window = OrdersService(dated_service.timeline.orders_between(start, end))
+        for method, args in self.QUERIES:
+            assert getattr(dated_service, method)(*args, start=start, end=end) == getattr(window, method)(*args), method
+        assert dated_service.compute_report(start=start, end=end) == window.compute_report()
+
+    def test_window_of_last_days(self, dated_service, client_1, client_2, product_2):
+        assert dated_service.client_with_biggest_spend(start=DAY + timedelta(days=1)) == [client_2]
+        assert dated_service.clients_with_carts_value(start=DAY + timedelta(days=2)) == {client_1: product_2.price}
+
+    def test_undated_lines_are_only_in_full_reports(self, dated_service, client_3, product_1, product_3):
+        assert dated_service.orders[client_3] == {product_3: 1, product_1: 4}
+        assert dated_service.clients_with_carts_value(start=DAY - timedelta(days=1), end=DAY)[client_3] == \
+               product_3.price
+
+    def test_removal_updates_timeline(self, dated_service, client_2, client_3, product_1, product_2):
+        dated_service.remove_order_line(client_3, product_1, 4)
+        dated_service.remove_order_line(client_2, product_2, 1)
+        assert len(list(dated_service.timeline.lines_between())) == 4
+        assert dated_service.timeline.orders_between()[client_2] == {product_2: 1}
+
+    def test_windows_are_cached_separately(self, dated_service, client_2, client_3):
+        cache = dated_service.enable_cache()
+        assert dated_service.client_with_biggest_spend(start=DAY + timedelta(days=1)) == [client_2]
+        assert dated_service.client_with_biggest_spend() == [client_3]
+        assert dated_service.client_with_biggest_spend(start=DAY + timedelta(days=1)) == [client_2]
+        assert cache.stats.hits == 1
+
+    def test_invalid_order_date(self, dated_service, client_1, product_1):
+        with pytest.raises(ValueError) as e:
+            dated_service.add_order_line(client_1, product_1, 1, 'yesterday')
+        assert e.value.args[0] == "Invalid order date format"
+        assert dated_service.orders[client_1][product_1] == 1
+
+
+class TestLoadingOrderDates:
+    def test_order_dates_are_added_to_timeline(self, json_orders):
+        json_orders[0]['client_orders'][1]['order_date'] = '2023-01-10'
+        timeline = Timeline()
+        orders = OrdersLoader.load_from(json_orders, timeline=timeline)
+        service = OrdersService(orders, timeline=timeline)
+
+        [(client, cart)] = orders.items()
+        fridge = list(cart)[1]
+        assert list(timeline.lines_between()) == [(DAY, client, fridge, 1)]
+        assert service.clients_with_carts_value(start=DAY) == {client: fridge.price}
+
+    def test_invalid_order_date_is_reported(self, json_orders):
+        json_orders[0]['client_orders'][0]['order_date'] = '10/01/2023'
+        assert OrdersLoader.record_errors(json_orders[0]) == {
+            'client_orders': {0: {'order_date': ["Invalid order date format"]}}
+        }
@@ -3,7 +3,8 @@ from decimal import Decimal
 
 import pytest
 
-from ecommerce2.ecommerce_service.validator import BasicValidator, ClientValidator, ProductValidator
+from ecommerce2.ecommerce_service.validator import BasicValidator, ClientValidator, ProductValidator, \
+    ValidationError, ValidationPlan
 from ecommerce2.tests.fixtures import invalid_client_data, client1_data, product_name, product_category, product_price, \
     not_defined_product_category, basic_enum, product1_data, invalid_product_data
 
@@ -132,6 +133,9 @@ class TestClientValidator:
         def test_with_valid_value(self):
             assert ClientValidator._validate_balance('200.00') == []
 
+        def test_with_non_numeric_value(self):
+            assert ClientValidator._validate_balance('12abc') == ['Balance is not formatted correctly']
+
         @pytest.mark.parametrize(('invalid_balance',), [
             (1,),
             ([1, ],),
@@ -197,6 +201,15 @@ class TestProductValidator:
         def test_with_invalid_price(self):
             assert ProductValidator._validate_price('-1.00') == ['Price is not formatted correctly']
 
+        @pytest.mark.parametrize(('price', 'message'), [
+            ('10.001', 'Price is more precise than minor unit'),
+            ('10abc', 'Price is not formatted correctly'),
+        ])
+        def test_agrees_with_plan(self, product1_data, price, message):
+            product1_data['price'] = price
+            assert ProductValidator._validate_price(price) == [message]
+            assert ProductValidator.validate_product_data(product1_data) == {'price': [message]}
+
         @pytest.mark.parametrize(('invalid_price',), [
             (1,),
             ([1, ],),
@@ -205,3 +218,66 @@ class TestProductValidator:
         def test_with_invalid_name_type(self, invalid_price):
             assert ProductValidator._validate_price(invalid_price) == [
                 f"Invalid expression type: {type(invalid_price)}"]
+
+
+class TestValidationError:
+    @pytest.mark.parametrize(('error', 'message'), [
+        (ValidationError(0, 'name', 'type', int), "Invalid expression type: <class 'int'>"),
+        (ValidationError(0, 'name', 'format'), 'Name is not formatted correctly'),
+        (ValidationError(0, 'age', 'range'), 'Age is not valid'),
+        (ValidationError(0, 'category', 'undefined', 'Category'), 'Category is not defined in Category'),
+    ])
+    def test_message(self, error, message):
+        assert error.message == message
+
+    def test_with_unknown_code(self):
+        with pytest.raises(ValueError) as e:
+            ValidationError(0, 'name', 'unknown').message
+        assert e.value.args[0] == 'Unknown error code: unknown'
+
+
+class TestValidateMany:
+    def test_clients_with_valid_data(self, client1_data):
+        assert ClientValidator.validate_many([client1_data, client1_data]) == []
+
+    def test_clients_errors_keep_records_order(self, client1_data, invalid_client_data):
+        assert ClientValidator.validate_many([client1_data, invalid_client_data, {**client1_data, 'age': 17}]) == [
+            ValidationError(1, 'name', 'type', int),
+            ValidationError(1, 'surname', 'type', int),
+            ValidationError(1, 'age', 'type', str),
+            ValidationError(1, 'balance', 'type', int),
+            ValidationError(2, 'age', 'range'),
+        ]
+
+    def test_client_surname_uses_surname_regex(self, client1_data):
+        assert ClientValidator.validate_client_data({**client1_data, 'surname': 'SMITH-JONES'}) == {}
+
+    def test_products_errors(self, product1_data, invalid_product_data):
+        assert ProductValidator.validate_many([
+            invalid_product_data,
+            product1_data,
+            {**product1_data, 'category': 'Z', 'price': '-1'},
+            {**product1_data, 'category': '1'},
+        ]) == [
+            ValidationError(0, 'name', 'type', int),
+            ValidationError(0, 'category', 'type', int),
+            ValidationError(0, 'price', 'type', int),
+            ValidationError(2, 'category', 'undefined', 'Category'),
+            ValidationError(2, 'price', 'format'),
+            ValidationError(3, 'category', 'format'),
+        ]
+
+    def test_messages_match_single_record_validation(self, invalid_client_data):
+        errors = ClientValidator.validate_many([invalid_client_data])
+        assert ValidationPlan.as_messages(errors) == ClientValidator.validate_client_data(invalid_client_data)
+
+    @pytest.mark.parametrize(('price', 'error'), [
+        ('12.345', ValidationError(0, 'price', 'precision')),
+        ('12abc', ValidationError(0, 'price', 'format')),
+        ('12.340', None),
+    ])
+    def test_product_price_precision(self, product1_data, price, error):
+        errors = ProductValidator.validate_many([{**product1_data, 'price': price}])
+        assert errors == ([error] if error else [])
+        if error:
+            assert ValidationError(0, 'price', 'precision').message == 'Price is more precise than minor unit'
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.instrumentation import Instrumentation, StageTimer, instrumentation
+from ecommerce2.loader.orders_loader import OrdersLoader
+from ecommerce2.tests.fixtures import basic_orders_service, client_1, client_2, client_3, product_1, product_2, \
+    product_3, json_orders
+
+
+@pytest.fixture
+def enabled_instrumentation():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield instrumentation
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+class TestInstrumentation:
+    def test_disabled_instrumentation_collects_nothing(self):
+        collector = Instrumentation()
+
+        @collector.timed('stage')
+        def stage():
+            collector.count('event')
+            return 1
+
+        with collector.timer('block'):
+            assert stage() == 1
+        assert collector.as_dict() == {'timers': {}, 'counters': {}}
+
+    def test_timers_and_errors(self):
+        collector = Instrumentation(enabled=True)
+
+        @collector.timed()
+        def failing():
+            raise ValueError("Failure")
+
+        with pytest.raises(ValueError):
+            failing()
+        with collector.timer('block'):
+            collector.count('event', 3)
+
+        exported = collector.as_dict()
+        stage = 'TestInstrumentation.test_timers_and_errors.<locals>.failing'
+        assert exported['timers'][stage]['calls'] == 1
+        assert exported['timers']['block']['total'] >= exported['timers']['block']['max'] >= 0
+        assert exported['counters'] == {f'errors.{stage}': 1, 'event': 3}
+        assert json.loads(collector.to_json()) == exported
+
+    def test_prometheus_format(self):
+        collector = Instrumentation(enabled=True)
+        with collector.timer('load "file"'):
+            collector.count('records.loaded', 2)
+
+        text = collector.to_prometheus()
+        assert '# TYPE ecommerce2_stage_calls_total counter\n' in text
+        assert 'ecommerce2_stage_calls_total{stage="load \\"file\\""} 1\n' in text
+        assert 'ecommerce2_events_total{name="records.loaded"} 2\n' in text
+
+    def test_profile_capture(self, basic_orders_service):
+        collector = Instrumentation()
+        with collector.profile('report'):
+            basic_orders_service.compute_report()
+
+        assert 'compute_report' in collector.profile_report('report', limit=5)
+        with pytest.raises(ValueError) as e:
+            collector.profile_report('missing')
+        assert e.value.args[0] == "Profile missing was not captured"
+
+    def test_load_and_query_paths(self, enabled_instrumentation, json_orders, basic_orders_service):
+        OrdersLoader.load_collecting_errors(json_orders + [{'client': {}}])
+        basic_orders_service.categories_stats()
+
+        exported = enabled_instrumentation.as_dict()
+        assert {'validate', 'build', 'OrdersService.categories_stats'} <= set(exported['timers'])
+        assert exported['counters'] == {'records.loaded': 1, 'records.invalid': 1}
+
+    def test_worker_stages_are_merged(self, enabled_instrumentation, json_orders):
+        records = [record for _ in range(4) for record in json.loads(json.dumps(json_orders))] + [{'client': {}}]
+        OrdersLoader.load_collecting_errors(records, workers=2, chunk_size=2)
+
+        exported = enabled_instrumentation.as_dict()
+        assert exported['timers']['validate']['calls'] == 3
+        assert exported['counters'] == {'records.loaded': 4, 'records.invalid': 1}
+
+    def test_merge(self):
+        collector = Instrumentation(enabled=True)
+        collector.timers['stage'] = StageTimer(1, 2.0, 2.0)
+        collector.counters['event'] = 1
+        collector.merge({'stage': StageTimer(2, 3.0, 2.5), 'other': StageTimer(1, 1.0, 1.0)}, {'event': 2})
+        assert collector.timers == {'stage': StageTimer(3, 5.0, 2.5), 'other': StageTimer(1, 1.0, 1.0)}
+        assert collector.counters == {'event': 3}
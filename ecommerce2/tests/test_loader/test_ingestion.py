@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from ecommerce2.benchmarks.generator import write_orders
+from ecommerce2.ecommerce_service.service import OrdersService
+from ecommerce2.loader.ingestion import IngestionRunner, ingest_files
+from ecommerce2.loader.json_loader import iter_file
+from ecommerce2.loader.orders_loader import OrdersLoader
+
+
+@pytest.fixture
+def orders_files(tmp_path):
+    filepaths = []
+    for seed in range(3):
+        filepath = str(tmp_path / f'orders_{seed}.json')
+        write_orders(filepath, 40, 3, 20, invalid_ratio=0.2, seed=seed)
+        filepaths.append(filepath)
+    return filepaths
+
+
+class TestIngestion:
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_files_are_ingested_like_loaded_one_by_one(self, orders_files, workers):
+        expected = {}
+        for filepath in orders_files:
+            expected.update(OrdersLoader.load_collecting_errors(iter_file(filepath)).orders)
+
+        service = OrdersService({})
+        report = ingest_files(orders_files, service, workers=workers, chunk_size=7, queue_size=2, max_open_files=2)
+
+        assert service.orders == expected
+        for filepath in orders_files:
+            collected = OrdersLoader.load_collecting_errors(iter_file(filepath))
+            assert report.loaded[filepath] == 40 - len(collected.errors)
+            assert report.errors.get(filepath, []) == collected.errors
+        assert report.failed == {}
+        assert service.clients_with_carts_value() == OrdersService(expected).clients_with_carts_value()
+
+    def test_quantities_of_repeated_client_are_added(self, orders_files):
+        service = OrdersService({})
+        ingest_files([orders_files[0], orders_files[0]], service, max_open_files=1)
+        single = OrdersLoader.load_collecting_errors(iter_file(orders_files[0])).orders
+        assert service.orders == {client: {product: 2 * quantity for product, quantity in cart.items()}
+                                  for client, cart in single.items()}
+
+    def test_service_answers_queries_during_ingestion(self, orders_files):
+        runner = IngestionRunner(chunk_size=5, queue_size=1)
+        observed = []
+
+        async def run() -> None:
+            ingestion = asyncio.create_task(runner.ingest(orders_files))
+            while not ingestion.done():
+                observed.append(len(runner.service.clients_with_carts_value()))
+                await asyncio.sleep(0)
+            await ingestion
+
+        asyncio.run(run())
+        assert len(set(observed)) > 2
+        assert observed == sorted(observed)
+        assert observed[-1] <= len(runner.service.orders)
+
+    def test_with_broken_files(self, orders_files, tmp_path):
+        broken = tmp_path / 'broken.json'
+        broken.write_text('[{"client": {}, "client_orders": []}, {')
+        report = ingest_files([orders_files[0], str(broken), str(tmp_path / 'missing.json')])
+
+        assert report.failed == {str(broken): "Invalid json structure",
+                                 str(tmp_path / 'missing.json'): "Invalid filepath"}
+        assert report.loaded[str(broken)] == 0
+        assert len(report.errors[str(broken)]) == 1
+
+    def test_with_directory(self, orders_files, tmp_path):
+        report = ingest_files([orders_files[0], str(tmp_path)])
+
+        assert list(report.failed) == [str(tmp_path)]
+        assert report.loaded[str(tmp_path)] == 0
+        assert report.loaded[orders_files[0]] > 0
+
+    @pytest.mark.parametrize(('options', 'error', 'message'), [
+        ({'workers': 0}, ValueError, "Ingestion parameters have to be greater than 0"),
+        ({'queue_size': '1'}, TypeError, "Invalid ingestion parameter type"),
+    ])
+    def test_with_invalid_options(self, options, error, message):
+        with pytest.raises(error) as e:
+            IngestionRunner(**options)
+        assert e.value.args[0] == message
+
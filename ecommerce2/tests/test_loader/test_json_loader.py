@@ -1,8 +1,10 @@
+import json
+
 import pytest
 
 from typing import Final
 
-from ecommerce2.loader.json_loader import load_file
+from ecommerce2.loader.json_loader import load_file, iter_file, ndjson_ranges, parse_ndjson_range
 from ecommerce2.settings import TestSettings
 
 
@@ -24,3 +26,102 @@ class TestLoadFile:
         with pytest.raises(ValueError) as e:
             load_file(self.FILEPATH_HAVING_INVALID_TYPE)
         assert e.value.args[0] == "Invalid filepath"
+
+
+class TestIterFile:
+    def test_with_array_of_objects(self, tmp_path):
+        path = tmp_path / 'orders.json'
+        path.write_text('[{"A": 1, "B": [1, 2]}, {"C": "]"}]')
+        assert list(iter_file(str(path))) == [{"A": 1, "B": [1, 2]}, {"C": "]"}]
+
+    def test_with_elements_bigger_than_chunk(self, tmp_path):
+        path = tmp_path / 'orders.json'
+        data = [{"name": "A" * 50, "values": list(range(20))}, 12345, "ABC", None, True]
+        path.write_text(json.dumps(data, indent=2))
+        assert list(iter_file(str(path), chunk_size=3)) == data
+
+    @pytest.mark.parametrize(('content', 'data'), [
+        ('[2500.0]', [2500.0]),
+        ('[1e-05]', [1e-05]),
+        ('[12, -0.25E+3 ,true]', [12, -250.0, True]),
+    ])
+    @pytest.mark.parametrize(('chunk_size',), [(1,), (2,), (3,), (4,)])
+    def test_with_numbers_cut_by_chunk(self, tmp_path, content, data, chunk_size):
+        path = tmp_path / 'orders.json'
+        path.write_text(content)
+        assert list(iter_file(str(path), chunk_size=chunk_size)) == data
+
+    def test_with_empty_array(self, tmp_path):
+        path = tmp_path / 'orders.json'
+        path.write_text(' [ ] ')
+        assert list(iter_file(str(path))) == []
+
+    def test_elements_are_yielded_lazily(self, tmp_path):
+        path = tmp_path / 'orders.json'
+        path.write_text('[{"A": 1}, {"B": 2}')
+        elements = iter_file(str(path))
+        assert next(elements) == {"A": 1}
+        assert next(elements) == {"B": 2}
+        with pytest.raises(ValueError) as e:
+            next(elements)
+        assert e.value.args[0] == "Invalid json structure"
+
+    @pytest.mark.parametrize(('content',), [
+        ('{"A": 1}',),
+        ('',),
+    ])
+    def test_when_top_level_value_is_not_array(self, tmp_path, content):
+        path = tmp_path / 'orders.json'
+        path.write_text(content)
+        with pytest.raises(ValueError) as e:
+            list(iter_file(str(path)))
+        assert e.value.args[0] == "File does not contain json array"
+
+    @pytest.mark.parametrize(('content',), [
+        ('[{"A": 1} {"B": 2}]',),
+        ('[{"A": }]',),
+        ('[1, 2] 3',),
+    ])
+    def test_with_invalid_json(self, tmp_path, content):
+        path = tmp_path / 'orders.json'
+        path.write_text(content)
+        with pytest.raises(ValueError) as e:
+            list(iter_file(str(path)))
+        assert e.value.args[0] == "Invalid json structure"
+
+    def test_with_invalid_filepath(self):
+        with pytest.raises(ValueError) as e:
+            list(iter_file(TestLoadFile.INVALID_FILEPATH))
+        assert e.value.args[0] == "Invalid filepath"
+
+
+class TestNdjson:
+    def test_ranges_end_on_line_boundaries(self, tmp_path):
+        path = tmp_path / 'orders.ndjson'
+        path.write_bytes(b'{"a": 1}\n{"b": 22}\n\n{"c": 333}')
+        ranges = ndjson_ranges(str(path), chunk_bytes=5)
+        data = path.read_bytes()
+
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert all(data[end - 1:end] == b'\n' for _, end in ranges[:-1])
+
+    def test_parse_range(self, tmp_path):
+        path = tmp_path / 'orders.ndjson'
+        path.write_bytes(b'{"a": 1}\n{"b": \n\n[1, 2]\n')
+        assert parse_ndjson_range(str(path), 0, len(path.read_bytes())) == (
+            4, [(1, {"a": 1}), (4, [1, 2])], [(2, "Invalid json line")]
+        )
+
+    @pytest.mark.parametrize('chunk_bytes', [0, '1'])
+    def test_with_invalid_chunk_size(self, tmp_path, chunk_bytes):
+        path = tmp_path / 'orders.ndjson'
+        path.write_bytes(b'{}\n')
+        with pytest.raises(ValueError) as e:
+            ndjson_ranges(str(path), chunk_bytes)
+        assert e.value.args[0] == "Chunk size has to be positive integer"
+
+    def test_with_invalid_filepath(self, tmp_path):
+        with pytest.raises(ValueError) as e:
+            ndjson_ranges(str(tmp_path / 'missing.ndjson'))
+        assert e.value.args[0] == "Invalid filepath"
@@ -1,9 +1,14 @@
+import json
 from decimal import Decimal
 
 import pytest
 
-from ecommerce2.loader.orders_loader import OrdersLoader
+from ecommerce2.benchmarks.generator import generate_orders, write_orders_ndjson
+from ecommerce2.ecommerce_service.catalog import ProductCatalog
+from ecommerce2.loader.json_loader import iter_file
+from ecommerce2.loader.orders_loader import OrdersLoader, LoadResult, RecordError
 from ecommerce2.ecommerce_service.model import Client, Category, Product
+from ecommerce2.ecommerce_service.service import OrdersService
 from ecommerce2.tests.fixtures import json_orders
 
 
@@ -21,3 +26,211 @@ class TestLoadOrders:
         with pytest.raises(ValueError) as e:
             OrdersLoader.load_from(json_orders)
         assert e.value.args[0] == "Orders data is not correct. Cannot load it into Orders Service"
+
+    def test_with_orders_iterator(self, json_orders):
+        assert OrdersLoader.load_from(iter(json_orders)) == {
+            Client("A", "B", 18, Decimal("2000")): {
+                Product("TV", Category.HOME, Decimal("2000")): 1,
+                Product("FRIDGE", Category.HOME, Decimal("3000")): 1
+            }
+        }
+
+    def test_with_streamed_file(self, json_orders, tmp_path):
+        path = tmp_path / 'orders.json'
+        path.write_text(json.dumps(json_orders * 3))
+        assert OrdersLoader.load_from(iter_file(str(path), chunk_size=16)) == OrdersLoader.load_from(json.loads(path.read_text()))
+
+    @pytest.mark.parametrize(('record',), [
+        ({"client": {"name": "A"}, "client_orders": []},),
+        ({"client_orders": []},),
+        ([],),
+    ])
+    def test_with_invalid_record_structure(self, record):
+        with pytest.raises(ValueError) as e:
+            OrdersLoader.load_from([record])
+        assert e.value.args[0] == "Orders data is not correct. Cannot load it into Orders Service"
+
+    def test_with_repeated_product(self, json_orders):
+        json_orders[0]['client_orders'].append({"name": "TV", "category": "HOME", "price": "2000"})
+        assert OrdersLoader.load_from(json_orders)[Client("A", "B", 18, Decimal("2000"))] == {
+            Product("TV", Category.HOME, Decimal("2000")): 2,
+            Product("FRIDGE", Category.HOME, Decimal("3000")): 1
+        }
+
+    def test_carts_of_repeated_client_are_summed(self, json_orders):
+        repeated = json.loads(json.dumps(json_orders[0]))
+        repeated['client_orders'] = [{"name": "TV", "category": "HOME", "price": "2000"},
+                                     {"name": "OVEN", "category": "AGD", "price": "900"}]
+        orders = OrdersLoader.load_from(json_orders + [repeated])
+        assert list(orders) == [Client("A", "B", 18, Decimal("2000"))]
+        assert orders[Client("A", "B", 18, Decimal("2000"))] == {
+            Product("TV", Category.HOME, Decimal("2000")): 2,
+            Product("FRIDGE", Category.HOME, Decimal("3000")): 1,
+            Product("OVEN", Category.AGD, Decimal("900")): 1
+        }
+
+
+class TestMergeInto:
+    def test_delta_is_merged_into_service(self, json_orders):
+        catalog = ProductCatalog()
+        service = OrdersService(OrdersLoader.load_from(json.loads(json.dumps(json_orders)), catalog))
+        loaded = service.orders[Client("A", "B", 18, Decimal("2000"))]
+        delta = [
+            {"client": {"name": "A", "surname": "B", "age": 18, "balance": "2000"},
+             "client_orders": [{"name": "TV", "category": "HOME", "price": "2000", "order_date": "2024-02-01"}]},
+            {"client": {"name": "C", "surname": "D", "age": 40, "balance": "100"},
+             "client_orders": [{"name": "FRIDGE", "category": "HOME", "price": "3000"}]}
+        ]
+        assert OrdersLoader.merge_into(service, delta, catalog) is service
+        assert service.orders[Client("A", "B", 18, Decimal("2000"))] is loaded
+        assert loaded == {
+            Product("TV", Category.HOME, Decimal("2000")): 2,
+            Product("FRIDGE", Category.HOME, Decimal("3000")): 1
+        }
+        assert service.orders[Client("C", "D", 40, Decimal("100"))] == {
+            Product("FRIDGE", Category.HOME, Decimal("3000")): 1
+        }
+        assert service.clients_with_carts_value(start='2024-01-01') == {
+            Client("A", "B", 18, Decimal("2000")): Decimal("2000")
+        }
+
+    def test_with_invalid_delta(self, json_orders):
+        service = OrdersService(OrdersLoader.load_from(json.loads(json.dumps(json_orders))))
+        json_orders[0]['client']['balance'] = 2000
+        with pytest.raises(ValueError) as e:
+            OrdersLoader.merge_into(service, json_orders)
+        assert e.value.args[0] == "Orders data is not correct. Cannot load it into Orders Service"
+        assert sum(service.orders[Client("A", "B", 18, Decimal("2000"))].values()) == 2
+
+
+class TestLoadCollectingErrors:
+    def test_with_valid_orders(self, json_orders):
+        result = OrdersLoader.load_collecting_errors(json_orders)
+        assert result == LoadResult({
+            Client("A", "B", 18, Decimal("2000")): {
+                Product("TV", Category.HOME, Decimal("2000")): 1,
+                Product("FRIDGE", Category.HOME, Decimal("3000")): 1
+            }
+        }, [], 1)
+
+    def test_invalid_records_are_reported_with_their_indexes(self, json_orders):
+        valid_record = json_orders[0]
+        invalid_client_record = {
+            "client": {"name": "a", "surname": "B", "age": 18, "balance": "1"},
+            "client_orders": []
+        }
+        invalid_product_record = {
+            "client": {"name": "C", "surname": "D", "age": 20, "balance": "1"},
+            "client_orders": [
+                {"name": "TV", "category": "HOME", "price": "2000"},
+                {"name": "TV", "category": "Z", "price": "2000"}
+            ]
+        }
+        result = OrdersLoader.load_collecting_errors(
+            [invalid_client_record, valid_record, {"client": {}}, invalid_product_record])
+
+        assert list(result.orders) == [Client("A", "B", 18, Decimal("2000"))]
+        assert result.errors == [
+            RecordError(0, {'client': {'name': ['Name is not formatted correctly']}}),
+            RecordError(2, {'record': ['record is not valid due to different keys than desired']}),
+            RecordError(3, {'client_orders': {1: {'category': ['Category is not defined in Category']}}}),
+        ]
+
+    def test_non_numeric_balance_is_reported(self, json_orders):
+        invalid_record = {"client": {"name": "C", "surname": "D", "age": 20, "balance": "12abc"}, "client_orders": []}
+        result = OrdersLoader.load_collecting_errors([invalid_record, json_orders[0]])
+
+        assert list(result.orders) == [Client("A", "B", 18, Decimal("2000"))]
+        assert result.errors == [RecordError(0, {'client': {'balance': ['Balance is not formatted correctly']}})]
+
+
+class TestProductsInterning:
+    def test_equal_products_share_instance(self, json_orders):
+        second_record = json.loads(json.dumps(json_orders[0]))
+        second_record['client']['name'] = 'C'
+        orders = OrdersLoader.load_from(json_orders + [second_record])
+        first_cart, second_cart = orders.values()
+        assert [id(product) for product in first_cart] == [id(product) for product in second_cart]
+
+    def test_with_shared_catalog(self, json_orders):
+        catalog = ProductCatalog()
+        orders = OrdersLoader.load_from(json_orders, catalog)
+        assert list(next(iter(orders.values()))) == catalog.products
+
+
+class TestParallelValidation:
+    @pytest.fixture
+    def orders_with_invalid_records(self):
+        records = list(generate_orders(30, 2, 5))
+        records[3]['client']['age'] = 17
+        records[17]['client_orders'][1]['price'] = '-1'
+        records[29]['client'] = {}
+        return records
+
+    def test_errors_are_in_input_order(self, orders_with_invalid_records):
+        serial = OrdersLoader.validate(orders_with_invalid_records)
+        parallel = OrdersLoader.validate(iter(orders_with_invalid_records), workers=2, chunk_size=4)
+        assert [error.index for error in parallel] == [3, 17, 29]
+        assert parallel == serial
+
+    def test_load_collecting_errors_in_parallel(self, orders_with_invalid_records):
+        serial = OrdersLoader.load_collecting_errors(json.loads(json.dumps(orders_with_invalid_records)))
+        parallel = OrdersLoader.load_collecting_errors(orders_with_invalid_records, workers=3, chunk_size=5)
+        assert parallel == serial
+        assert list(parallel.orders) == list(serial.orders)
+
+    def test_load_from_in_parallel(self, json_orders):
+        records = [json.loads(json.dumps(json_orders[0])) for _ in range(5)]
+        assert OrdersLoader.load_from(records, workers=2, chunk_size=2) == {
+            Client("A", "B", 18, Decimal("2000")): {
+                Product("TV", Category.HOME, Decimal("2000")): 5,
+                Product("FRIDGE", Category.HOME, Decimal("3000")): 5
+            }
+        }
+
+    def test_load_from_in_parallel_with_invalid_data(self, orders_with_invalid_records):
+        with pytest.raises(ValueError) as e:
+            OrdersLoader.load_from(orders_with_invalid_records, workers=2, chunk_size=4)
+        assert e.value.args[0] == "Orders data is not correct. Cannot load it into Orders Service"
+
+    @pytest.mark.parametrize(('workers', 'chunk_size', 'error'), [
+        (0, 1, ValueError),
+        (1, 0, ValueError),
+        ('2', 1, TypeError),
+    ])
+    def test_with_invalid_arguments(self, json_orders, workers, chunk_size, error):
+        with pytest.raises(error):
+            OrdersLoader.validate(json_orders, workers, chunk_size)
+
+
+class TestLoadNdjson:
+    @pytest.fixture
+    def ndjson_file(self, tmp_path):
+        path = tmp_path / 'orders.ndjson'
+        write_orders_ndjson(str(path), 40, 3, 10, invalid_ratio=0.2, seed=3)
+        lines = path.read_text().splitlines()
+        lines[5] = lines[5][:-4]
+        lines.insert(20, '')
+        path.write_text('\n'.join(lines) + '\n')
+        return path
+
+    @pytest.mark.parametrize(('workers', 'chunk_bytes'), [(1, 1 << 20), (1, 300), (3, 500)])
+    def test_same_as_loading_records(self, ndjson_file, workers, chunk_bytes):
+        lines = ndjson_file.read_text().splitlines()
+        records = [json.loads(line) for idx, line in enumerate(lines) if idx != 5 and line]
+        expected = OrdersLoader.load_collecting_errors(records)
+
+        result = OrdersLoader.load_ndjson(str(ndjson_file), workers=workers, chunk_bytes=chunk_bytes)
+        assert result.orders == expected.orders
+        assert list(result.orders) == list(expected.orders)
+        assert RecordError(6, {'line': ["Invalid json line"]}) in result.errors
+        assert len(result.errors) == len(expected.errors) + 1
+        assert [error.index for error in result.errors] == sorted(error.index for error in result.errors)
+        for error in result.errors:
+            if error.index != 6:
+                assert OrdersLoader.record_errors(json.loads(lines[error.index - 1])) == error.errors
+
+    def test_with_invalid_workers(self, ndjson_file):
+        with pytest.raises(TypeError) as e:
+            OrdersLoader.load_ndjson(str(ndjson_file), workers='2')
+        assert e.value.args[0] == "Invalid workers type"
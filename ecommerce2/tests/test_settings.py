@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+from ecommerce2.settings import DEFAULTS, ValidatorSettings, get_setting, load_env
+
+IMPORT_TIME_BUDGET = 0.5
+HEAVY_MODULES = ('dotenv', 'multiprocessing', 'concurrent.futures.process', 'cProfile', 'asyncio', 'sqlite3')
+
+
+def run_python(code: str, env: dict[str, str] | None = None) -> str:
+    return subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True,
+                          env=env, cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__)))).stdout
+
+
+class TestSettings:
+    def test_missing_variable_uses_default(self, monkeypatch):
+        load_env()
+        monkeypatch.delenv('PRODUCT_NAME_REGEX', raising=False)
+        assert get_setting('PRODUCT_NAME_REGEX') == DEFAULTS['PRODUCT_NAME_REGEX']
+
+    def test_settings_are_converted(self):
+        assert ValidatorSettings.CLIENT_AGE_RANGE_MIN == 18
+
+    def test_validation_works_without_env_variables(self):
+        env = {key: value for key, value in os.environ.items() if key not in DEFAULTS}
+        output = run_python(
+            "import ecommerce2.settings as settings\n"
+            "settings.dotenv_path = 'missing.env'\n"
+            "from ecommerce2.ecommerce_service.validator import ProductValidator\n"
+            "print(ProductValidator.validate_product_data({'name': 'TV', 'category': 'RTV', 'price': '10.50'}))",
+            env
+        )
+        assert output == '{}\n'
+
+
+class TestImportTime:
+    def test_import_is_within_budget_and_lazy(self):
+        output = run_python(
+            "import sys, time\n"
+            "start = time.perf_counter()\n"
+            "import ecommerce2.ecommerce_service.service, ecommerce2.ecommerce_service.validator, "
+            "ecommerce2.loader.orders_loader, ecommerce2.loader.json_loader, ecommerce2.app\n"
+            "print(time.perf_counter() - start)\n"
+            f"print(*[module for module in {HEAVY_MODULES!r} if module in sys.modules])"
+        )
+        elapsed, loaded = output.split('\n')[:2]
+        assert float(elapsed) < IMPORT_TIME_BUDGET
+        assert loaded == ''